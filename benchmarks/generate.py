@@ -0,0 +1,201 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Generates a synthetic WDL repository for benchmarking.
+
+    python benchmarks/generate.py OUTPUT_DIR [--inputs INPUTS] [--depth DEPTH]
+        [--fan-out FAN_OUT] [--tasks TASKS] [--authors AUTHORS]
+
+The repository consists of a main workflow (main.wdl) calling FAN_OUT
+sub-workflows, each of which calls TASKS tasks (from tasks.wdl) inside
+DEPTH levels of alternating scatters and conditionals. Each task has INPUTS
+inputs, one output and AUTHORS authors (out of a total of AUTHORS * TASKS
+authors). All inputs and outputs have a parameter_meta entry, except for
+every tenth input.
+"""
+
+import argparse
+from pathlib import Path
+
+INPUT_TYPES = ("String", "Int", "File?", "Boolean", "String?", "Float")
+DEFAULTS = {"String": '"value"', "Int": "1", "Boolean": "true",
+            "Float": "0.5"}
+CATEGORIES = ("common", "advanced", "other")
+
+
+def task(index, inputs, authors):
+    declarations = []
+    parameter_meta = []
+    for i in range(inputs):
+        wdl_type = INPUT_TYPES[i % len(INPUT_TYPES)]
+        default = DEFAULTS.get(wdl_type) if i % 3 else None
+        declarations.append(f"        {wdl_type} input{i}" +
+                            (f" = {default}" if default else ""))
+        if i % 10 != 9:
+            parameter_meta.append(
+                f'        input{i}: {{description: "Input {i} of task '
+                f'{index}.", category: "{CATEGORIES[i % 3]}"}}')
+    author_list = ", ".join(
+        f'{{name: "Author {index * authors + i}", '
+        f'email: "author{index * authors + i}@example.com"}}'
+        for i in range(authors))
+    return "\n".join([
+        f"task task{index} {{",
+        "    input {", *declarations, "    }",
+        "    command <<<",
+        "        echo ~{input0}",
+        "    >>>",
+        "    output {",
+        "        String out = read_string(stdout())",
+        "    }",
+        "    parameter_meta {", *parameter_meta,
+        f'        out: {{description: "The output of task {index}."}}',
+        "    }",
+        "    meta {",
+        f"        authors: [{author_list}]",
+        "    }",
+        "}",
+        ""])
+
+
+def required_inputs(inputs):
+    return ", ".join(
+        f"input{i} = " + ("sample" if i == 0 else
+                          DEFAULTS[INPUT_TYPES[i % len(INPUT_TYPES)]])
+        for i in range(0, inputs, 3)
+        if not INPUT_TYPES[i % len(INPUT_TYPES)].endswith("?"))
+
+
+def output_type(depth):
+    wdl_type = "String"
+    for level in reversed(range(depth)):
+        if level % 2 == 0:
+            wdl_type = f"Array[{wdl_type}]"
+        elif not wdl_type.endswith("?"):
+            wdl_type += "?"
+    return wdl_type
+
+
+def sub_workflow(index, inputs, depth, tasks):
+    lines = [f"workflow sub{index} {{",
+             "    input {",
+             "        String sample",
+             '        Array[String] items = ["a", "b"]',
+             "        Boolean flag = true",
+             "    }"]
+    indent = "    "
+    for level in range(depth):
+        if level % 2 == 0:
+            lines.append(f"{indent}scatter (item{level} in items) {{")
+        else:
+            lines.append(f"{indent}if (flag) {{")
+        indent += "    "
+    for i in range(tasks):
+        lines.append(f"{indent}call tasks.task{i} as task{i} {{ input: "
+                     f"{required_inputs(inputs)} }}")
+    for level in reversed(range(depth)):
+        indent = indent[:-4]
+        lines.append(f"{indent}}}")
+    lines.append("    output {")
+    lines += [f"        {output_type(depth)} out{i} = task{i}.out"
+              for i in range(tasks)]
+    lines += ["    }",
+              "    parameter_meta {",
+              '        sample: {description: "The sample name.", '
+              'category: "required"}',
+              '        items: {description: "The items to scatter over.", '
+              'category: "common"}',
+              '        flag: {description: "Whether to run the tasks.", '
+              'category: "advanced"}',
+              *(f'        out{i}: {{description: "The output of task{i}."}}'
+                for i in range(tasks)),
+              "    }",
+              "}",
+              ""]
+    return "\n".join(lines)
+
+
+def generate_repository(directory, inputs=20, depth=2, fan_out=10, tasks=10,
+                        authors=2):
+    """
+    :param directory: The directory to write the WDL files to.
+    :param inputs: The number of inputs per task.
+    :param depth: The nesting depth of scatters and conditionals in the
+    sub-workflows.
+    :param fan_out: The number of sub-workflows.
+    :param tasks: The number of tasks called by each sub-workflow.
+    :param authors: The number of authors of each task.
+    :return: The path to the main workflow.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "tasks.wdl").write_text("\n".join(
+        ["version 1.0", ""] +
+        [task(i, inputs, authors) for i in range(tasks)]))
+    for i in range(fan_out):
+        (directory / f"sub{i}.wdl").write_text("\n".join([
+            "version 1.0", "", 'import "tasks.wdl" as tasks', "",
+            sub_workflow(i, inputs, depth, tasks)]))
+    main = directory / "main.wdl"
+    main.write_text("\n".join(
+        ["version 1.0", ""] +
+        [f'import "sub{i}.wdl" as sub{i}' for i in range(fan_out)] +
+        ["", "workflow main {",
+         "    input {",
+         "        String sample",
+         "    }"] +
+        [f"    call sub{i}.sub{i} as sub{i} {{ input: sample = sample }}"
+         for i in range(fan_out)] +
+        ["    output {"] +
+        [f"        {output_type(depth)} out{i} = sub{i}.out0"
+         for i in range(fan_out)] +
+        ["    }",
+         "    parameter_meta {",
+         '        sample: {description: "The sample name.", '
+         'category: "required"}'] +
+        [f'        out{i}: {{description: "The output of sub{i}."}}'
+         for i in range(fan_out)] +
+        ["    }",
+         "    meta {",
+         '        authors: [{name: "Main Author", '
+         'email: "main@example.com"}]',
+         "    }",
+         "}",
+         ""]))
+    return main
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--inputs", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--fan-out", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--authors", type=int, default=2)
+    args = parser.parse_args()
+    print(generate_repository(args.output_dir, args.inputs, args.depth,
+                              args.fan_out, args.tasks, args.authors))
+
+
+if __name__ == "__main__":
+    main()
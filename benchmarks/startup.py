@@ -0,0 +1,87 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Measures the startup time of ``wdl-aid --version`` and ``wdl-aid --help``.
+
+    python benchmarks/startup.py [--runs RUNS] [--record HISTORY]
+
+When --record is given, the results are appended as a JSON line (together
+with the current date, git commit and WDL-AID version) to the given file,
+so the startup time can be tracked over time.
+"""
+
+import argparse
+import datetime
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from wdl_aid import __version__
+
+COMMANDS = {"version": ["--version"], "help": ["--help"]}
+
+
+def time_command(arguments, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c",
+                        "from wdl_aid.wdl_aid import main; main()"] +
+                       arguments, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                            capture_output=True, text=True,
+                            cwd=Path(__file__).parent)
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--record", type=Path,
+                        help="A file to append the results to.")
+    args = parser.parse_args()
+
+    results = {name: time_command(arguments, args.runs)
+               for name, arguments in COMMANDS.items()}
+    for name, timing in results.items():
+        print(f"wdl-aid --{name}: min {timing['min'] * 1000:.1f} ms, "
+              f"median {timing['median'] * 1000:.1f} ms")
+    if args.record is not None:
+        with args.record.open("a") as history:
+            history.write(json.dumps({
+                "date": datetime.datetime.now().isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "wdl_aid_version": __version__,
+                "python_version": sys.version.split()[0],
+                "results": results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Measures how WDL-AID scales, using synthetic workflows (see generate.py).
+
+    python benchmarks/workflows.py [--runs RUNS] [--save-baseline BASELINE]
+        [--baseline BASELINE] [--threshold THRESHOLD] [--tolerance MS]
+
+For each scenario the loading of the workflow (WDL.load), the gathering of
+the parameter_meta (gather_parameter_meta) and meta (gather_meta) sections,
+the gathering of the input and output entries (gather_entries) and the
+rendering of the default template (including the sorting of the entries)
+are timed separately. The fastest of RUNS runs is reported.
+
+With --save-baseline the results are stored in the given file. With
+--baseline the results are compared to those stored in the given file and
+the exit code is 1 if any phase of any scenario got slower than THRESHOLD
+times its baseline time, by more than MS milliseconds (so the noise on
+phases which take well under a millisecond is not reported). To make up
+for the speed of the machine, every scenario also times a fixed
+calibration workload, and the baseline times are scaled by how much
+slower or faster that workload ran compared to the baseline. Baselines
+are still best compared on the machine they were recorded on.
+
+``tox -e benchmark`` compares against benchmarks/baseline.json. After a
+change that is expected to alter the timings (or on a different machine),
+refresh that file using ``tox -e benchmark-baseline`` and commit it
+together with the change.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import WDL
+
+import wdl_aid.wdl_aid as wa
+from wdl_aid import __version__
+
+from generate import generate_repository
+
+SCENARIOS = {
+    "default": {},
+    "many_inputs": {"inputs": 200, "fan_out": 2},
+    "deep": {"depth": 30, "fan_out": 2},
+    "wide": {"fan_out": 100, "tasks": 2},
+    "many_authors": {"authors": 50},
+}
+PHASES = ("load", "gather_parameter_meta", "gather_meta", "gather_entries",
+          "render")
+
+
+def run_phases(main_wdl):
+    timings = {}
+
+    def timed(phase, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        timings[phase] = time.perf_counter() - start
+        return result
+
+    workflow = timed("load", WDL.load, str(main_wdl)).workflow
+    parameter_meta = timed("gather_parameter_meta", wa.gather_parameter_meta,
+                           workflow, workflow.name)
+    meta = timed("gather_meta", wa.gather_meta, workflow, workflow.name)
+    inputs, required_inputs = wa.gather_inputs(workflow)
+    outputs = [(f"{workflow.name}.{output.name}", output)
+               for output in workflow.effective_outputs]
+
+    def gather_all_entries():
+        input_entries, _ = wa.gather_entries(
+            [wa.describe_binding(name, binding) for name, binding in inputs],
+            parameter_meta, "category", "other", "description", "???",
+            False, meta["exclude"], required_inputs)
+        output_entries, _ = wa.gather_entries(
+            [wa.describe_binding(name, binding) for name, binding in outputs],
+            parameter_meta, "category", "other", "description", "???",
+            False, meta["exclude"])
+        return input_entries, output_entries
+
+    input_entries, output_entries = timed("gather_entries",
+                                          gather_all_entries)
+    values = {"workflow_name": workflow.name,
+              "workflow_file": str(main_wdl),
+              "workflow_authors": wa.wrap_in_list(
+                  workflow.meta.get("authors", [])),
+              "workflow_all_authors": meta["authors"],
+              "workflow_meta": workflow.meta,
+              "excluded_inputs": [],
+              "excluded_outputs": [],
+              "inputs": input_entries,
+              "outputs": output_entries,
+              "wdl_aid_version": __version__}
+    # Includes sorting the entries, as is done for every render.
+    timed("render", lambda: wa.default_template().render(
+        wa.with_sorted_views(values)))
+    return timings
+
+
+def calibrate():
+    """Time a fixed workload, as a measure of the speed of the machine."""
+    start = time.perf_counter()
+    entries = [{"name": f"input_{i}", "category": str(i % 7)}
+               for i in range(50000)]
+    sorted(entries, key=lambda entry: (entry["category"], entry["name"]))
+    json.dumps(entries)
+    return time.perf_counter() - start
+
+
+def run_scenario(parameters, runs):
+    with tempfile.TemporaryDirectory() as directory:
+        main_wdl = generate_repository(directory, **parameters)
+        results = {phase: float("inf") for phase in PHASES}
+        calibration = float("inf")
+        gc_was_enabled = gc.isenabled()
+        for _ in range(runs):
+            gc.collect()
+            gc.disable()
+            try:
+                calibration = min(calibration, calibrate())
+                timings = run_phases(main_wdl)
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+            for phase, timing in timings.items():
+                results[phase] = min(results[phase], timing)
+    return results, calibration
+
+
+def compare(results, calibrations, baseline, threshold, tolerance):
+    regressions = []
+    for scenario, timings in results.items():
+        if scenario not in baseline["results"]:
+            print(f"Skipping {scenario}: it is not in the baseline.",
+                  file=sys.stderr)
+            continue
+        if baseline["scenarios"].get(scenario) != SCENARIOS[scenario]:
+            print(f"Skipping {scenario}: its parameters differ from the "
+                  f"baseline.", file=sys.stderr)
+            continue
+        # Baselines recorded without a calibration are used as they are.
+        speed = (calibrations[scenario] /
+                 baseline.get("calibrations", calibrations)[scenario])
+        for phase, timing in timings.items():
+            reference = baseline["results"][scenario][phase] * speed
+            if (timing > reference * threshold and
+                    timing - reference > tolerance):
+                regressions.append(
+                    f"{scenario} {phase}: {timing * 1000:.1f} ms, baseline "
+                    f"{reference * 1000:.1f} ms ({timing / reference:.2f}x, "
+                    f"baseline scaled by {speed:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scenario", action="append",
+                        choices=sorted(SCENARIOS),
+                        help="The scenario(s) to run. [all]")
+    parser.add_argument("--save-baseline", type=Path,
+                        help="A file to store the results in.")
+    parser.add_argument("--baseline", type=Path,
+                        help="A file with results to compare to.")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="The maximum allowed ratio between a timing "
+                             "and its baseline. [1.5]")
+    parser.add_argument("--tolerance", type=float, default=5.0,
+                        help="The minimal difference, in milliseconds, "
+                             "between a timing and its baseline for it to "
+                             "count as a regression. [5.0]")
+    args = parser.parse_args()
+    if (args.baseline is not None and args.save_baseline is not None and
+            args.baseline.resolve() == args.save_baseline.resolve()):
+        parser.error("--baseline and --save-baseline should be different "
+                     "files.")
+    if args.baseline is not None and not args.baseline.is_file():
+        parser.error(f"The baseline {args.baseline} does not exist. It can "
+                     f"be created using --save-baseline.")
+
+    results = {}
+    calibrations = {}
+    for scenario in args.scenario or SCENARIOS:
+        results[scenario], calibrations[scenario] = run_scenario(
+            SCENARIOS[scenario], args.runs)
+        print(f"{scenario}: " + ", ".join(
+            f"{phase} {timing * 1000:.1f} ms"
+            for phase, timing in results[scenario].items()))
+    if args.save_baseline is not None:
+        with args.save_baseline.open("w") as baseline_file:
+            json.dump({"wdl_aid_version": __version__,
+                       "python_version": sys.version.split()[0],
+                       "scenarios": SCENARIOS,
+                       "calibrations": calibrations,
+                       "results": results}, baseline_file, indent=2)
+    if args.baseline is not None:
+        with args.baseline.open() as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, calibrations, baseline, args.threshold,
+                              args.tolerance / 1000)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
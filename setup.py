@@ -31,9 +31,6 @@ setup(name="WDL-AID",
       classifiers=[
         "Programming Language :: Python :: 3 :: Only",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
@@ -49,10 +46,10 @@ setup(name="WDL-AID",
       packages=["wdl_aid", "wdl_aid.templates"],
       package_dir={'': 'src'},
       package_data={'': ["*.j2"]},
+      python_requires=">=3.9",
       install_requires=[
         "miniwdl>=1.0",
-        "jinja2",
-        "setuptools"
+        "jinja2"
       ],
       entry_points={
           "console_scripts":
@@ -18,10 +18,32 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import pkg_resources
+import importlib.util
+import re
+import sys
+from importlib.metadata import version
+from types import ModuleType
 
-package = pkg_resources.get_distribution("wdl_aid")
-# The short X.Y version
-base_version = package.parsed_version.base_version
 # The full version, including alpha/beta/rc tags
-__version__ = package.version
+__version__ = version("wdl_aid")
+# The version without any alpha/beta/rc tags
+base_version = re.match(r"\d+(\.\d+)*", __version__).group(0)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a module, but only execute it once one of its attributes is
+    accessed. Used for miniwdl and jinja2, which are slow to import and
+    not needed for eg. ``wdl-aid --help``.
+    :param name: The name of the module.
+    :return: The (lazy) module.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
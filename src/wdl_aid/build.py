@@ -0,0 +1,171 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from wdl_aid import __version__
+from wdl_aid.cache import file_digest, import_closure
+from wdl_aid.wdl_aid import JOB_OPTIONS, document_workflow, map_jobs
+
+
+def job_state(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    :param job: The options for a workflow, see wdl_aid.create_jobs.
+    :return: Everything the documentation of the workflow depends on: the
+    digests of the WDL file, the files it imports, the templates and the
+    extra data, the options and the version of WDL-AID.
+    """
+    dependencies = import_closure(job["wdlfile"], job.get("import_index"),
+                                  job.get("mirror"))
+    paths = [job.get(option)
+             for option in ("template", "extra", "index_template")]
+    paths.extend(template_path
+                 for template_path, _ in job.get("renders") or [])
+    for path in paths:
+        if path is not None:
+            path = os.path.abspath(path)
+            dependencies[path] = file_digest(path)
+    # Paths are stored as strings and tuples as lists, as in the manifest.
+    options = json.loads(json.dumps(
+        {option: job[option] for option in JOB_OPTIONS if option in job},
+        default=str))
+    return {"dependencies": dependencies, "options": options,
+            "wdl_aid_version": __version__}
+
+
+def build_workflow(job: Dict[str, Any]
+                   ) -> Tuple[List[str], Optional[str]]:
+    """
+    Like wdl_aid.try_document_workflow, but also returns the files written.
+    :param job: The options for this workflow, see wdl_aid.create_jobs.
+    :return: The files the documentation was written to and a description
+    of the error that occurred, if any.
+    """
+    try:
+        output_files = document_workflow(job)
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+    return [str(output_file) for output_file in output_files], None
+
+
+class BuildManifest(object):
+    """
+    Records, for each generated output, what it was generated from, so
+    that a later run only needs to regenerate the outputs of which any
+    dependency changed.
+    """
+    def __init__(self, path: Path):
+        """
+        :param path: The JSON file in which the manifest is stored. It is
+        read if it exists.
+        """
+        self.path = path
+        try:
+            with path.open("r") as manifest_file:
+                manifest = json.load(manifest_file)
+        except FileNotFoundError:
+            manifest = {}
+        # (wdlfile, output pattern) -> {"state", "outputs": {path: digest}}
+        self.entries: Dict[str, Dict[str, Any]] = manifest.get("outputs", {})
+
+    @staticmethod
+    def job_key(job: Dict[str, Any]) -> str:
+        """
+        :param job: The options for a workflow, see wdl_aid.create_jobs.
+        :return: The key of the job in the manifest.
+        """
+        return json.dumps([os.path.abspath(job["wdlfile"]),
+                           os.path.abspath(job["output"])])
+
+    def is_up_to_date(self, job: Dict[str, Any],
+                      state: Dict[str, Any]) -> bool:
+        """
+        :param job: The options for a workflow, see wdl_aid.create_jobs.
+        :param state: The current state of the job, see job_state.
+        :return: Whether the outputs of the job were generated from the
+        same state and have not been modified (or removed) since. Jobs
+        depending on files which could not be read, or on remote imports,
+        are never up to date.
+        """
+        entry = self.entries.get(self.job_key(job))
+        return (entry is not None and entry["state"] == state and
+                None not in state["dependencies"].values() and
+                all(file_digest(output_file) == digest
+                    for output_file, digest in entry["outputs"].items()))
+
+    def record(self, job: Dict[str, Any], state: Dict[str, Any],
+               output_files: List[str]):
+        """
+        :param job: The options for a workflow, see wdl_aid.create_jobs.
+        :param state: The state the outputs were generated from, see
+        job_state.
+        :param output_files: The files the outputs were written to.
+        """
+        self.entries[self.job_key(job)] = {
+            "state": state,
+            "outputs": {os.path.abspath(output_file): file_digest(output_file)
+                        for output_file in output_files}}
+
+    def save(self):
+        """Write the manifest (atomically)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=self.path.parent,
+                                             prefix=f".{self.path.name}.",
+                                             suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as temp_file:
+                json.dump({"outputs": self.entries}, temp_file, indent=1)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def incremental_build(jobs: List[Dict[str, Any]], manifest: BuildManifest,
+                      processes: int = 1) -> List[Optional[str]]:
+    """
+    Document only those workflows of which the output is not up to date
+    according to the manifest, and record the newly generated outputs in
+    the manifest. Workflows without an output path are always documented.
+    :param jobs: The options for each workflow, see wdl_aid.create_jobs.
+    :param manifest: The build manifest.
+    :param processes: The number of processes to use. If 0, the number of
+    CPUs is used.
+    :return: For each job (in the same order) a description of the error
+    that occurred or None if it succeeded (or was skipped).
+    """
+    states = [job_state(job) if job["output"] is not None else None
+              for job in jobs]
+    to_build = [i for i, (job, state) in enumerate(zip(jobs, states))
+                if state is None or not manifest.is_up_to_date(job, state)]
+    errors: List[Optional[str]] = [None] * len(jobs)
+    results = map_jobs(build_workflow, [jobs[i] for i in to_build],
+                       processes)
+    for i, (output_files, error) in zip(to_build, results):
+        errors[i] = error
+        if error is None and states[i] is not None:
+            manifest.record(jobs[i], states[i], output_files)
+    manifest.save()
+    return errors
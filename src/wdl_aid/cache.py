@@ -0,0 +1,238 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from wdl_aid import __version__
+from wdl_aid.sources import (IMPORT_PATTERN, ImportIndex, SourceMirror,
+                             is_remote, resolve_import)
+
+# Temporary files older than this (in seconds) were left behind by a
+# process which crashed while writing them, and are removed on eviction.
+STALE_TEMP_FILE_AGE = 60 * 60
+
+
+def file_digest(path: str) -> Optional[str]:
+    """
+    :param path: The file to hash.
+    :return: The sha256 hex digest of the file's contents or None if the
+    file does not exist.
+    """
+    try:
+        with open(path, "rb") as handle:
+            return hashlib.sha256(handle.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def import_closure(wdlfile: str,
+                   import_index: Optional[ImportIndex] = None,
+                   mirror: Optional[SourceMirror] = None
+                   ) -> Dict[str, Optional[str]]:
+    """
+    Find the WDL file and all files it (recursively) imports, without
+    parsing them with miniwdl.
+    :param wdlfile: The WDL file.
+    :param import_index: The index of the directories to search for
+    imports, if any, see sources.ImportIndex.
+    :param mirror: A mirror to read remote files from, see
+    sources.SourceMirror.
+    :return: A dictionary with the absolute path (or URI) of each file as
+    keys and the digest of the file's contents as values. Files which
+    could not be read have None as digest. Remote files are only read
+    (and their imports followed) when a mirror is given, otherwise they
+    have None as digest.
+    """
+    if wdlfile == "-":
+        # Standard input can only be read once, by miniwdl.
+        return {wdlfile: None}
+    closure = {}
+    search_path = (import_index.directories if import_index is not None
+                   else [])
+    to_visit = [os.path.abspath(wdlfile)]
+    while len(to_visit) > 0:
+        path = to_visit.pop()
+        if path in closure:
+            continue
+        if is_remote(path):
+            try:
+                source = mirror.read(path) if mirror is not None else None
+            except (OSError, ValueError):
+                source = None
+            closure[path] = (hashlib.sha256(source.encode("utf-8")).hexdigest()
+                             if source is not None else None)
+        else:
+            closure[path] = file_digest(path)
+            if closure[path] is not None:
+                with open(path, "r") as handle:
+                    source = handle.read()
+        if closure[path] is None:
+            continue
+        for match in IMPORT_PATTERN.finditer(source):
+            uri = match.group(2)
+            try:
+                uri = resolve_import(uri, search_path, path, import_index)
+            except FileNotFoundError:
+                # Recorded as missing (relative to the importing file), so
+                # the closure changes once the file is created.
+                if uri.startswith("file://"):
+                    uri = uri[7:]
+                uri = os.path.abspath(
+                    os.path.join(os.path.dirname(path), uri))
+            to_visit.append(uri)
+    return closure
+
+
+def to_json(value: Any) -> Any:
+    """
+    Used as the default function for json.dump, to serialize objects which
+    provide a to_dict method (eg. the entries in the collected values).
+    """
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON "
+                    f"serializable")
+
+
+class ValuesCache(object):
+    """
+    A content-addressed on-disk cache for the values collected from
+    workflows. The cache directory may be shared between concurrent
+    processes: entries are written atomically and the least recently used
+    entries are removed once the cache exceeds its maximum size. The
+    compiled templates (see bytecode_directory) count towards that size.
+    """
+    def __init__(self, directory: Path, max_size: int = 100 * 1024 ** 2):
+        """
+        :param directory: The directory in which the entries are stored.
+        :param max_size: The maximum total size of the entries and the
+        compiled templates in bytes.
+        """
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    @property
+    def bytecode_directory(self) -> Path:
+        """The directory in which jinja2 stores the compiled templates."""
+        return self.directory / "templates"
+
+    def key(self, wdlfile: str, options: Any,
+            closure: Optional[Dict[str, Optional[str]]] = None) -> str:
+        """
+        :param wdlfile: The WDL file the values are collected from.
+        :param options: The options that affect the collected values.
+        :param closure: The import closure of the WDL file, if already
+        known. See import_closure.
+        :return: A key which changes whenever the WDL file, any of the
+        files it imports, the options or the version of WDL-AID change.
+        """
+        if closure is None:
+            closure = import_closure(wdlfile)
+        key_data = json.dumps({"wdlfile": wdlfile,
+                               "closure": closure,
+                               "options": options,
+                               "wdl_aid_version": __version__},
+                              sort_keys=True, default=str)
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        :param key: The key of the entry.
+        :return: The cached value or None if it is not cached.
+        """
+        entry = self.path(key)
+        try:
+            with entry.open("r") as handle:
+                value = json.load(handle)
+            os.utime(entry)  # Mark as recently used.
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+        Store a value in the cache and evict the least recently used
+        entries if the cache has become too large.
+        :param key: The key of the entry.
+        :param value: The (JSON serializable, see to_json) value to
+        store.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=self.directory,
+                                             suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as temp_file:
+                json.dump(value, temp_file, default=to_json)
+            os.replace(temp_path, self.path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries and compiled templates until
+        their total size no longer exceeds the maximum size. Temporary
+        files left behind by crashed processes are removed as well.
+        """
+        files = []
+        stale_before = time.time() - STALE_TEMP_FILE_AGE
+        for directory, suffix in ((self.directory, ".json"),
+                                  (self.bytecode_directory, ".cache")):
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # Removed by another process.
+                    continue
+                if entry.name.endswith(suffix):
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                elif (entry.name.endswith(".tmp") and
+                        stat.st_mtime < stale_before):
+                    remove(entry.path)
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size:
+                break
+            remove(path)
+            total_size -= size
+
+
+def remove(path: str):
+    """
+    Remove a file, which may already have been removed by another process.
+    :param path: The file to remove.
+    """
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,193 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from wdl_aid.wdl_aid import (DOCUMENT_CACHE, JSON_SCHEMA_VERSION, WALK_MEMO,
+                             map_jobs, workflow_extract, write_atomically)
+
+
+def missing_parameter_meta(declarations: List[Tuple],
+                           parameter_meta: Dict[str, Any],
+                           excluded_names: Iterable[str]
+                           ) -> Tuple[int, List[str]]:
+    """
+    :param declarations: The inputs or outputs, see
+    wdl_aid.describe_binding.
+    :param parameter_meta: The fully qualified parameter_meta.
+    :param excluded_names: The names to exclude.
+    :return: The number of declarations checked and the names of those
+    for which parameter_meta is missing, as gather_entries would report.
+    """
+    excluded_names = set(excluded_names)
+    names = [declaration[0] for declaration in declarations
+             if declaration[0] not in excluded_names]
+    return len(names), [name for name in names if name not in parameter_meta]
+
+
+def checked_declarations(job: Dict[str, Any]) -> Tuple[bool, bool]:
+    """
+    :param job: The options for a workflow, see wdl_aid.create_jobs.
+    :return: Whether the inputs and whether the outputs are checked. These
+    are selected by the strict options. If none are given, both are
+    checked.
+    """
+    strict_inputs = job["strict"] or job["strict_inputs"]
+    strict_outputs = job["strict"] or job["strict_outputs"]
+    if not (strict_inputs or strict_outputs):
+        return True, True
+    return strict_inputs, strict_outputs
+
+
+def check_workflow(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Determine for which inputs and outputs of a workflow parameter_meta is
+    missing. Unlike wdl_aid.collect_values, no entries are created and
+    nothing is rendered.
+    :param job: The options for this workflow, see wdl_aid.create_jobs.
+    :return: The result for the workflow: the "wdlfile", the
+    "workflow_name", the number of "inputs" and "outputs" checked, the
+    names of the "missing_inputs" and "missing_outputs" and a description
+    of the "error" that occurred, if any.
+    """
+    result = {"wdlfile": job["wdlfile"], "workflow_name": None,
+              "inputs": 0, "outputs": 0, "missing_inputs": [],
+              "missing_outputs": [], "error": None}
+    try:
+        extract = workflow_extract(job["wdlfile"], job.get("cache"),
+                                   DOCUMENT_CACHE, WALK_MEMO,
+                                   bool(job.get("fast")),
+                                   mirror=job.get("mirror"),
+                                   import_index=job.get("import_index"))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    check_inputs, check_outputs = checked_declarations(job)
+    result["workflow_name"] = extract["workflow_name"]
+    for kind, checked in (("inputs", check_inputs),
+                          ("outputs", check_outputs)):
+        if checked:
+            result[kind], result[f"missing_{kind}"] = missing_parameter_meta(
+                extract[kind], extract["parameter_meta"], extract["exclude"])
+    return result
+
+
+def passed(result: Dict[str, Any]) -> bool:
+    """
+    :param result: The result for a workflow, see check_workflow.
+    :return: Whether the workflow passed the check.
+    """
+    return (result["error"] is None and len(result["missing_inputs"]) == 0
+            and len(result["missing_outputs"]) == 0)
+
+
+def check_workflows(jobs: List[Dict[str, Any]], processes: int = 1,
+                    fail_fast: bool = False) -> List[Dict[str, Any]]:
+    """
+    :param jobs: The options for each workflow, see wdl_aid.create_jobs.
+    :param processes: The number of processes to use. If 0, the number of
+    CPUs is used.
+    :param fail_fast: Stop at the first workflow (in the order of the
+    jobs) which does not pass. Workflows which were not started yet are
+    not checked.
+    :return: The results for the checked workflows, see check_workflow,
+    in the order of the jobs.
+    """
+    results = []
+    for result in map_jobs(check_workflow, jobs, processes):
+        results.append(result)
+        if fail_fast and not passed(result):
+            # Closing map_jobs cancels the pending workflows.
+            break
+    return results
+
+
+def report(results: List[Dict[str, Any]], total: int) -> Dict[str, Any]:
+    """
+    :param results: The results for the checked workflows, see
+    check_workflow.
+    :param total: The number of workflows that were to be checked.
+    :return: A machine readable summary of the check, see
+    docs/usage.rst.
+    """
+    inputs = sum(result["inputs"] for result in results)
+    outputs = sum(result["outputs"] for result in results)
+    missing_inputs = sum(len(result["missing_inputs"]) for result in results)
+    missing_outputs = sum(len(result["missing_outputs"])
+                          for result in results)
+    return {"schema_version": JSON_SCHEMA_VERSION,
+            "passed": (len(results) == total and
+                       all(passed(result) for result in results)),
+            "workflows": total,
+            "checked": len(results),
+            "failed": sum(not passed(result) for result in results),
+            "inputs": inputs,
+            "missing_inputs": missing_inputs,
+            "outputs": outputs,
+            "missing_outputs": missing_outputs,
+            "coverage": (1 - (missing_inputs + missing_outputs) /
+                         (inputs + outputs)) if inputs + outputs else 1.0,
+            "results": results}
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    """
+    :param result: The result for a workflow which did not pass, see
+    check_workflow.
+    :return: A human readable description of the problems found.
+    """
+    if result["error"] is not None:
+        return f"Failed to check {result['wdlfile']}:\n{result['error']}\n"
+    components = []
+    for kind in ("inputs", "outputs"):
+        if len(result[f"missing_{kind}"]) > 0:
+            missing = "\n".join(result[f"missing_{kind}"])
+            components.append(f"Missing parameter_meta for {kind}:\n"
+                              f"{missing}")
+    return f"{result['wdlfile']}:\n" + "\n\n".join(components) + "\n"
+
+
+def run_check(jobs: List[Dict[str, Any]], processes: int = 1,
+              fail_fast: bool = False,
+              report_file: Optional[Path] = None) -> bool:
+    """
+    Check the workflows, print the problems found to stderr and
+    optionally write a summary as JSON.
+    :param jobs: The options for each workflow, see wdl_aid.create_jobs.
+    :param processes: The number of processes to use. If 0, the number of
+    CPUs is used.
+    :param fail_fast: Stop at the first workflow which does not pass.
+    :param report_file: The file to write the summary to, if any.
+    :return: Whether all workflows passed.
+    """
+    results = check_workflows(jobs, processes, fail_fast)
+    for result in results:
+        if not passed(result):
+            print(format_result(result), file=sys.stderr)
+    summary = report(results, len(jobs))
+    if report_file is not None:
+        report_file.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(report_file,
+                         [json.dumps(summary, indent=2), "\n"])
+    return summary["passed"]
@@ -0,0 +1,159 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import functools
+import hashlib
+from typing import (TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional,
+                    Tuple)
+
+from wdl_aid import lazy_import
+
+WDL = lazy_import("WDL")
+
+if TYPE_CHECKING:
+    ReadSource = Callable[[str, List[str], Optional[WDL.Document]],
+                          Awaitable[WDL.ReadSourceResult]]
+
+
+def typecheck_task_declarations(
+        task: WDL.Task, struct_types: Optional[WDL.Env.Bindings] = None,
+        check_quant: bool = True):
+    """
+    A lightweight replacement for Task.typecheck, which only resolves the
+    types of the task's declarations. This is all that is needed to
+    typecheck the workflows calling the task. The command, the runtime
+    section and the expressions of the declarations are not checked.
+    :param task: The task to typecheck.
+    :param struct_types: The struct types available to the task.
+    :param check_quant: Unused, as no expressions are checked.
+    """
+    struct_types = struct_types or WDL.Env.Bindings()
+    type_env = WDL.Env.Bindings()
+    for decl in (task.inputs or []) + task.postinputs + task.outputs:
+        type_env = decl.add_to_type_env(struct_types, type_env)
+
+
+class DocumentCache(object):
+    """
+    An in-process cache of loaded (parsed and typechecked) WDL documents.
+    Documents are keyed by their resolved path and the digest of their
+    source, so a document imported by multiple workflows is only parsed and
+    typechecked once, as long as neither it nor any of the documents it
+    imports changed.
+    """
+    def __init__(self):
+        # abspath -> (source digest, (check_quant, typecheck_tasks), document)
+        self.documents: Dict[str, Tuple[str, Tuple[bool, bool],
+                                        WDL.Document]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, uri: str, path: Optional[List[str]] = None,
+             check_quant: bool = True,
+             read_source: Optional[ReadSource] = None,
+             import_max_depth: int = 10,
+             typecheck_tasks: bool = True) -> WDL.Document:
+        """
+        A drop-in replacement for WDL.load, which reuses the cached
+        documents.
+        :param uri: The WDL file to load.
+        :param path: Directories to search for imports.
+        :param check_quant: Whether to typecheck the optional and nonempty
+        type quantifiers.
+        :param read_source: The routine to read WDL source code with,
+        defaults to WDL.read_source_default.
+        :param import_max_depth: The maximum depth of nested imports.
+        :param typecheck_tasks: Whether to fully typecheck tasks. If false,
+        only the types of the tasks' declarations are checked, see
+        typecheck_task_declarations.
+        :return: The loaded document.
+        """
+        import asyncio  # Not imported at the top, as it is slow to import.
+        document = asyncio.run(self.load_async(
+            uri, list(path or []), None, (check_quant, typecheck_tasks),
+            read_source or WDL.read_source_default, import_max_depth))
+        WDL.Walker.SetParents()(document)
+        return document
+
+    async def load_async(self, uri: str, path: List[str],
+                         importer: Optional[WDL.Document],
+                         mode: Tuple[bool, bool], read_source: ReadSource,
+                         import_max_depth: int) -> WDL.Document:
+        """
+        Mirrors miniwdl's own (private) loading routine, but consults the
+        cache for every (imported) document. The mode consists of
+        check_quant and typecheck_tasks, see load.
+        """
+        uri = uri if uri != "-" else "/dev/stdin"
+        read_result = await read_source(uri, path, importer)
+        digest = hashlib.sha256(
+            read_result.source_text.encode("utf-8")).hexdigest()
+        cached = self.documents.get(read_result.abspath)
+        if cached is not None and cached[:2] == (digest, mode):
+            document = cached[2]
+            # The imported documents may have changed in the mean time.
+            imports_up_to_date = True
+            for imp in document.imports:
+                subdocument = await self.load_import(
+                    imp, path, document, mode, read_source,
+                    import_max_depth)
+                imports_up_to_date = (imports_up_to_date and
+                                      subdocument is imp.doc)
+            if imports_up_to_date:
+                self.hits += 1
+                return document
+        self.misses += 1
+        # miniwdl's public parse_document does not record the absolute
+        # path, which is needed to resolve relative imports.
+        document = WDL._parser.parse_document(
+            read_result.source_text, uri=uri, abspath=read_result.abspath)
+        for i, imp in enumerate(document.imports):
+            subdocument = await self.load_import(
+                imp, path, document, mode, read_source,
+                import_max_depth)
+            document.imports[i] = WDL.Tree.DocImport(
+                pos=imp.pos, uri=imp.uri, namespace=imp.namespace,
+                aliases=imp.aliases, doc=subdocument)
+        check_quant, typecheck_tasks = mode
+        if not typecheck_tasks:
+            for task in document.tasks:
+                task.typecheck = functools.partial(typecheck_task_declarations,
+                                                   task)
+        document.typecheck(check_quant=check_quant)
+        self.documents[read_result.abspath] = (digest, mode, document)
+        return document
+
+    async def load_import(self, imp: WDL.Tree.DocImport, path: List[str],
+                          importer: WDL.Document, mode: Tuple[bool, bool],
+                          read_source: ReadSource,
+                          import_max_depth: int) -> WDL.Document:
+        if import_max_depth <= 1:
+            raise WDL.Error.ImportError(
+                imp.pos, imp.uri,
+                "exceeded import_max_depth; circular imports?")
+        try:
+            return await self.load_async(imp.uri, path, importer,
+                                         mode, read_source,
+                                         import_max_depth - 1)
+        except Exception as e:
+            raise WDL.Error.ImportError(imp.pos, imp.uri) from e
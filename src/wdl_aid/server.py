@@ -0,0 +1,304 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import collections
+import http.server
+import json
+import os
+import socketserver
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from wdl_aid.watch import file_state, job_dependencies
+from wdl_aid.wdl_aid import (WDL, default_template, drop_nones, job_template,
+                             job_values, load_extra, values_to_json,
+                             with_sorted_views)
+
+BOOLEAN_OPTIONS = ("separate_required", "fallback_description_to_object",
+                   "strict", "strict_inputs", "strict_outputs", "fast")
+STRING_OPTIONS = ("category_key", "description_key", "fallback_description",
+                  "fallback_category")
+# The number of (workflow, options) combinations to keep the values of.
+MAX_CACHED_VALUES = 256
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """
+    :param address: PORT, HOST:PORT or unix:PATH.
+    :return: The path of a unix socket or a (host, port) tuple.
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise ValueError(f"Invalid address to serve on: '{address}'. "
+                         f"Expected PORT, HOST:PORT or unix:PATH.")
+
+
+def parse_boolean(value: str) -> bool:
+    """
+    :param value: A boolean query parameter.
+    :return: The boolean value.
+    """
+    if value.lower() in ("1", "true", "yes", "on", ""):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Invalid boolean value: '{value}'.")
+
+
+class DocumentationService(object):
+    """
+    Collects values from and renders documentation for the workflows
+    below a root directory. Collected values are kept in memory until one
+    of the files they depend on changes.
+    """
+    def __init__(self, root: Path, defaults: Dict[str, Any],
+                 max_cached_values: int = MAX_CACHED_VALUES):
+        """
+        :param root: Only WDL files below this directory are served.
+        :param defaults: The options for the workflows, see
+        wdl_aid.job_defaults.
+        :param max_cached_values: The number of (workflow, options)
+        combinations to keep the values of. The least recently used
+        values are dropped first.
+        """
+        self.root = root.resolve()
+        self.defaults = defaults
+        self.max_cached_values = max_cached_values
+        self.values_cache: collections.OrderedDict[
+            Tuple, Tuple[Dict[str, Any], Dict]] = collections.OrderedDict()
+        # Guards values_cache, only held while accessing it.
+        self.lock = threading.Lock()
+        # miniwdl's parser is not thread-safe, so values are collected for
+        # one workflow at a time.
+        self.collect_lock = threading.Lock()
+
+    def warm_up(self):
+        """Load miniwdl, jinja2 and the default template."""
+        WDL.load  # Accessing an attribute loads the module.
+        default_template()
+
+    def job(self, relative_path: str, query: Dict[str, List[str]]
+            ) -> Dict[str, Any]:
+        """
+        :param relative_path: The WDL file, relative to the root.
+        :param query: The query parameters of the request, overriding
+        the default options.
+        :return: The job for the requested workflow.
+        """
+        wdlfile = (self.root / relative_path).resolve()
+        if self.root not in wdlfile.parents or not wdlfile.is_file():
+            raise FileNotFoundError(relative_path)
+        job = dict(self.defaults, wdlfile=str(wdlfile), output=None,
+                   renders=None)
+        for option, values in query.items():
+            if option in BOOLEAN_OPTIONS:
+                job[option] = parse_boolean(values[-1])
+            elif option in STRING_OPTIONS:
+                job[option] = values[-1]
+            else:
+                raise ValueError(f"Unknown option: '{option}'.")
+        return job
+
+    def cached_values(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """
+        :param key: The workflow and options, see values.
+        :return: The cached values, if none of the files they depend on
+        changed.
+        """
+        with self.lock:
+            cached = self.values_cache.get(key)
+            if cached is None:
+                return None
+            self.values_cache.move_to_end(key)
+        states, values = cached
+        if all(file_state(path) == state for path, state in states.items()):
+            return values
+        return None
+
+    def values(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        :param job: The job for a workflow, see job.
+        :return: The values collected from the workflow.
+        """
+        key = (job["wdlfile"],) + tuple(
+            job[option] for option in BOOLEAN_OPTIONS + STRING_OPTIONS)
+        values = self.cached_values(key)
+        if values is not None:
+            return values
+        with self.collect_lock:
+            # Another request may have collected them in the mean time.
+            values = self.cached_values(key)
+            if values is not None:
+                return values
+            import_index = job.get("import_index")
+            if import_index is not None and import_index.refresh():
+                # The imports of any of the workflows may resolve to
+                # different files now.
+                with self.lock:
+                    self.values_cache.clear()
+            states = {path: file_state(path)
+                      for path in job_dependencies(job)}
+            # Sorted once, rather than for every request.
+            values = with_sorted_views(job_values(job))
+            with self.lock:
+                self.values_cache[key] = (states, values)
+                self.values_cache.move_to_end(key)
+                while len(self.values_cache) > self.max_cached_values:
+                    self.values_cache.popitem(last=False)
+            return values
+
+    def document(self, job: Dict[str, Any]) -> str:
+        """
+        :param job: The job for a workflow, see job.
+        :return: The rendered documentation for the workflow.
+        """
+        values = self.values(job)
+        return "".join(job_template(job, job["template"]).generate(
+            drop_nones(values), extra=load_extra(job["extra"])))
+
+
+class DocumentationRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves GET /docs/<path> with the rendered documentation and
+    GET /values/<path> with the collected values (as JSON) for the WDL
+    file at <path>, relative to the root of the server.
+    """
+    server: Union[DocumentationServer, UnixDocumentationServer]
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        kind, _, relative_path = url.path.lstrip("/").partition("/")
+        if kind not in ("docs", "values"):
+            self.respond(404, "Not found. Use /docs/<path> or "
+                              "/values/<path>.\n")
+            return
+        service = self.server.service
+        try:
+            job = service.job(unquote(relative_path),
+                              parse_qs(url.query, keep_blank_values=True))
+        except FileNotFoundError:
+            self.respond(404, f"No such WDL file: {relative_path}\n")
+            return
+        except ValueError as e:
+            self.respond(400, f"{e}\n")
+            return
+        try:
+            if kind == "values":
+                body = json.dumps(values_to_json(service.values(job)))
+                content_type = "application/json"
+            else:
+                body = service.document(job)
+                content_type = "text/plain; charset=utf-8"
+        except ValueError as e:
+            self.respond(422, f"{e}\n")
+        except Exception as e:
+            self.respond(500, f"{type(e).__name__}: {e}\n")
+        else:
+            self.respond(200, body, content_type)
+
+    def respond(self, status: int, body: str,
+                content_type: str = "text/plain; charset=utf-8"):
+        """
+        :param status: The HTTP status code.
+        :param body: The body of the response.
+        :param content_type: The content type of the body.
+        """
+        encoded = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def address_string(self) -> str:
+        # Unix sockets have no client address.
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def log_message(self, format: str, *args):
+        print(f"{self.address_string()} - {format % args}", file=sys.stderr)
+
+
+class DocumentationServer(http.server.ThreadingHTTPServer):
+    """A documentation server on a TCP port."""
+    def __init__(self, address: Tuple[str, int],
+                 service: DocumentationService):
+        self.service = service
+        super().__init__(address, DocumentationRequestHandler)
+
+
+class UnixDocumentationServer(socketserver.ThreadingMixIn,
+                              socketserver.UnixStreamServer):
+    """A documentation server on a unix socket."""
+    daemon_threads = True
+
+    def __init__(self, address: str, service: DocumentationService):
+        self.service = service
+        super().__init__(address, DocumentationRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def create_server(address: str, service: DocumentationService
+                  ) -> Union[DocumentationServer, UnixDocumentationServer]:
+    """
+    :param address: PORT, HOST:PORT or unix:PATH.
+    :param service: The service handling the requests.
+    :return: A server listening on the address.
+    """
+    parsed = parse_address(address)
+    if isinstance(parsed, str):
+        return UnixDocumentationServer(parsed, service)
+    return DocumentationServer(parsed, service)
+
+
+def serve(address: str, root: Path, defaults: Dict[str, Any]):
+    """
+    Serve documentation until interrupted.
+    :param address: PORT, HOST:PORT or unix:PATH.
+    :param root: Only WDL files below this directory are served.
+    :param defaults: The options for the workflows, see
+    wdl_aid.job_defaults.
+    """
+    service = DocumentationService(root, defaults)
+    service.warm_up()
+    with create_server(address, service) as server:
+        print(f"Serving documentation for {service.root} on {address}",
+              file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,152 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+SHARD_MODES = ("category", "call", "both")
+# The file, in the directory containing the shards, recording what each
+# shard was rendered from.
+SHARD_STATE_FILE = ".shards.json"
+
+
+def entry_call(name: str) -> str:
+    """
+    :param name: The fully qualified name of an input or output.
+    :return: The (outermost) call the input or output belongs to, or the
+    workflow's name if it belongs to the workflow itself.
+    """
+    parts = name.split(".")
+    return parts[1] if len(parts) > 2 else parts[0]
+
+
+def shard_name(parts: Tuple[str, ...]) -> str:
+    """
+    :param parts: The call and/or category of a shard.
+    :return: A name for the shard, which is safe to use in file names.
+    """
+    return re.sub(r"[^\w.-]", "_", "-".join(parts))
+
+
+def shard_values(values: Dict[str, Any], shard_by: str,
+                 max_entries: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Split the values collected from a workflow into smaller sets of values,
+    each of which can be rendered as a page of its own.
+    :param values: The values collected from a workflow.
+    :param shard_by: How to split the inputs and outputs: by "category"
+    (all outputs end up in a shard named "outputs"), by "call" (the
+    outermost call they belong to) or "both".
+    :param max_entries: The maximum number of inputs and outputs in a
+    shard. Larger shards are split into numbered pages.
+    :return: The names and values of the shards, in order. The values are
+    a copy of the given values with only the inputs and outputs of the
+    shard.
+    """
+    if shard_by not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode: '{shard_by}'. Expected one "
+                         f"of {', '.join(SHARD_MODES)}.")
+    if max_entries < 1:
+        raise ValueError(f"The shard size should be at least 1, got "
+                         f"{max_entries}.")
+    # (call and/or category) -> [(kind, category, entry)]
+    groups: Dict[Tuple[str, ...], List[Tuple[str, str, Any]]] = {}
+    for kind in ("inputs", "outputs"):
+        for category, entries in values[kind].items():
+            for entry in entries:
+                category_part = category if kind == "inputs" else "outputs"
+                if shard_by == "category":
+                    key = (category_part,)
+                elif shard_by == "call":
+                    key = (entry_call(entry.name),)
+                else:
+                    key = (entry_call(entry.name), category_part)
+                groups.setdefault(key, []).append((kind, category, entry))
+    keys = list(groups)
+    if shard_by == "both":
+        # Keep the shards of each call together.
+        call_order = {}
+        for key in keys:
+            call_order.setdefault(key[0], len(call_order))
+        keys.sort(key=lambda key: call_order[key[0]])
+    shards = []
+    # lowercased name -> key, as file systems may be case insensitive.
+    names: Dict[str, Tuple[str, ...]] = {}
+    for key in keys:
+        group = groups[key]
+        group.sort(key=lambda item: (item[0], item[2].name))
+        pages = [group[start:start + max_entries]
+                 for start in range(0, len(group), max_entries)]
+        for number, page in enumerate(pages, start=1):
+            parts = key + ((str(number),) if len(pages) > 1 else ())
+            name = shard_name(parts)
+            if name.lower() in names:
+                raise ValueError(
+                    f"The shards for {'/'.join(names[name.lower()])} and "
+                    f"{'/'.join(parts)} would both be written to '{name}'. "
+                    f"Rename one of the categories or calls.")
+            names[name.lower()] = parts
+            shard = dict(values, inputs={}, outputs={})
+            for kind, category, entry in page:
+                shard[kind].setdefault(category, []).append(entry)
+            shards.append((name, shard))
+    return shards
+
+
+class ShardState(object):
+    """
+    Records a digest of what each shard in a directory was rendered from,
+    so unchanged shards do not need to be rendered again.
+    """
+    def __init__(self, directory: Path):
+        """
+        :param directory: The directory containing the shards.
+        """
+        self.path = directory / SHARD_STATE_FILE
+        try:
+            with self.path.open("r") as state_file:
+                self.digests: Dict[str, str] = json.load(state_file)
+        except (FileNotFoundError, ValueError):
+            self.digests = {}
+
+    def is_up_to_date(self, shard_file: Path, digest: str) -> bool:
+        """
+        :param shard_file: The file a shard is rendered to.
+        :param digest: The digest of what the shard is rendered from.
+        :return: Whether the file exists and was rendered from the same.
+        """
+        return (self.digests.get(shard_file.name) == digest and
+                shard_file.exists())
+
+    def update(self, digests: Dict[str, str]):
+        """
+        Record the shards which were rendered, and remove the files of
+        shards which no longer exist.
+        :param digests: The file names and digests of all current shards.
+        """
+        for name in set(self.digests) - set(digests):
+            (self.path.parent / name).unlink(missing_ok=True)
+        self.digests = digests
+        # Imported here, as wdl_aid.wdl_aid imports this module.
+        from wdl_aid.wdl_aid import write_atomically
+        write_atomically(self.path, [json.dumps(digests, indent=1)])
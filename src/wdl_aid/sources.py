@@ -0,0 +1,410 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from wdl_aid import lazy_import
+
+WDL = lazy_import("WDL")
+
+if TYPE_CHECKING:
+    import asyncio
+
+IMPORT_PATTERN = re.compile(r"""^\s*import\s+(["'])(.+?)\1""", re.MULTILINE)
+# The number of seconds to wait for a remote WDL file.
+FETCH_TIMEOUT = 60
+# The version of the format of persisted import indexes.
+IMPORT_INDEX_VERSION = 1
+# The extension of the files included in import indexes.
+WDL_EXTENSION = ".wdl"
+
+
+def is_remote(uri: str) -> bool:
+    return uri.startswith("http://") or uri.startswith("https://")
+
+
+def write_atomically(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w") as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class ImportIndex(object):
+    """
+    An index of the WDL files in the directories searched for imports,
+    mapping each relative import name to the file it resolves to. Without
+    it, resolving a relative import means checking for the file in every
+    directory, which is slow on (eg.) network filesystems. The index can be
+    persisted, in which case only the directories which were modified since
+    (according to their modification time) are scanned again.
+    """
+    def __init__(self, directories: List[str],
+                 index_file: Optional[Path] = None):
+        """
+        :param directories: The directories to search for imports, as
+        passed to WDL.load. As with miniwdl, later directories take
+        precedence.
+        :param index_file: A JSON file in which to persist the index. It is
+        read if it exists, and updated if any of the directories changed.
+        """
+        self.directories = [os.path.abspath(directory)
+                            for directory in directories]
+        self.index_file = index_file
+        # directory -> {"directories": {relative path: mtime_ns},
+        #               "files": [relative path]}
+        self.trees: Dict[str, Dict[str, Any]] = {}
+        # relative import name -> absolute path
+        self.names: Dict[str, str] = {}
+        self.refresh()
+
+    @staticmethod
+    def scan(directory: str) -> Dict[str, Any]:
+        """
+        :param directory: A directory to search for imports.
+        :return: The modification times of the directory and its
+        subdirectories, and the WDL files in them.
+        """
+        tree = {"directories": {}, "files": []}
+        for root, _, files in os.walk(directory):
+            relative_root = os.path.relpath(root, directory)
+            tree["directories"][relative_root] = os.stat(root).st_mtime_ns
+            tree["files"].extend(
+                os.path.normpath(os.path.join(relative_root, name))
+                for name in files if name.endswith(WDL_EXTENSION))
+        return tree
+
+    @staticmethod
+    def is_up_to_date(directory: str, tree: Dict[str, Any]) -> bool:
+        """
+        :param directory: A directory to search for imports.
+        :param tree: The tree previously scanned for the directory.
+        :return: Whether none of the (sub)directories were modified since.
+        Adding, removing or renaming files or subdirectories modifies the
+        directory containing them.
+        """
+        try:
+            return all(
+                os.stat(os.path.join(directory, relative_path)).st_mtime_ns
+                == mtime_ns
+                for relative_path, mtime_ns in tree["directories"].items())
+        except OSError:
+            return False
+
+    def read(self) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: The trees stored in the index file, if any.
+        """
+        if self.index_file is None:
+            return {}
+        try:
+            with self.index_file.open("r") as index_file:
+                index = json.load(index_file)
+            if index.get("version") == IMPORT_INDEX_VERSION:
+                return index["trees"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def refresh(self) -> bool:
+        """
+        Scan the directories which changed since they were last scanned (or
+        since the index was persisted, when refreshed for the first time)
+        and update the persisted index.
+        :return: Whether any of the directories changed.
+        """
+        known = self.trees or self.read()
+        changed = False
+        self.trees = {}
+        for directory in self.directories:
+            tree = known.get(directory)
+            if tree is None or not self.is_up_to_date(directory, tree):
+                tree = self.scan(directory)
+                changed = True
+            self.trees[directory] = tree
+        self.names = {}
+        for directory in self.directories:
+            for relative_path in self.trees[directory]["files"]:
+                self.names[relative_path] = os.path.join(directory,
+                                                         relative_path)
+        if self.index_file is not None and changed:
+            # Trees of directories no longer searched are kept, as they may
+            # be searched by other runs sharing the index.
+            stored = self.read()
+            stored.update(self.trees)
+            write_atomically(self.index_file, json.dumps(
+                {"version": IMPORT_INDEX_VERSION, "trees": stored}))
+        return changed
+
+    def lookup(self, uri: str) -> Optional[str]:
+        """
+        :param uri: A relative import.
+        :return: The file the import resolves to in the directories or None
+        if it is not in the index. The file may have been removed since the
+        index was refreshed.
+        """
+        return self.names.get(os.path.normpath(uri))
+
+
+def resolve_import(uri: str, path: List[str],
+                   importer_abspath: Optional[str],
+                   import_index: Optional[ImportIndex] = None) -> str:
+    """
+    Mirrors miniwdl's resolution of imports, but only needs the path of
+    the importing document, so imports can be resolved before that
+    document is parsed. Relative imports in remote documents are resolved
+    relative to the URI of the document.
+    :param uri: The (possibly relative) path or URI as given in the import
+    statement (or to WDL.load).
+    :param path: Directories to search for relative imports.
+    :param importer_abspath: The absolute path or URI of the importing
+    document, if any.
+    :param import_index: The index of the directories in path, if any.
+    Imports which are not in the directory of the importing document
+    are then looked up in the index, rather than searched for.
+    :return: The absolute path or URI of the imported document.
+    """
+    import urllib.parse  # Only needed for remote documents.
+    if is_remote(uri):
+        return uri
+    if importer_abspath is not None and is_remote(importer_abspath):
+        return urllib.parse.urljoin(importer_abspath, uri)
+    if uri.startswith("file://"):
+        uri = uri[7:]
+    if os.path.isabs(uri):
+        candidates = [os.path.abspath(uri)]
+    elif import_index is not None:
+        candidate = os.path.abspath(os.path.join(
+            os.path.dirname(importer_abspath)
+            if importer_abspath is not None else os.getcwd(), uri))
+        if os.path.isfile(candidate):
+            return candidate
+        indexed = import_index.lookup(uri)
+        if indexed is not None and os.path.isfile(indexed):
+            return indexed
+        # Not a WDL file, outside of the indexed directories or moved since
+        # the index was refreshed.
+        candidates = [os.path.abspath(os.path.join(directory, uri))
+                      for directory in reversed(path)]
+    else:
+        # As miniwdl does, the directory of the importing document (or the
+        # working directory) takes precedence over the search path.
+        directories = path + [os.path.dirname(importer_abspath)
+                              if importer_abspath is not None
+                              else os.getcwd()]
+        candidates = [os.path.abspath(os.path.join(directory, uri))
+                      for directory in reversed(directories)]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), uri)
+
+
+def fetch(uri: str) -> str:
+    """
+    :param uri: The URI of a remote WDL file.
+    :return: The contents of the file.
+    """
+    import urllib.request  # Slow to import and only needed for remote files.
+    with urllib.request.urlopen(uri, timeout=FETCH_TIMEOUT) as response:
+        return response.read().decode("utf-8")
+
+
+def read_local(path: str) -> str:
+    with open(path, "r") as handle:
+        return handle.read()
+
+
+class SourceMirror(object):
+    """
+    A content-addressed local copy of WDL files. Remote files are only
+    fetched once, after which they are always read from the mirror. Local
+    files are read from the mirror as long as their size and modification
+    time did not change, which avoids reading them from slow (eg. network)
+    filesystems. The mirror directory may be shared between concurrent
+    processes: everything is written atomically.
+    """
+    def __init__(self, directory: Path, offline: bool = False):
+        """
+        :param directory: The directory in which the copies are stored.
+        :param offline: Never fetch remote files. Remote files which are
+        not in the mirror can not be read.
+        """
+        self.directory = Path(directory)
+        self.offline = offline
+
+    def object_path(self, digest: str) -> Path:
+        return self.directory / "objects" / f"{digest}.wdl"
+
+    def record_path(self, uri: str) -> Path:
+        digest = hashlib.sha256(uri.encode("utf-8")).hexdigest()
+        return self.directory / "uris" / f"{digest}.json"
+
+    @staticmethod
+    def file_state(uri: str) -> Optional[List[int]]:
+        """
+        :param uri: The absolute path or URI of a WDL file.
+        :return: The size and modification time of a local file, None for
+        remote files.
+        """
+        if is_remote(uri):
+            return None
+        stat = os.stat(uri)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def lookup(self, uri: str, state: Optional[List[int]]) -> Optional[str]:
+        """
+        :param uri: The absolute path or URI of a WDL file.
+        :param state: The current state of the file, see file_state.
+        :return: The mirrored contents of the file or None if the file is
+        not mirrored or changed since.
+        """
+        try:
+            with self.record_path(uri).open("r") as record_file:
+                record = json.load(record_file)
+            if record["uri"] != uri or record["state"] != state:
+                return None
+            with self.object_path(record["digest"]).open("r") as handle:
+                source_text = handle.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        # Guard against partially removed or corrupted mirrors.
+        if hashlib.sha256(
+                source_text.encode("utf-8")).hexdigest() != record["digest"]:
+            return None
+        return source_text
+
+    def store(self, uri: str, state: Optional[List[int]], source_text: str):
+        """
+        :param uri: The absolute path or URI of a WDL file.
+        :param state: The state of the file, see file_state.
+        :param source_text: The contents of the file.
+        """
+        digest = hashlib.sha256(source_text.encode("utf-8")).hexdigest()
+        object_path = self.object_path(digest)
+        if not object_path.exists():
+            write_atomically(object_path, source_text)
+        write_atomically(self.record_path(uri), json.dumps(
+            {"uri": uri, "state": state, "digest": digest}))
+
+    def read(self, uri: str) -> str:
+        """
+        :param uri: The absolute path or URI of a WDL file.
+        :return: The contents of the file, from the mirror if available.
+        """
+        state = self.file_state(uri)
+        source_text = self.lookup(uri, state)
+        if source_text is None:
+            if state is None and self.offline:
+                raise ValueError(f"{uri} is not available in the mirror "
+                                 f"and can not be fetched in offline mode.")
+            source_text = fetch(uri) if state is None else read_local(uri)
+            self.store(uri, state, source_text)
+        return source_text
+
+
+class ImportPrefetcher(object):
+    """
+    A read_source routine for miniwdl (see WDL.load) which, whenever a
+    document is read, starts reading all documents it imports
+    concurrently, rather than one after another as they are parsed. Remote
+    documents are fetched as well. A new instance should be used for each
+    load.
+    """
+    def __init__(self, mirror: Optional[SourceMirror] = None,
+                 import_index: Optional[ImportIndex] = None):
+        """
+        :param mirror: The mirror to read the documents from, if any.
+        :param import_index: The index of the directories searched for
+        imports, if any, see resolve_import.
+        """
+        self.mirror = mirror
+        self.import_index = import_index
+        # (uri, importer abspath) -> read
+        self.reads: Dict[Tuple[str, Optional[str]], asyncio.Future] = {}
+
+    async def __call__(self, uri: str, path: List[str],
+                       importer: Optional[WDL.Document]
+                       ) -> WDL.ReadSourceResult:
+        return await self.read(
+            uri, path, importer.pos.abspath if importer is not None else None)
+
+    def read(self, uri: str, path: List[str],
+             importer_abspath: Optional[str]) -> asyncio.Future:
+        """
+        :param uri: The path or URI as given in the import statement.
+        :param path: Directories to search for relative imports.
+        :param importer_abspath: The absolute path or URI of the importing
+        document, if any.
+        :return: The (possibly already started) read of the document.
+        """
+        import asyncio  # Not imported at the top, as it is slow to import.
+        key = (uri, importer_abspath)
+        future = self.reads.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self.read_and_prefetch(uri, path, importer_abspath))
+            # Errors are only reported if the document is actually needed.
+            future.add_done_callback(
+                lambda done: done.cancelled() or done.exception())
+            self.reads[key] = future
+        return future
+
+    def read_source(self, uri: str, path: List[str],
+                    importer_abspath: Optional[str]
+                    ) -> WDL.ReadSourceResult:
+        """
+        Blocking counterpart of read, which actually reads the document.
+        """
+        abspath = resolve_import(uri, path, importer_abspath,
+                                 self.import_index)
+        if self.mirror is not None:
+            source_text = self.mirror.read(abspath)
+        elif is_remote(abspath):
+            source_text = fetch(abspath)
+        else:
+            source_text = read_local(abspath)
+        return WDL.ReadSourceResult(source_text=source_text, abspath=abspath)
+
+    async def read_and_prefetch(self, uri: str, path: List[str],
+                                importer_abspath: Optional[str]
+                                ) -> WDL.ReadSourceResult:
+        import asyncio
+        # Reading is blocking, so it is done in the default thread pool.
+        result = await asyncio.get_event_loop().run_in_executor(
+            None, self.read_source, uri, path, importer_abspath)
+        for match in IMPORT_PATTERN.finditer(result.source_text):
+            self.read(match.group(2), path, result.abspath)
+        return result
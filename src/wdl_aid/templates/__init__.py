@@ -0,0 +1,103 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+from importlib.metadata import version
+from importlib.resources import files
+from pathlib import Path
+from typing import Optional
+
+from wdl_aid import lazy_import
+
+jinja2 = lazy_import("jinja2")
+
+DEFAULT_TEMPLATE = files("wdl_aid.templates").joinpath(
+    "default.md.j2").read_text(encoding="utf-8")
+DEFAULT_TEMPLATE_NAME = "wdl_aid:default.md.j2"
+# Used to render the index of sharded documentation.
+INDEX_TEMPLATE = files("wdl_aid.templates").joinpath(
+    "index.md.j2").read_text(encoding="utf-8")
+INDEX_TEMPLATE_NAME = "wdl_aid:index.md.j2"
+PRECOMPILED_MODULE = "wdl_aid.templates.default_md_j2"
+
+
+def jinja2_version() -> str:
+    """
+    :return: The major and minor version of the installed jinja2.
+    """
+    return ".".join(version("jinja2").split(".")[:2])
+
+
+def source_digest(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def compile_default_template() -> str:
+    """
+    Compile the default template to python code, the same way jinja2's
+    Environment.compile_templates does.
+    :return: The contents of the precompiled default template module.
+    """
+    code = jinja2.Environment().compile(
+        DEFAULT_TEMPLATE, DEFAULT_TEMPLATE_NAME, None, raw=True,
+        defer_init=True)
+    return (f"# flake8: noqa\n"
+            f"# Generated from default.md.j2 using "
+            f"'python -m wdl_aid.templates', do not edit.\n"
+            f"JINJA2_VERSION = {jinja2_version()!r}\n"
+            f"SOURCE_SHA256 = {source_digest(DEFAULT_TEMPLATE)!r}\n"
+            f"{code}\n")
+
+
+def load_precompiled_default_template(environment: jinja2.Environment
+                                      ) -> Optional[jinja2.Template]:
+    """
+    :param environment: The environment the template will belong to.
+    :return: The default template, from the precompiled module shipped
+    with WDL-AID, or None if that module is outdated or was compiled with
+    an incompatible version of jinja2.
+    """
+    try:
+        spec = importlib.util.find_spec(PRECOMPILED_MODULE)
+        code = spec.loader.get_code(PRECOMPILED_MODULE)
+        namespace = {"environment": environment,
+                     "__file__": code.co_filename}
+        exec(code, namespace)
+    except Exception:
+        return None
+    if (namespace.get("JINJA2_VERSION") != jinja2_version() or
+            namespace.get("SOURCE_SHA256") !=
+            source_digest(DEFAULT_TEMPLATE)):
+        return None
+    return environment.template_class.from_module_dict(
+        environment, namespace, environment.globals)
+
+
+def write_precompiled_default_template():
+    """
+    (Re)generate the precompiled default template module. This should be
+    done whenever the default template is changed.
+    """
+    module_path = Path(__file__).parent / "default_md_j2.py"
+    module_path.write_text(compile_default_template())
@@ -0,0 +1,199 @@
+# flake8: noqa
+# Generated from default.md.j2 using 'python -m wdl_aid.templates', do not edit.
+JINJA2_VERSION = '3.1'
+SOURCE_SHA256 = 'f66d97626bd1bdeed61f86581d8ccee732920049fbb974b968dd6cae59d61c3c'
+from jinja2.runtime import LoopContext, Macro, Markup, Namespace, TemplateNotFound, TemplateReference, TemplateRuntimeError, Undefined, escape, identity, internalcode, markup_join, missing, str_join
+name = 'wdl_aid:default.md.j2'
+
+def root(context, missing=missing):
+    resolve = context.resolve_or_missing
+    undefined = environment.undefined
+    concat = environment.concat
+    cond_expr_undefined = Undefined
+    if 0: yield None
+    l_0_workflow_name = resolve('workflow_name')
+    l_0_shard = resolve('shard')
+    l_0_workflow_meta = resolve('workflow_meta')
+    l_0_inputs = resolve('inputs')
+    l_0_sorted_inputs = resolve('sorted_inputs')
+    l_0_sorted_outputs = resolve('sorted_outputs')
+    l_0_workflow_authors = resolve('workflow_authors')
+    l_0_workflow_all_authors = resolve('workflow_all_authors')
+    l_0_sorted_workflow_authors = resolve('sorted_workflow_authors')
+    l_0_wdl_aid_version = resolve('wdl_aid_version')
+    try:
+        t_1 = environment.filters['length']
+    except KeyError:
+        @internalcode
+        def t_1(*unused):
+            raise TemplateRuntimeError("No filter named 'length' found.")
+    try:
+        t_2 = environment.tests['defined']
+    except KeyError:
+        @internalcode
+        def t_2(*unused):
+            raise TemplateRuntimeError("No test named 'defined' found.")
+    try:
+        t_3 = environment.tests['none']
+    except KeyError:
+        @internalcode
+        def t_3(*unused):
+            raise TemplateRuntimeError("No test named 'none' found.")
+    pass
+    yield '# '
+    yield str((undefined(name='workflow_name') if l_0_workflow_name is missing else l_0_workflow_name))
+    if t_2((undefined(name='shard') if l_0_shard is missing else l_0_shard)):
+        pass
+        yield ': '
+        yield str(environment.getattr((undefined(name='shard') if l_0_shard is missing else l_0_shard), 'name'))
+    yield '\n'
+    if t_2((undefined(name='shard') if l_0_shard is missing else l_0_shard)):
+        pass
+        yield '[Index]('
+        yield str(environment.getattr((undefined(name='shard') if l_0_shard is missing else l_0_shard), 'index'))
+        yield ')'
+    else:
+        pass
+        yield str(environment.getattr((undefined(name='workflow_meta') if l_0_workflow_meta is missing else l_0_workflow_meta), 'description'))
+    yield '\n\n## Inputs\n'
+    if t_2(environment.getattr((undefined(name='inputs') if l_0_inputs is missing else l_0_inputs), 'required')):
+        pass
+        yield '\n### Required inputs\n'
+        for l_1_ri in environment.getattr((undefined(name='sorted_inputs') if l_0_sorted_inputs is missing else l_0_sorted_inputs), 'required'):
+            _loop_vars = {}
+            pass
+            yield '<p name="'
+            yield str(environment.getattr(l_1_ri, 'name'))
+            yield '">\n        <b>'
+            yield str(environment.getattr(l_1_ri, 'name'))
+            yield '</b><br />\n        <i>'
+            yield str(environment.getattr(l_1_ri, 'type'))
+            yield ' &mdash; Default: '
+            yield str(environment.getattr(l_1_ri, 'default'))
+            yield '</i><br />\n        '
+            yield str(environment.getattr(l_1_ri, 'description'))
+            yield '\n</p>\n'
+        l_1_ri = missing
+    if t_2(environment.getattr((undefined(name='inputs') if l_0_inputs is missing else l_0_inputs), 'common')):
+        pass
+        yield '\n### Other common inputs\n'
+        for l_1_ci in environment.getattr((undefined(name='sorted_inputs') if l_0_sorted_inputs is missing else l_0_sorted_inputs), 'common'):
+            _loop_vars = {}
+            pass
+            yield '<p name="'
+            yield str(environment.getattr(l_1_ci, 'name'))
+            yield '">\n        <b>'
+            yield str(environment.getattr(l_1_ci, 'name'))
+            yield '</b><br />\n        <i>'
+            yield str(environment.getattr(l_1_ci, 'type'))
+            yield ' &mdash; Default: '
+            yield str(environment.getattr(l_1_ci, 'default'))
+            yield '</i><br />\n        '
+            yield str(environment.getattr(l_1_ci, 'description'))
+            yield '\n</p>\n'
+        l_1_ci = missing
+    if t_2(environment.getattr((undefined(name='inputs') if l_0_inputs is missing else l_0_inputs), 'advanced')):
+        pass
+        yield '\n### Advanced inputs\n<details>\n<summary> Show/Hide </summary>\n'
+        for l_1_ai in environment.getattr((undefined(name='sorted_inputs') if l_0_sorted_inputs is missing else l_0_sorted_inputs), 'advanced'):
+            _loop_vars = {}
+            pass
+            yield '<p name="'
+            yield str(environment.getattr(l_1_ai, 'name'))
+            yield '">\n        <b>'
+            yield str(environment.getattr(l_1_ai, 'name'))
+            yield '</b><br />\n        <i>'
+            yield str(environment.getattr(l_1_ai, 'type'))
+            yield ' &mdash; Default: '
+            yield str(environment.getattr(l_1_ai, 'default'))
+            yield '</i><br />\n        '
+            yield str(environment.getattr(l_1_ai, 'description'))
+            yield '\n</p>\n'
+        l_1_ai = missing
+        yield '</details>\n'
+    if t_2(environment.getattr((undefined(name='inputs') if l_0_inputs is missing else l_0_inputs), 'other')):
+        pass
+        yield '\n### Other inputs\n<details>\n<summary> Show/Hide </summary>\n'
+        for l_1_oi in environment.getattr((undefined(name='sorted_inputs') if l_0_sorted_inputs is missing else l_0_sorted_inputs), 'other'):
+            _loop_vars = {}
+            pass
+            yield '<p name="'
+            yield str(environment.getattr(l_1_oi, 'name'))
+            yield '">\n        <b>'
+            yield str(environment.getattr(l_1_oi, 'name'))
+            yield '</b><br />\n        <i>'
+            yield str(environment.getattr(l_1_oi, 'type'))
+            yield ' &mdash; Default: '
+            yield str(environment.getattr(l_1_oi, 'default'))
+            yield '</i><br />\n        '
+            yield str(environment.getattr(l_1_oi, 'description'))
+            yield '\n</p>\n'
+        l_1_oi = missing
+        yield '</details>\n'
+    if (t_1((undefined(name='sorted_outputs') if l_0_sorted_outputs is missing else l_0_sorted_outputs)) != 0):
+        pass
+        yield '\n## Outputs\n'
+        for l_1_oo in (undefined(name='sorted_outputs') if l_0_sorted_outputs is missing else l_0_sorted_outputs):
+            _loop_vars = {}
+            pass
+            yield '<p name="'
+            yield str(environment.getattr(l_1_oo, 'name'))
+            yield '">\n        <b>'
+            yield str(environment.getattr(l_1_oo, 'name'))
+            yield '</b><br />\n        <i>'
+            yield str(environment.getattr(l_1_oo, 'type'))
+            yield '</i><br />\n        '
+            yield str(environment.getattr(l_1_oo, 'description'))
+            yield '\n</p>\n'
+        l_1_oo = missing
+    if ((t_1((undefined(name='workflow_authors') if l_0_workflow_authors is missing else l_0_workflow_authors)) != 0) or (t_1((undefined(name='workflow_all_authors') if l_0_workflow_all_authors is missing else l_0_workflow_all_authors)) != 0)):
+        pass
+        yield '\n## Credits\n'
+    if (t_1((undefined(name='workflow_authors') if l_0_workflow_authors is missing else l_0_workflow_authors)) != 0):
+        pass
+        yield 'Workflow written by:\n'
+        for l_1_author in (undefined(name='sorted_workflow_authors') if l_0_sorted_workflow_authors is missing else l_0_sorted_workflow_authors):
+            _loop_vars = {}
+            pass
+            yield '- **'
+            yield str(environment.getattr(l_1_author, 'name'))
+            yield '**'
+            if (not t_3(environment.getattr(l_1_author, 'email'))):
+                pass
+                yield ' ('
+                yield str(environment.getattr(l_1_author, 'email'))
+                yield ')'
+            if (not t_3(environment.getattr(l_1_author, 'email'))):
+                pass
+                yield ' -- *('
+                yield str(environment.getattr(l_1_author, 'organization'))
+                yield ')*'
+            yield '\n'
+        l_1_author = missing
+    if (t_1((undefined(name='workflow_all_authors') if l_0_workflow_all_authors is missing else l_0_workflow_all_authors)) != 0):
+        pass
+        yield '\nTasks and subworkflows written by:\n'
+        for l_1_author in (undefined(name='workflow_all_authors') if l_0_workflow_all_authors is missing else l_0_workflow_all_authors):
+            _loop_vars = {}
+            pass
+            yield '- **'
+            yield str(environment.getattr(l_1_author, 'name'))
+            yield '**'
+            if (not t_3(environment.getattr(l_1_author, 'email'))):
+                pass
+                yield ' ('
+                yield str(environment.getattr(l_1_author, 'email'))
+                yield ')'
+            if (not t_3(environment.getattr(l_1_author, 'email'))):
+                pass
+                yield ' -- *('
+                yield str(environment.getattr(l_1_author, 'organization'))
+                yield ')*'
+            yield '\n'
+        l_1_author = missing
+    yield '\n<hr />\n\n> Generated using WDL AID ('
+    yield str((undefined(name='wdl_aid_version') if l_0_wdl_aid_version is missing else l_0_wdl_aid_version))
+    yield ')\n'
+
+blocks = {}
+debug_info = '1=40&2=46&5=55&7=58&8=62&9=64&10=66&11=70&16=73&18=76&19=80&20=82&21=84&22=88&27=91&31=94&32=98&33=100&34=102&35=106&41=110&45=113&46=117&47=119&48=121&49=125&55=129&57=132&58=136&59=138&60=140&61=142&66=145&70=148&72=151&73=155&74=157&75=160&77=162&78=165&83=169&85=172&86=176&87=178&88=181&90=183&91=186&97=191'
@@ -0,0 +1,150 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import contextlib
+import cProfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+# The Timings currently recording, see record_timings.
+RECORDERS: List["Timings"] = []
+
+
+class Timings(object):
+    """
+    The wall time and peak memory usage per phase (eg. "load" or "render"),
+    accumulated over all times a phase was entered.
+    """
+    def __init__(self, trace_memory: bool = True):
+        """
+        :param trace_memory: Whether to measure the peak memory usage of each
+        phase. This slows down the phases considerably.
+        """
+        self.trace_memory = trace_memory
+        self.phases: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, wall_time: float, peak_memory: int):
+        """
+        :param name: The name of the phase.
+        :param wall_time: The time spent in the phase, in seconds.
+        :param peak_memory: The peak memory allocated during the phase, in
+        bytes.
+        """
+        phase = self.phases.setdefault(
+            name, {"count": 0, "wall_time": 0.0, "peak_memory": 0})
+        phase["count"] += 1
+        phase["wall_time"] += wall_time
+        phase["peak_memory"] = max(phase["peak_memory"], peak_memory)
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: For each phase the number of times it was entered
+        ("count"), the total wall time in seconds ("wall_time") and the
+        peak memory in bytes ("peak_memory", only if memory was traced).
+        """
+        return {name: {key: value for key, value in phase.items()
+                       if key != "peak_memory" or self.trace_memory}
+                for name, phase in self.phases.items()}
+
+    def format(self) -> str:
+        """
+        :return: A table of the phases.
+        """
+        lines = [f"{'phase':<16}{'count':>6}{'wall time':>12}" +
+                 (f"{'peak memory':>14}" if self.trace_memory else "")]
+        for name, phase in self.phases.items():
+            lines.append(
+                f"{name:<16}{phase['count']:>6}"
+                f"{phase['wall_time'] * 1000:>9.1f} ms" +
+                (f"{phase['peak_memory'] / 1024 ** 2:>10.1f} MiB"
+                 if self.trace_memory else ""))
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def record_timings(trace_memory: bool = True) -> Iterator[Timings]:
+    """
+    Record the phases entered within this context.
+
+        with record_timings() as timings:
+            document_workflow(job)
+        print(timings.to_dict())
+
+    :param trace_memory: Whether to measure the peak memory usage of each
+    phase.
+    :return: The timings, filled in as phases are completed.
+    """
+    timings = Timings(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    RECORDERS.append(timings)
+    try:
+        yield timings
+    finally:
+        RECORDERS.remove(timings)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Time the code within this context as the given phase, if timings are
+    being recorded. Phases should not be nested.
+    :param name: The name of the phase.
+    """
+    if not RECORDERS:
+        yield
+        return
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall_time = time.perf_counter() - start
+        peak_memory = (tracemalloc.get_traced_memory()[1] - start_memory
+                       if tracing else 0)
+        for timings in RECORDERS:
+            timings.add(name, wall_time, peak_memory)
+
+
+@contextlib.contextmanager
+def profile(output_file: Path) -> Iterator[cProfile.Profile]:
+    """
+    Profile the code within this context using cProfile and write the
+    statistics to a file, which can be read using pstats (or eg.
+    snakeviz).
+    :param output_file: The file to write the statistics to.
+    :return: The profiler.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output_file)
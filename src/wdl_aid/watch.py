@@ -0,0 +1,166 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from wdl_aid.cache import import_closure
+
+
+def job_dependencies(job: Dict[str, Any]) -> Set[str]:
+    """
+    :param job: The options for a workflow, see wdl_aid.create_jobs.
+    :return: The absolute paths of the local files the documentation of
+    the workflow depends on: the WDL file, the files it imports, the
+    templates and the extra data.
+    """
+    closure = import_closure(job["wdlfile"], job.get("import_index"),
+                             job.get("mirror"))
+    dependencies = {path for path in closure
+                    if not (path.startswith("http://") or
+                            path.startswith("https://"))}
+    for option in ("template", "extra", "index_template"):
+        if job.get(option) is not None:
+            dependencies.add(os.path.abspath(job[option]))
+    for template_path, _ in job.get("renders") or []:
+        dependencies.add(os.path.abspath(template_path))
+    return dependencies
+
+
+def file_state(path: str) -> Optional[Tuple[int, int]]:
+    """
+    :param path: A file.
+    :return: The modification time and size of the file or None if it
+    does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Watcher(object):
+    """
+    Regenerates the documentation of workflows whenever any of the files
+    it depends on change. Changes are detected by polling the modification
+    times of these files. Only the documentation of the workflows affected
+    by a change is regenerated. Combined with the document cache and walk
+    memo used by wdl_aid.document_workflow, only the changed documents are
+    parsed again.
+    """
+    def __init__(self, jobs: List[Dict[str, Any]],
+                 document: Callable[[Dict[str, Any]], Optional[str]],
+                 debounce: float = 0.2):
+        """
+        :param jobs: The options for each workflow, see
+        wdl_aid.create_jobs.
+        :param document: The function used to (re)generate the
+        documentation for a job. Should return a description of the error
+        that occurred, if any.
+        :param debounce: The time in seconds files should remain unchanged
+        before the documentation is regenerated. This avoids regenerating
+        documentation for files which are still being written.
+        """
+        self.jobs = jobs
+        self.document = document
+        self.debounce = debounce
+        self.dependencies = [job_dependencies(job) for job in jobs]
+        self.state = self.snapshot()
+
+    def snapshot(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        return {path: file_state(path)
+                for path in set().union(*self.dependencies)}
+
+    def refresh_import_indexes(self) -> Set[int]:
+        """
+        Refresh the indexes of the directories searched for imports, if
+        any, as files added to or removed from these directories may
+        change how imports are resolved.
+        :return: The indices of the jobs of which the dependencies changed
+        as a result.
+        """
+        indexes = {id(job["import_index"]): job["import_index"]
+                   for job in self.jobs if job.get("import_index") is not None}
+        # All indexes are refreshed, rather than only up to the first one
+        # that changed.
+        if not any([index.refresh() for index in indexes.values()]):
+            return set()
+        affected = set()
+        for i, job in enumerate(self.jobs):
+            if job.get("import_index") is not None:
+                dependencies = job_dependencies(job)
+                if dependencies != self.dependencies[i]:
+                    self.dependencies[i] = dependencies
+                    affected.add(i)
+        return affected
+
+    def check(self) -> List[int]:
+        """
+        Regenerate the documentation for all jobs of which the dependencies
+        changed since the previous check.
+        :return: The indices of the jobs for which the documentation was
+        regenerated.
+        """
+        affected = self.refresh_import_indexes()
+        state = self.snapshot()
+        if state == self.state and len(affected) == 0:
+            return []
+        while True:
+            time.sleep(self.debounce)
+            settled_state = self.snapshot()
+            if settled_state == state:
+                break
+            state = settled_state
+        changed = {path for path in state
+                   if state[path] != self.state.get(path)}
+        regenerate = [i for i, dependencies in enumerate(self.dependencies)
+                      if len(dependencies & changed) > 0 or i in affected]
+        for i in regenerate:
+            job = self.jobs[i]
+            start = time.perf_counter()
+            error = self.document(job)
+            if error is None:
+                print(f"Regenerated documentation for {job['wdlfile']} in "
+                      f"{(time.perf_counter() - start) * 1000:.0f} ms.",
+                      file=sys.stderr)
+            else:
+                print(f"Failed to document {job['wdlfile']}:\n{error}\n",
+                      file=sys.stderr)
+            # The imports may have changed.
+            self.dependencies[i] = job_dependencies(job)
+        # Changes made while regenerating will be picked up by the next
+        # check, as the state from before regenerating is kept.
+        self.state = {path: state[path] if path in state
+                      else file_state(path)
+                      for path in set().union(*self.dependencies)}
+        return regenerate
+
+    def run(self, interval: float = 0.5):
+        """
+        Keep checking for changes, until interrupted.
+        :param interval: The time in seconds between checks.
+        """
+        while True:
+            self.check()
+            time.sleep(interval)
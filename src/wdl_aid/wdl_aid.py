@@ -18,20 +18,63 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from __future__ import annotations
+
 import argparse
+import collections.abc
+import concurrent.futures
+import contextlib
+import filecmp
+import functools
+import glob
+import hashlib
+import os
+import re
+import stat
+import sys
+import tempfile
+import weakref
 from pathlib import Path
-from typing import Any, Dict, List, Union, Tuple
-from pkg_resources import resource_string
+from typing import (Any, Callable, Dict, Hashable, Iterable, Iterator, List,
+                    Optional, Set, Union, Tuple)
 import json
 
-import WDL
-from jinja2 import Template
+from wdl_aid import __version__, lazy_import
+from wdl_aid.cache import ValuesCache, file_digest, import_closure, to_json
+from wdl_aid.loader import DocumentCache
+from wdl_aid.timing import phase, profile, record_timings
+from wdl_aid.watch import Watcher
+from wdl_aid.shard import SHARD_MODES, ShardState, shard_values
+from wdl_aid.sources import ImportIndex, ImportPrefetcher, SourceMirror
+from wdl_aid.templates import (DEFAULT_TEMPLATE, DEFAULT_TEMPLATE_NAME,
+                               INDEX_TEMPLATE, INDEX_TEMPLATE_NAME,
+                               load_precompiled_default_template)
+
 
-from wdl_aid import __version__
+# miniwdl and jinja2 are only imported once they are actually used, so
+# eg. --help and --version remain fast.
+WDL = lazy_import("WDL")
+jinja2 = lazy_import("jinja2")
 
 
-DEFAULT_TEMPLATE = resource_string("wdl_aid.templates",
-                                   "default.md.j2").decode("utf-8")
+# The options which may be set per workflow, eg. in a manifest file.
+JOB_OPTIONS = ("output", "template", "extra", "separate_required",
+               "category_key", "description_key", "fallback_description",
+               "fallback_description_to_object", "fallback_category",
+               "strict", "strict_inputs", "strict_outputs", "fast",
+               "format", "renders", "render_threads", "shard_by",
+               "shard_size", "index_template")
+PATH_OPTIONS = ("output", "template", "extra", "index_template")
+# The number of rendered template chunks to collect before writing.
+RENDER_BUFFER_SIZE = 64
+# The placeholders which may be used in output paths, see output_path.
+OUTPUT_PLACEHOLDER = re.compile(r"\{(workflow_name|stem|parent)\}")
+# The version of the schema of the JSON output, see docs/json-output.rst.
+# Increased whenever fields are removed or their meaning changes.
+JSON_SCHEMA_VERSION = 1
+# The maximum number of inputs and outputs on a page of sharded
+# documentation.
+DEFAULT_SHARD_SIZE = 200
 
 
 # Helper Functions
@@ -46,25 +89,167 @@ def wrap_in_list(x: Any) -> List:
         return [x]
 
 
+def hashable(value: Any) -> Hashable:
+    """
+    :param value: A value, possibly containing dictionaries and lists
+    (eg. an author object from a meta section).
+    :return: A hashable representation of the value. Equal values have
+    equal representations.
+    """
+    if isinstance(value, dict):
+        return frozenset((key, hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(hashable(item) for item in value)
+    return value
+
+
 def merge_dict_of_lists(original_dict: Dict[Any, List[Any]],
-                        values_to_add: Dict[Any, List[Any]]
+                        values_to_add: Dict[Any, List[Any]],
+                        index: Optional[Dict[Any, Set[Hashable]]] = None
                         ) -> Dict[Any, List[Any]]:
     """
     Given two dictionaries of lists merge these lists into a new dictionary.
     :param original_dict: The dictionary to add items to.
     :param values_to_add: The dictionary with the items to add.
+    :param index: The hashable representations of the items already in
+    original_dict, per key. Passing the same (initially empty) dictionary
+    to repeated merges into the same original_dict avoids rebuilding it
+    every time.
     :return: old with the new items added
     """
+    if index is None:
+        index = {}
     for key in values_to_add:
         if key in original_dict.keys():
+            if key not in index:
+                index[key] = {hashable(item) for item in original_dict[key]}
+            seen = index[key]
             for item in values_to_add[key]:
-                if item not in original_dict[key]:
+                hashed_item = hashable(item)
+                if hashed_item not in seen:
+                    seen.add(hashed_item)
                     original_dict[key].append(item)
         else:
             original_dict[key] = values_to_add[key][:]
+            index[key] = {hashable(item) for item in original_dict[key]}
     return original_dict
 
 
+# Entries
+class OutputEntry(collections.abc.Mapping):
+    """
+    An output as presented to the template. Slots are used rather than a
+    dictionary, as workflows may have tens of thousands of these. Fields
+    can be accessed both as attributes and as items, and entries can be
+    used as (read-only) mappings, like the dictionaries they replace.
+    """
+    __slots__ = ("name", "type", "description")
+    __hash__ = None  # Mutable, like the dictionaries these replace.
+    FIELDS = ("name", "type", "description")
+
+    def __init__(self, name: str, type: str, description: Any):
+        self.name = name
+        self.type = type
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]):
+        return cls(**entry)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.FIELDS
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(**{self.to_dict()!r})"
+
+
+class InputEntry(OutputEntry):
+    """
+    An input as presented to the template. Like an output, but with a
+    default value.
+    """
+    __slots__ = ("default",)
+    FIELDS = ("name", "type", "description", "default")
+
+    def __init__(self, name: str, type: str, description: Any,
+                 default: Optional[str]):
+        super().__init__(name, type, description)
+        self.default = default
+
+
+def restore_entries(entries: Dict[str, List[Dict[str, Any]]],
+                    entry_class: type) -> Dict[str, List[OutputEntry]]:
+    """
+    :param entries: Entries per category, as dictionaries (eg. as read
+    from a JSON file).
+    :param entry_class: InputEntry or OutputEntry.
+    :return: The entries per category, as entry objects.
+    """
+    return {category: [entry_class.from_dict(entry) for entry in entries]
+            for category, entries in entries.items()}
+
+
+def sort_key(value: Any) -> str:
+    """
+    :param value: An entry or author.
+    :return: The key to sort by: the name, case insensitively, like
+    jinja2's sort(attribute='name') filter.
+    """
+    if isinstance(value, OutputEntry):
+        name = value.name
+    elif isinstance(value, dict):
+        name = value.get("name")
+    else:
+        name = value
+    return str(name).lower() if name is not None else ""
+
+
+def sorted_views(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    :param values: The values collected from a workflow.
+    :return: Sorted versions of some of the values, so templates do not
+    need to sort them:
+        - "sorted_inputs": For each category, the inputs sorted by name.
+        - "sorted_outputs": The outputs of all categories, sorted by name.
+        - "sorted_workflow_authors": The workflow's authors, sorted by
+          name.
+    """
+    return {"sorted_inputs": {category: sorted(entries, key=sort_key)
+                              for category, entries
+                              in values.get("inputs", {}).items()},
+            "sorted_outputs": sorted(
+                (entry for entries in values.get("outputs", {}).values()
+                 for entry in entries), key=sort_key),
+            "sorted_workflow_authors": sorted(
+                values.get("workflow_authors", []), key=sort_key)}
+
+
+def with_sorted_views(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    :param values: The values to render a template with, eg. collected from
+    a workflow, read from the JSON output or constructed by hand.
+    :return: The values with the sorted views (see sorted_views) added, if
+    these are not present yet. The given values are not modified.
+    """
+    if "sorted_inputs" in values:
+        return values
+    return dict(values, **sorted_views(values))
+
+
 # Data gathering functions
 def fully_qualified_inputs(inputs: WDL.Env.Bindings,
                            namespace: str) -> List[Tuple[str,
@@ -95,6 +280,125 @@ def fully_qualified_parameter_meta(parameter_meta: Dict[str, Any],
     return qualified_parameter_meta
 
 
+def workflow_calls(node: Union[WDL.Workflow, WDL.Conditional, WDL.Scatter]
+                   ) -> List[WDL.Tree.Call]:
+    """
+    :param node: A node from a workflow.
+    :return: All calls made in the node's body, including those nested
+    inside of conditionals and scatters, in order of appearance.
+    """
+    calls = []
+    bodies = [iter(node.body)]
+    while len(bodies) > 0:
+        element = next(bodies[-1], None)
+        if element is None:
+            bodies.pop()
+        elif isinstance(element, WDL.Tree.Call):
+            calls.append(element)
+        elif isinstance(element, (WDL.Tree.Conditional, WDL.Tree.Scatter)):
+            bodies.append(iter(element.body))
+    return calls
+
+
+class CalleeMemo(object):
+    """
+    The information gathered by walk_workflow for each task and workflow,
+    with names relative to the task or workflow. Tasks and workflows
+    (which are not hashable) are looked up by identity and their entries
+    are dropped once they are garbage collected. Because loaded documents
+    are never modified, a memo may be shared between workflows and runs,
+    eg. together with a DocumentCache.
+    """
+    def __init__(self, persistent: bool = True):
+        """
+        :param persistent: Whether the memo may outlive the tasks and
+        workflows in it. If so, entries are dropped once their task or
+        workflow is garbage collected, as its id may be reused. A memo used
+        for a single walk does not need this, which avoids registering a
+        finalizer (which keeps the entry alive) for every task and
+        workflow.
+        """
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self.persistent = persistent
+
+    def __contains__(self, callee: Any) -> bool:
+        return id(callee) in self.entries
+
+    def __getitem__(self, callee: Any) -> Dict[str, Any]:
+        return self.entries[id(callee)]
+
+    def __setitem__(self, callee: Any, collected: Dict[str, Any]):
+        if self.persistent and id(callee) not in self.entries:
+            weakref.finalize(callee, self.entries.pop, id(callee), None)
+        self.entries[id(callee)] = collected
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def walk_workflow(node: Union[WDL.Workflow, WDL.Conditional, WDL.Scatter],
+                  namespace: str, memo: Optional[CalleeMemo] = None
+                  ) -> Dict[str, Any]:
+    """
+    Gather the parameter_meta and meta information of a node and
+    everything it calls in a single, non-recursive traversal. The
+    information of each called task or sub-workflow is only gathered
+    once, regardless of how often it is called.
+    :param node: A node from a workflow.
+    :param namespace: The node's fully qualified namespace name.
+    :param memo: The information already gathered for tasks and
+    workflows in earlier walks, which will be extended.
+    :return: A dictionary with the following keys:
+        - "parameter_meta": A dictionary with all the parameter meta
+          values, using fully qualified namespaces as keys.
+        - "exclude": A list of inputs to be excluded.
+        - "authors": A list of all authors mentioned in any called
+          workflow or task.
+    """
+    # The node (and so everything it calls) outlives a temporary memo.
+    gathered = memo if memo is not None else CalleeMemo(persistent=False)
+    to_visit = [(node, None)]
+    while len(to_visit) > 0:
+        callee, calls = to_visit.pop()
+        if callee in gathered:
+            continue
+        if calls is None:
+            calls = (workflow_calls(callee) if hasattr(callee, "body")
+                     else [])
+            unvisited = [call.callee for call in calls
+                         if call.callee not in gathered]
+            if len(unvisited) > 0:
+                # Revisit this callee once everything it calls is done.
+                to_visit.append((callee, calls))
+                to_visit.extend((unvisited_callee, None)
+                                for unvisited_callee in reversed(unvisited))
+                continue
+        meta = getattr(callee, "meta", {})
+        collected = {
+            "parameter_meta": dict(getattr(callee, "parameter_meta", {})),
+            "exclude": list(meta.get("WDL_AID", {}).get("exclude", [])),
+            "authors": wrap_in_list(meta.get("authors", []))[:]
+        }
+        index: Dict[str, Set[Hashable]] = {}
+        for call in calls:
+            called = gathered[call.callee]
+            collected["parameter_meta"].update(fully_qualified_parameter_meta(
+                called["parameter_meta"], call.name))
+            merge_dict_of_lists(collected, {
+                "exclude": [f"{call.name}.{name}"
+                            for name in called["exclude"]],
+                "authors": called["authors"]}, index)
+        gathered[callee] = collected
+
+    collected = gathered[node]
+    return {
+        "parameter_meta": fully_qualified_parameter_meta(
+            collected["parameter_meta"], namespace),
+        "exclude": [f"{namespace}.{name}" for name in collected["exclude"]],
+        "authors": collected["authors"]
+    }
+
+
 def gather_parameter_meta(node: Union[WDL.Workflow, WDL.Conditional,
                                       WDL.Scatter],
                           namespace: str) -> Dict[str, Any]:
@@ -104,26 +408,7 @@ def gather_parameter_meta(node: Union[WDL.Workflow, WDL.Conditional,
     :return: A dictionary with all the parameter meta values, using
     fully qualified namespaces as keys.
     """
-    all_parameter_meta = {}
-    if hasattr(node, "parameter_meta"):
-        all_parameter_meta.update(fully_qualified_parameter_meta(
-            node.parameter_meta, namespace))
-
-    for element in node.body:
-        if isinstance(element, WDL.Tree.Call):
-            if isinstance(element.callee, WDL.Tree.Workflow):
-                all_parameter_meta.update(gather_parameter_meta(
-                    element.callee, f"{namespace}.{element.name}"))
-            else:  # Tasks
-                all_parameter_meta.update(fully_qualified_parameter_meta(
-                    element.callee.parameter_meta,
-                    f"{namespace}.{element.name}"))
-        else:
-            if isinstance(element, WDL.Tree.Conditional) or isinstance(
-                    element, WDL.Tree.Scatter):
-                all_parameter_meta.update(
-                    gather_parameter_meta(element, namespace))
-    return all_parameter_meta
+    return walk_workflow(node, namespace)["parameter_meta"]
 
 
 def process_meta(meta: Dict[str, Any], namespace: str) -> Dict:
@@ -156,26 +441,8 @@ def gather_meta(node: Union[WDL.Workflow, WDL.Conditional,
         - "authors": A list of all authors mentioned in any called
           workflow or task.
     """
-    collected_meta = {}
-    if hasattr(node, "meta"):
-        collected_meta = merge_dict_of_lists(collected_meta, process_meta(
-            node.meta, namespace))
-    for element in node.body:
-        if isinstance(element, WDL.Tree.Call):
-            if isinstance(element.callee, WDL.Tree.Workflow):
-                collected_meta = merge_dict_of_lists(
-                    collected_meta, gather_meta(
-                        element.callee, f"{namespace}.{element.name}"))
-            else:  # Tasks
-                collected_meta = merge_dict_of_lists(
-                    collected_meta, process_meta(
-                        element.callee.meta, f"{namespace}.{element.name}"))
-        else:
-            if isinstance(element, WDL.Tree.Conditional) or isinstance(
-                    element, WDL.Tree.Scatter):
-                collected_meta = merge_dict_of_lists(
-                    collected_meta, gather_meta(element, namespace))
-    return collected_meta
+    walked = walk_workflow(node, namespace)
+    return {"exclude": walked["exclude"], "authors": walked["authors"]}
 
 
 def get_description(parameter_meta: dict, input_name: str,
@@ -244,16 +511,33 @@ def gather_inputs(workflow: WDL.Workflow
     return inputs, required_inputs
 
 
-def gather_entries(name_and_bindings: List[Tuple[str, WDL.Env.Binding]],
+def describe_binding(name: str, binding: WDL.Env.Binding) -> Tuple:
+    """
+    :param name: The fully qualified name of the binding.
+    :param binding: An input (Decl) or output (Type) binding.
+    :return: A tuple with the name and type of the binding and, for
+    inputs, the default value. Type strings are interned, as the same
+    types occur many times.
+    """
+    if hasattr(binding.value, "expr"):
+        return (name, sys.intern(str(binding.value.type)),
+                str(binding.value.expr)
+                if binding.value.expr is not None else None)
+    return name, sys.intern(str(binding.value))
+
+
+def gather_entries(declarations: List[Tuple],
                    parameter_meta: Dict[str, Any], category_key: str,
                    fallback_category: str, description_key: str,
                    fallback_description: str,
                    fallback_description_to_object: bool,
-                   excluded_names: List[str], required_names: List[str] = []
-                   ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
+                   excluded_names: Iterable[str],
+                   required_names: Iterable[str] = ()
+                   ) -> Tuple[Dict[str, List[OutputEntry]], List[str]]:
     """
-    :param name_and_bindings: A tuple in which the first element is the
-    fully qualified name of the binding in the second element.
+    :param declarations: The inputs or outputs, as returned by
+    describe_binding. Tuples of a fully qualified name and a binding (as
+    returned by gather_inputs) are also accepted.
     :param parameter_meta: A dictionary containing the parameter_meta
     information.
     :param category_key: The key used in parameter_meta for categories.
@@ -271,7 +555,12 @@ def gather_entries(name_and_bindings: List[Tuple[str, WDL.Env.Binding]],
     """
     entries = {}
     missing_parameter_meta = []
-    for name, binding in name_and_bindings:
+    excluded_names = set(excluded_names)
+    required_names = set(required_names)
+    for declaration in declarations:
+        if not isinstance(declaration[1], str):
+            declaration = describe_binding(*declaration)
+        name = declaration[0]
         if name in excluded_names:
             continue
         if name not in parameter_meta:
@@ -279,20 +568,14 @@ def gather_entries(name_and_bindings: List[Tuple[str, WDL.Env.Binding]],
         category = ("required" if name in required_names
                     else get_category(parameter_meta, name, category_key,
                                       fallback_category))
-        entry_type = (str(binding.value.type)
-                      if hasattr(binding.value, "type")
-                      else str(binding.value))
-        entry = {
-            "name": name,
-            "type": entry_type,
-            "description":
-                get_description(parameter_meta, name, description_key,
-                                fallback_description,
-                                fallback_description_to_object)
-        }
-        if hasattr(binding.value, "expr"):
-            entry["default"] = (str(binding.value.expr)
-                                if binding.value.expr is not None else None)
+        description = get_description(
+            parameter_meta, name, description_key, fallback_description,
+            fallback_description_to_object)
+        if len(declaration) > 2:
+            entry = InputEntry(name, declaration[1], description,
+                               declaration[2])
+        else:
+            entry = OutputEntry(name, declaration[1], description)
         try:
             entries[category].append(entry)
         except KeyError:
@@ -300,13 +583,149 @@ def gather_entries(name_and_bindings: List[Tuple[str, WDL.Env.Binding]],
     return entries, missing_parameter_meta
 
 
-def collect_values(wdlfile: str, separate_required: bool,
-                   category_key: str, fallback_category: str,
-                   description_key: str, fallback_description: str,
-                   fallback_description_to_object: bool,
-                   strict_inputs: bool, strict_outputs: bool) -> Dict:
+def load_workflow(wdlfile: str,
+                  document_cache: Optional[DocumentCache] = None,
+                  fast: bool = False,
+                  mirror: Optional[SourceMirror] = None,
+                  import_index: Optional[ImportIndex] = None
+                  ) -> WDL.Workflow:
     """
-    :param wdlfile: The workflow for which the values will be retrieved.
+    :param wdlfile: The WDL file containing the workflow.
+    :param document_cache: A cache of loaded WDL documents to use. If not
+    given, the document and its imports are always loaded from scratch.
+    :param fast: Only typecheck the declarations of tasks, rather than the
+    tasks in their entirety. The declarations are all that is needed to
+    collect the values, but errors in (eg.) the commands of tasks are not
+    reported.
+    :param mirror: A local mirror of (remote) WDL files to read the
+    document and its imports from.
+    :param import_index: The index of the directories to search for
+    imports, if any.
+    :return: The workflow.
+    """
+    if fast and document_cache is None:
+        # WDL.load always typechecks tasks in their entirety.
+        document_cache = DocumentCache()
+    path = import_index.directories if import_index is not None else None
+    # The imports are read concurrently, see ImportPrefetcher.
+    read_source = ImportPrefetcher(mirror, import_index)
+    document = (document_cache.load(wdlfile, path, read_source=read_source,
+                                    typecheck_tasks=not fast)
+                if document_cache is not None
+                else WDL.load(wdlfile, path, read_source=read_source))
+    if document.workflow is None:
+        raise ValueError("No workflow is available in the WDL file.")
+    return document.workflow
+
+
+def extract_workflow(workflow: WDL.Workflow,
+                     walk_memo: Optional[CalleeMemo] = None
+                     ) -> Dict[str, Any]:
+    """
+    :param workflow: A (typechecked) workflow.
+    :param walk_memo: The information already gathered for tasks and
+    workflows, see walk_workflow.
+    :return: All information WDL-AID needs from the workflow in a compact,
+    JSON serializable form, independent of any of the options:
+        - "workflow_name": The name of the workflow.
+        - "workflow_meta": The workflow's meta section.
+        - "inputs": The available inputs, see describe_binding.
+        - "required_inputs": The names of the required inputs.
+        - "outputs": The effective outputs, see describe_binding.
+        - "parameter_meta": The fully qualified parameter_meta of the
+          workflow and all calls, see walk_workflow.
+        - "exclude": The inputs and outputs to exclude, see walk_workflow.
+        - "authors": The authors of the workflow and all calls, see
+          walk_workflow.
+    """
+    inputs, required_inputs = gather_inputs(workflow)
+    outputs = [(f"{workflow.name}.{outp.name}", outp)
+               for outp in workflow.effective_outputs]
+    walked = walk_workflow(workflow, workflow.name, walk_memo)
+    return {"workflow_name": workflow.name,
+            "workflow_meta": workflow.meta,
+            "inputs": [describe_binding(name, binding)
+                       for name, binding in inputs],
+            "required_inputs": required_inputs,
+            "outputs": [describe_binding(name, binding)
+                        for name, binding in outputs],
+            "parameter_meta": walked["parameter_meta"],
+            "exclude": walked["exclude"],
+            "authors": walked["authors"]}
+
+
+def is_cacheable(closure: Dict[str, Optional[str]]) -> bool:
+    """
+    :param closure: The import closure of a WDL file, see
+    cache.import_closure.
+    :return: Whether values collected from the WDL file may be cached.
+    This is not the case if the contents of any of the files are unknown
+    (files which could not be read and remote files, unless a mirror is
+    used), as changes to them would go unnoticed.
+    """
+    return None not in closure.values()
+
+
+def workflow_extract(wdlfile: str, cache: Optional[ValuesCache] = None,
+                     document_cache: Optional[DocumentCache] = None,
+                     walk_memo: Optional[CalleeMemo] = None,
+                     fast: bool = False,
+                     closure: Optional[Dict[str, Optional[str]]] = None,
+                     mirror: Optional[SourceMirror] = None,
+                     import_index: Optional[ImportIndex] = None
+                     ) -> Dict[str, Any]:
+    """
+    :param wdlfile: The WDL file containing the workflow.
+    :param cache: A cache to retrieve the extracted information from, if
+    available, or to store it in otherwise.
+    :param document_cache: A cache of loaded WDL documents to use.
+    :param walk_memo: The information already gathered for tasks and
+    workflows, see walk_workflow.
+    :param fast: Only typecheck the declarations of tasks, see
+    load_workflow.
+    :param closure: The import closure of the WDL file, if already
+    determined, see cache.import_closure.
+    :param mirror: A local mirror of (remote) WDL files, see
+    load_workflow.
+    :param import_index: The index of the directories to search for
+    imports, if any.
+    :return: The information extracted from the workflow, see
+    extract_workflow.
+    """
+    extract_key = None
+    if cache is not None:
+        with phase("cache"):
+            if closure is None:
+                closure = import_closure(wdlfile, import_index, mirror)
+            if is_cacheable(closure):
+                # The extracted workflow does not depend on the options, so
+                # it can be reused when only the options changed.
+                extract_key = cache.key(
+                    wdlfile, "extract-fast" if fast else "extract", closure)
+                extract = cache.get(extract_key)
+        if extract_key is not None and extract is not None:
+            return extract
+    with phase("load"):
+        workflow = load_workflow(wdlfile, document_cache, fast, mirror,
+                                 import_index)
+    with phase("walk"):
+        extract = extract_workflow(workflow, walk_memo)
+    if extract_key is not None:
+        with phase("cache"):
+            cache.put(extract_key, extract)
+    return extract
+
+
+def gather_values(wdlfile: str, extract: Dict[str, Any],
+                  separate_required: bool,
+                  category_key: str, fallback_category: str,
+                  description_key: str, fallback_description: str,
+                  fallback_description_to_object: bool
+                  ) -> Tuple[Dict, List[str], List[str]]:
+    """
+    :param wdlfile: The WDL file the workflow was loaded from.
+    :param extract: The information extracted from the workflow, see
+    extract_workflow.
     :param separate_required: Whether or not to put required inputs in a
     separate category.
     :param category_key: The key used in parameter_meta for categories.
@@ -317,49 +736,55 @@ def collect_values(wdlfile: str, separate_required: bool,
     :param fallback_description_to_object: Whether or not the entire
     object should be returned for a given object if the description
     key is not found.
-    :param strict_inputs: When true, raise a ValueError if no parameter_meta
-    is available for any inputs.
-    :param strict_outputs: When true, raise a ValueError if no parameter_meta
-    is available for any outputs.
-    :return: The values.
+    :return: The values, the inputs for which parameter_meta is missing
+    and the outputs for which parameter_meta is missing.
     """
-    document = WDL.load(wdlfile)
-    workflow = document.workflow
-    if workflow is None:
-        raise ValueError("No workflow is available in the WDL file.")
+    inputs = extract["inputs"]
+    outputs = extract["outputs"]
+    parameter_meta = extract["parameter_meta"]
+    authors = wrap_in_list(extract["workflow_meta"].get("authors", []))[:]
 
-    inputs, required_inputs = gather_inputs(workflow)
-    outputs = [(f"{workflow.name}.{outp.name}", outp)
-               for outp in workflow.effective_outputs]
-    parameter_meta = gather_parameter_meta(workflow, workflow.name)
-    gathered_meta = gather_meta(workflow, workflow.name)
-    authors = wrap_in_list(workflow.meta.get("authors", []))[:]
-
-    excluded_inputs = [inp[0] for inp in inputs
-                       if inp[0] in gathered_meta["exclude"]]
-    excluded_outputs = [outp[0] for outp in outputs
-                        if outp[0] in gathered_meta["exclude"]]
+    exclude = set(extract["exclude"])
+    excluded_inputs = [inp[0] for inp in inputs if inp[0] in exclude]
+    excluded_outputs = [outp[0] for outp in outputs if outp[0] in exclude]
 
     input_entries, inputs_missing_parameter_meta = gather_entries(
         inputs, parameter_meta, category_key, fallback_category,
         description_key, fallback_description, fallback_description_to_object,
-        excluded_inputs, required_inputs if separate_required else [])
+        excluded_inputs,
+        extract["required_inputs"] if separate_required else [])
     output_entries, outputs_missing_parameter_meta = gather_entries(
         outputs, parameter_meta, category_key, fallback_category,
         description_key, fallback_description, fallback_description_to_object,
         excluded_outputs)
 
-    values = {"workflow_name": workflow.name,
+    values = {"workflow_name": extract["workflow_name"],
               "workflow_file": wdlfile,
               "workflow_authors": authors,
-              "workflow_all_authors": gathered_meta["authors"],
-              "workflow_meta": workflow.meta,
+              "workflow_all_authors": extract["authors"],
+              "workflow_meta": extract["workflow_meta"],
               "excluded_inputs": excluded_inputs,
               "excluded_outputs": excluded_outputs,
               "inputs": input_entries,
               "outputs": output_entries,
               "wdl_aid_version": __version__}
+    return (values, inputs_missing_parameter_meta,
+            outputs_missing_parameter_meta)
+
 
+def check_strictness(inputs_missing_parameter_meta: List[str],
+                     outputs_missing_parameter_meta: List[str],
+                     strict_inputs: bool, strict_outputs: bool):
+    """
+    :param inputs_missing_parameter_meta: The inputs for which
+    parameter_meta is missing.
+    :param outputs_missing_parameter_meta: The outputs for which
+    parameter_meta is missing.
+    :param strict_inputs: When true, raise a ValueError if no parameter_meta
+    is available for any inputs.
+    :param strict_outputs: When true, raise a ValueError if no parameter_meta
+    is available for any outputs.
+    """
     strict_inputs_error = (strict_inputs and
                            len(inputs_missing_parameter_meta) > 0)
     strict_outputs_error = (strict_outputs and
@@ -375,26 +800,744 @@ def collect_values(wdlfile: str, separate_required: bool,
             error_components.append(
                 f"Missing parameter_meta for outputs:\n{missed_outputs}")
         raise ValueError("\n\n".join(error_components))
+
+
+def collect_values(wdlfile: str, separate_required: bool,
+                   category_key: str, fallback_category: str,
+                   description_key: str, fallback_description: str,
+                   fallback_description_to_object: bool,
+                   strict_inputs: bool, strict_outputs: bool,
+                   cache: Optional[ValuesCache] = None,
+                   document_cache: Optional[DocumentCache] = None,
+                   walk_memo: Optional[CalleeMemo] = None,
+                   fast: bool = False,
+                   mirror: Optional[SourceMirror] = None,
+                   import_index: Optional[ImportIndex] = None) -> Dict:
+    """
+    :param wdlfile: The workflow for which the values will be retrieved.
+    :param separate_required: Whether or not to put required inputs in a
+    separate category.
+    :param category_key: The key used in parameter_meta for categories.
+    :param fallback_category: The default category.
+    :param description_key: The key used in parameter_meta for
+    descriptions.
+    :param fallback_description: The default description.
+    :param fallback_description_to_object: Whether or not the entire
+    object should be returned for a given object if the description
+    key is not found.
+    :param strict_inputs: When true, raise a ValueError if no parameter_meta
+    is available for any inputs.
+    :param strict_outputs: When true, raise a ValueError if no parameter_meta
+    is available for any outputs.
+    :param cache: A cache to retrieve the values (or the information
+    extracted from the workflow) from, if available, or to store them in
+    otherwise.
+    :param document_cache: A cache of loaded WDL documents to use. If not
+    given, the document and its imports are always loaded from scratch.
+    :param walk_memo: The information already gathered for tasks and
+    workflows, see walk_workflow. Should be used together with
+    document_cache.
+    :param fast: Only typecheck the declarations of tasks, see
+    load_workflow.
+    :param mirror: A local mirror of (remote) WDL files, see
+    load_workflow.
+    :param import_index: The index of the directories to search for
+    imports, if any.
+    :return: The values.
+    """
+    options = (separate_required, category_key, fallback_category,
+               description_key, fallback_description,
+               fallback_description_to_object)
+    cached = closure = None
+    if cache is not None:
+        with phase("cache"):
+            closure = import_closure(wdlfile, import_index, mirror)
+        if not is_cacheable(closure):
+            cache = None
+    if cache is not None:
+        with phase("cache"):
+            # Values collected in fast mode are not reused in a normal run,
+            # which should report errors in the tasks.
+            values_key = cache.key(wdlfile, options + (fast,), closure)
+            cached = cache.get(values_key)
+    if cached is not None:
+        values, inputs_missing, outputs_missing = cached
+        values["inputs"] = restore_entries(values["inputs"], InputEntry)
+        values["outputs"] = restore_entries(values["outputs"], OutputEntry)
+    else:
+        extract = workflow_extract(wdlfile, cache, document_cache, walk_memo,
+                                   fast, closure, mirror, import_index)
+        with phase("gather_entries"):
+            values, inputs_missing, outputs_missing = gather_values(
+                wdlfile, extract, *options)
+        if cache is not None:
+            with phase("cache"):
+                cache.put(values_key,
+                          [values, inputs_missing, outputs_missing])
+    check_strictness(inputs_missing, outputs_missing,
+                     strict_inputs, strict_outputs)
     return values
 
 
+# Batch functions
+# Shared between all workflows documented by this process.
+DOCUMENT_CACHE = DocumentCache()
+WALK_MEMO = CalleeMemo()
+
+
+def expand_wdlfiles(patterns: List[str]) -> List[str]:
+    """
+    :param patterns: Paths to WDL files, which may be glob patterns.
+    :return: The WDL files, in the order given. Files matched by multiple
+    patterns are only listed once.
+    """
+    wdlfiles = []
+    for pattern in patterns:
+        if any(char in pattern for char in "*?["):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if len(matches) == 0:
+                raise ValueError(f"No WDL files match '{pattern}'.")
+        else:
+            matches = [pattern]
+        for match in matches:
+            if match not in wdlfiles:
+                wdlfiles.append(match)
+    return wdlfiles
+
+
+def read_manifest(manifest: Path, defaults: Dict[str, Any]
+                  ) -> List[Dict[str, Any]]:
+    """
+    :param manifest: A JSON file containing a list of workflows to
+    document. Each item is either the path to a WDL file or an object
+    with a "wdlfile" key and any of the options in JOB_OPTIONS which
+    should be set for this workflow. Relative paths are resolved
+    relative to the directory containing the manifest.
+    :param defaults: The values to use for options not set in the
+    manifest.
+    :return: A job (a dictionary of options) for each workflow.
+    """
+    with manifest.open("r") as manifest_file:
+        entries = json.load(manifest_file)
+    jobs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"wdlfile": entry}
+        unknown_options = set(entry) - set(JOB_OPTIONS) - {"wdlfile"}
+        if len(unknown_options) > 0:
+            raise ValueError(f"Unknown option(s) in manifest {manifest}: "
+                             f"{', '.join(sorted(unknown_options))}")
+        job = dict(defaults)
+        job.update(entry)
+        job["wdlfile"] = str(manifest.parent / entry["wdlfile"])
+        for option in PATH_OPTIONS:
+            if entry.get(option) is not None:
+                job[option] = manifest.parent / entry[option]
+        if entry.get("renders") is not None:
+            job["renders"] = [
+                (manifest.parent / template_path, manifest.parent / pattern)
+                for template_path, pattern in entry["renders"]]
+        jobs.append(job)
+    return jobs
+
+
+def job_defaults(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    :param args: The parsed command line arguments.
+    :return: The options for workflows, as set on the command line.
+    """
+    defaults = {option: getattr(args, option) for option in JOB_OPTIONS}
+    if args.cache_dir is not None:
+        defaults["cache"] = ValuesCache(args.cache_dir,
+                                        args.cache_size * 1024 ** 2)
+    if args.mirror_dir is not None:
+        defaults["mirror"] = SourceMirror(args.mirror_dir, args.offline)
+    if args.import_paths is not None:
+        # Built once, rather than for every workflow.
+        defaults["import_index"] = ImportIndex(args.import_paths,
+                                               args.import_index)
+    return defaults
+
+
+def create_jobs(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    :param args: The parsed command line arguments.
+    :return: A job (a dictionary of options) for each workflow to be
+    documented.
+    """
+    defaults = job_defaults(args)
+    jobs = [dict(defaults, wdlfile=wdlfile)
+            for wdlfile in expand_wdlfiles(args.wdlfiles)]
+    if args.manifest is not None:
+        jobs.extend(read_manifest(args.manifest, defaults))
+    return jobs
+
+
+def output_path(pattern: Union[str, Path], wdlfile: str,
+                workflow_name: str) -> Path:
+    """
+    :param pattern: The output path, which may contain the placeholders
+    {workflow_name}, {stem} (the WDL file's name without extension) and
+    {parent} (the directory containing the WDL file). Any other braces are
+    kept as they are.
+    :param wdlfile: The WDL file being documented.
+    :param workflow_name: The name of the workflow being documented.
+    :return: The path to write the documentation to.
+    """
+    values = {"workflow_name": workflow_name, "stem": Path(wdlfile).stem,
+              "parent": str(Path(wdlfile).parent)}
+    return Path(OUTPUT_PLACEHOLDER.sub(lambda match: values[match.group(1)],
+                                       str(pattern)))
+
+
+def check_outputs(jobs: List[Dict[str, Any]]):
+    """
+    Make sure that no two outputs (of the same or different workflows) are
+    written to the same file, in which case one would silently overwrite
+    the other.
+    :param jobs: The options for each workflow, see create_jobs.
+    """
+    if len(jobs) < 2:
+        return
+    if any(job["output"] is None for job in jobs):
+        raise ValueError("An output path (containing a placeholder such as "
+                         "{workflow_name}) is required when documenting "
+                         "multiple workflows.")
+    seen = {}
+    for job in jobs:
+        patterns = [job["output"]] + [pattern for _, pattern
+                                      in job.get("renders") or []]
+        for pattern in patterns:
+            # The workflow name is only known once the workflow is loaded,
+            # so paths containing it are assumed to be distinct.
+            if "{workflow_name}" in str(pattern):
+                continue
+            path = os.path.abspath(output_path(pattern, job["wdlfile"], ""))
+            if path in seen:
+                raise ValueError(
+                    f"Both {seen[path]} and {job['wdlfile']} would be "
+                    f"documented to '{path}'. Use a placeholder such as "
+                    f"{{workflow_name}}, {{stem}} or {{parent}} in the "
+                    f"output path.")
+            seen[path] = job["wdlfile"]
+
+
+def template_source(name: str) -> Tuple[str, Optional[str], Callable]:
+    """
+    Used by the jinja2 environment to load templates.
+    :param name: DEFAULT_TEMPLATE_NAME, INDEX_TEMPLATE_NAME or the
+    absolute path to a template.
+    :return: The source of the template, its filename and a function
+    which returns whether the template is still up to date.
+    """
+    if name == DEFAULT_TEMPLATE_NAME:
+        return DEFAULT_TEMPLATE, None, lambda: True
+    if name == INDEX_TEMPLATE_NAME:
+        return INDEX_TEMPLATE, None, lambda: True
+    path = Path(name)
+    mtime = path.stat().st_mtime
+
+    def up_to_date() -> bool:
+        try:
+            return path.stat().st_mtime == mtime
+        except OSError:
+            return False
+    return path.read_text(), name, up_to_date
+
+
+@functools.lru_cache(maxsize=None)
+def template_environment(bytecode_cache_dir: Optional[Path] = None
+                         ) -> jinja2.Environment:
+    """
+    :param bytecode_cache_dir: A directory in which to store compiled
+    templates, so they can be reused by later runs.
+    :return: The jinja2 environment used to load and render templates. The
+    environment (and the templates it has compiled) is shared for the
+    entire process.
+    """
+    bytecode_cache = None
+    if bytecode_cache_dir is not None:
+        bytecode_cache_dir.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(
+            str(bytecode_cache_dir))
+    environment = jinja2.Environment(
+        loader=jinja2.FunctionLoader(template_source),
+        bytecode_cache=bytecode_cache, auto_reload=True)
+    # Allows the entries to be serialized using the tojson filter.
+    environment.policies["json.dumps_kwargs"] = {"sort_keys": True,
+                                                 "default": to_json}
+    return environment
+
+
+@functools.lru_cache(maxsize=None)
+def default_template(bytecode_cache_dir: Optional[Path] = None
+                     ) -> jinja2.Template:
+    """
+    :param bytecode_cache_dir: A directory in which to store compiled
+    templates, so they can be reused by later runs.
+    :return: The default template. The precompiled version shipped with
+    WDL-AID is used if it is compatible with the installed jinja2,
+    otherwise the template is compiled.
+    """
+    environment = template_environment(bytecode_cache_dir)
+    return (load_precompiled_default_template(environment) or
+            environment.get_template(DEFAULT_TEMPLATE_NAME))
+
+
+def load_template(template_path: Optional[Path],
+                  bytecode_cache_dir: Optional[Path] = None
+                  ) -> jinja2.Template:
+    """
+    :param template_path: The jinja2 template to load, if None the
+    default template is used.
+    :param bytecode_cache_dir: A directory in which to store compiled
+    templates, so they can be reused by later runs.
+    :return: The template. Templates are only compiled again if they have
+    changed.
+    """
+    if template_path is None:
+        return default_template(bytecode_cache_dir)
+    return template_environment(bytecode_cache_dir).get_template(
+        str(template_path.resolve()))
+
+
+@functools.lru_cache(maxsize=32)
+def read_json(path: Path, mtime_ns: int) -> Any:
+    """
+    :param path: A JSON file.
+    :param mtime_ns: The modification time of the file, so the file is
+    read again if it changed.
+    :return: The contents of the JSON file.
+    """
+    with path.open("r") as json_file:
+        return json.load(json_file)
+
+
+def load_extra(extra_path: Optional[Path]) -> Any:
+    """
+    :param extra_path: A JSON file with additional data for the template.
+    :return: The contents of the JSON file or None if no file is given.
+    The file is only read again if it changed.
+    """
+    if extra_path is None:
+        return None
+    return read_json(extra_path, extra_path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=None)
+def file_mode() -> int:
+    """
+    :return: The permissions for newly created files, given the umask.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_atomically(path: Path, chunks: Iterable[str]) -> bool:
+    """
+    Write chunks of text to a file. The chunks are first written to a
+    temporary file, which then replaces the file, so the file is never
+    seen in a half-written state. If the file already has the same
+    contents, it is left untouched, keeping its modification time.
+    Symlinks are followed, so the file they point to is replaced rather
+    than the link. Anything other than a regular file (eg. /dev/null or
+    /dev/stdout) is written to directly.
+    :param path: The file to write to.
+    :param chunks: The text to write.
+    :return: Whether the file was written.
+    """
+    try:
+        is_regular_file = stat.S_ISREG(os.stat(path).st_mode)
+    except FileNotFoundError:
+        is_regular_file = True
+    if not is_regular_file:
+        with open(path, "w") as output_file:
+            output_file.writelines(chunks)
+        return True
+    # Also resolves links to files which do not exist yet.
+    path = Path(os.path.realpath(path))
+    handle, temp_path = tempfile.mkstemp(dir=path.parent,
+                                         prefix=f".{path.name}.",
+                                         suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w") as temp_file:
+            temp_file.writelines(chunks)
+        if path.is_file() and filecmp.cmp(temp_path, path, shallow=False):
+            os.unlink(temp_path)
+            return False
+        try:
+            mode = path.stat().st_mode & 0o7777
+        except FileNotFoundError:
+            mode = file_mode()
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return True
+
+
+def values_to_json(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    :param values: The values collected from a workflow.
+    :return: The values in the form of the JSON output: the entries are
+    converted to dictionaries, the schema version is added and the sorted
+    views (see sorted_views), which would only repeat the entries, are
+    left out.
+    """
+    json_values = {"schema_version": JSON_SCHEMA_VERSION}
+    json_values.update((key, value) for key, value in values.items()
+                       if not key.startswith("sorted_"))
+    for key in ("inputs", "outputs"):
+        json_values[key] = {
+            category: [entry.to_dict() for entry in entries]
+            for category, entries in values[key].items()}
+    return json_values
+
+
+def write_json(values: Dict[str, Any], output_file: Optional[Path] = None,
+               indent: Optional[int] = 2):
+    """
+    Write the values as JSON to a file or stdout, without using a template.
+    :param values: The values collected from a workflow.
+    :param output_file: The file to write to. If not given, the result is
+    written to stdout.
+    :param indent: The indentation to use. If None, the JSON is written on
+    a single line.
+    """
+    text = json.dumps(values_to_json(values), indent=indent) + "\n"
+    if output_file is not None:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(output_file, [text])
+    else:
+        sys.stdout.write(text)
+
+
+def render(template: jinja2.Template, values: Dict[str, Any],
+           extra_values: Any, output_file: Optional[Path] = None):
+    """
+    Render the template, streaming the result to a file or stdout.
+    :param template: The template to render.
+    :param values: The values to render the template with.
+    :param extra_values: The value for the 'extra' variable.
+    :param output_file: The file to write to. If not given, the result is
+    written to stdout.
+    """
+    stream = template.stream(drop_nones(with_sorted_views(values)),
+                             extra=extra_values)
+    stream.enable_buffering(RENDER_BUFFER_SIZE)
+    if output_file is not None:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(output_file, stream)
+    else:
+        stream.dump(sys.stdout)
+
+
+def job_values(job: Dict[str, Any]) -> Dict:
+    """
+    :param job: The options for a workflow, see create_jobs.
+    :return: The values collected from the workflow.
+    """
+    return collect_values(job["wdlfile"], job["separate_required"],
+                          job["category_key"], job["fallback_category"],
+                          job["description_key"],
+                          job["fallback_description"],
+                          job["fallback_description_to_object"],
+                          job["strict"] or job["strict_inputs"],
+                          job["strict"] or job["strict_outputs"],
+                          job.get("cache"), DOCUMENT_CACHE, WALK_MEMO,
+                          bool(job.get("fast")), job.get("mirror"),
+                          job.get("import_index"))
+
+
+def job_template(job: Dict[str, Any],
+                 template_path: Optional[Path]) -> jinja2.Template:
+    """
+    :param job: The options for a workflow, see create_jobs.
+    :param template_path: The template (the job's own or one of its
+    additional renders) or None for the default template.
+    :return: The template to render the documentation with.
+    """
+    return load_template(template_path,
+                         job["cache"].bytecode_directory
+                         if job.get("cache") is not None else None)
+
+
+def map_threads(function: Callable, items: List, threads: int = 1):
+    """
+    Apply a function to each item, using multiple threads if requested.
+    :param function: The function to apply.
+    :param items: The items.
+    :param threads: The maximum number of threads to use.
+    """
+    threads = min(threads, len(items))
+    if threads > 1:
+        with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+            list(executor.map(function, items))
+    else:
+        for item in items:
+            function(item)
+
+
+@functools.lru_cache(maxsize=None)
+def index_template(bytecode_cache_dir: Optional[Path] = None
+                   ) -> jinja2.Template:
+    """
+    :param bytecode_cache_dir: A directory in which to store compiled
+    templates, so they can be reused by later runs.
+    :return: The default template for the index of sharded documentation.
+    """
+    return template_environment(bytecode_cache_dir).get_template(
+        INDEX_TEMPLATE_NAME)
+
+
+def render_shards(job: Dict[str, Any], values: Dict[str, Any],
+                  extra_values: Any, index_file: Path) -> List[Path]:
+    """
+    Render the documentation as multiple pages (shards), see shard_values,
+    and an index page linking to them. The shards are written to a
+    directory next to the index, named after the index without its
+    extension. Shards are only rendered again if their values, the template
+    or the extra data changed, and shards which no longer exist are
+    removed.
+    :param job: The options for this workflow, see create_jobs.
+    :param values: The values collected from the workflow.
+    :param extra_values: The value for the 'extra' variable.
+    :param index_file: The file to write the index to.
+    :return: The files written: the index and the shards.
+    """
+    shards = shard_values(values, job["shard_by"],
+                          job["shard_size"]
+                          if job.get("shard_size") is not None
+                          else DEFAULT_SHARD_SIZE)
+    directory = index_file.parent / index_file.stem
+    directory.mkdir(parents=True, exist_ok=True)
+    state = ShardState(directory)
+    template_digest = (file_digest(str(job["template"]))
+                       if job["template"] is not None else None)
+    digests = {}
+    shard_files = []
+    to_render = []
+    for name, shard in shards:
+        shard_file = directory / f"{name}{index_file.suffix}"
+        shard["shard"] = {"name": name, "index": f"../{index_file.name}"}
+        # The shard is a copy of the values, including the sorted views of
+        # all entries.
+        shard.update(sorted_views(shard))
+        digest = hashlib.sha256(json.dumps(
+            [values_to_json(shard), extra_values, template_digest,
+             __version__], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        digests[shard_file.name] = digest
+        shard_files.append(shard_file)
+        if not state.is_up_to_date(shard_file, digest):
+            to_render.append((shard, shard_file))
+    template = job_template(job, job["template"])
+    map_threads(lambda item: render(template, item[0], extra_values, item[1]),
+                to_render, job.get("render_threads") or 1)
+    state.update(digests)
+
+    bytecode_cache_dir = (job["cache"].directory / "templates"
+                          if job.get("cache") is not None else None)
+    index_values = dict(values, shards=[
+        {"name": name, "link": f"{directory.name}/{shard_file.name}",
+         "inputs": sum(len(entries) for entries in shard["inputs"].values()),
+         "outputs": sum(len(entries)
+                        for entries in shard["outputs"].values())}
+        for (name, shard), shard_file in zip(shards, shard_files)])
+    render(load_template(job["index_template"], bytecode_cache_dir)
+           if job.get("index_template") is not None
+           else index_template(bytecode_cache_dir),
+           index_values, extra_values, index_file)
+    return [index_file] + shard_files
+
+
+def document_workflow(job: Dict[str, Any]) -> List[Path]:
+    """
+    Generate the documentation for a single workflow. The values are
+    collected once and used for the output as well as for all additional
+    renders of the job.
+    :param job: The options for this workflow, see create_jobs.
+    :return: The files the documentation was written to.
+    """
+    values = job_values(job)
+    output_file = (output_path(job["output"], job["wdlfile"],
+                               values["workflow_name"])
+                   if job["output"] is not None else None)
+    additional_renders = [
+        (Path(template_path),
+         output_path(pattern, job["wdlfile"], values["workflow_name"]))
+        for template_path, pattern in job.get("renders") or []]
+    written = [output_file] if output_file is not None else []
+    with phase("render"):
+        # Sorted once for all templates.
+        values = with_sorted_views(values)
+        extra_values = load_extra(job["extra"])
+        renders = list(additional_renders)
+        if job.get("format") in ("json", "ndjson"):
+            write_json(values, output_file,
+                       2 if job["format"] == "json" else None)
+        elif job.get("shard_by") is not None:
+            if output_file is None:
+                raise ValueError("An output path is required for sharded "
+                                 "documentation.")
+            written = render_shards(job, values, extra_values, output_file)
+        else:
+            renders.insert(0, (job["template"], output_file))
+        map_threads(
+            lambda render_item: render(
+                job_template(job, render_item[0]), values, extra_values,
+                render_item[1]),
+            renders, job.get("render_threads") or 1)
+    return written + [output for _, output in additional_renders]
+
+
+def try_document_workflow(job: Dict[str, Any]) -> Optional[str]:
+    """
+    Like document_workflow, but errors are returned rather than raised.
+    :param job: The options for this workflow, see create_jobs.
+    :return: A description of the error that occurred, if any.
+    """
+    try:
+        document_workflow(job)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def try_serialize_workflow(job: Dict[str, Any]
+                           ) -> Tuple[Optional[str], Optional[str]]:
+    """
+    :param job: The options for this workflow, see create_jobs.
+    :return: The values collected from the workflow, as a single line of
+    JSON, and a description of the error that occurred, if any.
+    """
+    try:
+        return json.dumps(values_to_json(job_values(job))), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def map_jobs(function: Callable[[Dict[str, Any]], Any],
+             jobs: List[Dict[str, Any]], processes: int = 1) -> Iterator:
+    """
+    :param function: The function to apply to each job.
+    :param jobs: The options for each workflow, see create_jobs.
+    :param processes: The number of processes to use. If 0, the number of
+    CPUs is used.
+    :return: The results for each job, in the same order.
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) == 1:
+        yield from map(function, jobs)
+        return
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(processes, len(jobs))) as executor:
+        yield from executor.map(function, jobs)
+
+
+def run_jobs(jobs: List[Dict[str, Any]], processes: int = 1
+             ) -> List[Optional[str]]:
+    """
+    Document multiple workflows. A failure to document one workflow does
+    not prevent the others from being documented.
+    :param jobs: The options for each workflow, see create_jobs.
+    :param processes: The number of processes to use. If 0, the number of
+    CPUs is used.
+    :return: For each job (in the same order) a description of the error
+    that occurred or None if it succeeded.
+    """
+    return list(map_jobs(try_document_workflow, jobs, processes))
+
+
+def write_ndjson(jobs: List[Dict[str, Any]],
+                 output_file: Optional[Path] = None,
+                 processes: int = 1) -> List[Optional[str]]:
+    """
+    Write the values collected from multiple workflows as newline
+    delimited JSON: one line per workflow, in the order of the jobs. A
+    failure for one workflow does not prevent the others from being
+    written.
+    :param jobs: The options for each workflow, see create_jobs.
+    :param output_file: The file to write to. If not given, the result is
+    written to stdout.
+    :param processes: The number of processes to use. If 0, the number of
+    CPUs is used.
+    :return: For each job (in the same order) a description of the error
+    that occurred or None if it succeeded.
+    """
+    errors = []
+
+    def lines():
+        for line, error in map_jobs(try_serialize_workflow, jobs, processes):
+            errors.append(error)
+            if line is not None:
+                yield line + "\n"
+
+    if output_file is not None:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(output_file, lines())
+    else:
+        sys.stdout.writelines(lines())
+    return errors
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Generate documentation for a WDL workflow, based on "
                     "the parameter_meta sections.")
     parser.add_argument("-v", "--version", action="version",
                         version=f"WDL-AID {__version__}")
-    parser.add_argument("wdlfile", type=str,
-                        help="The WDL the documentation should be generated "
-                             "for.")
-    parser.add_argument("-o", "--output", type=Path,
+    parser.add_argument("wdlfiles", type=str, nargs="*", metavar="wdlfile",
+                        help="The WDL file(s) the documentation should be "
+                             "generated for. Glob patterns (eg. "
+                             "'workflows/**/*.wdl') are expanded.")
+    parser.add_argument("-m", "--manifest", type=Path,
+                        help="A JSON file listing (additional) WDL files to "
+                             "document, optionally with options specific "
+                             "to each workflow.")
+    parser.add_argument("-o", "--output", type=str,
                         help="The file to write the generated documentation "
-                             "to. [stdout]")
+                             "to. May contain the placeholders "
+                             "{workflow_name}, {stem} and {parent}, which is "
+                             "required when documenting multiple "
+                             "workflows. [stdout]")
     parser.add_argument("-t", "--template", type=Path,
                         help="A jinja2 template to use for rendering the "
                              "documentation. A default template will be "
                              "used to generate a markdown file if not "
                              "specified.")
+    parser.add_argument("-f", "--format", choices=("template", "json",
+                                                   "ndjson"),
+                        default="template",
+                        help="The output format: the documentation rendered "
+                             "using the template, or the collected values "
+                             "as JSON. With ndjson, the values for all "
+                             "workflows are written as one JSON object per "
+                             "line to a single output. [template]")
+    parser.add_argument("-r", "--render", nargs=2, action="append",
+                        dest="renders", metavar=("TEMPLATE", "OUTPUT"),
+                        help="Additionally render TEMPLATE to OUTPUT, using "
+                             "the same values. OUTPUT may contain the same "
+                             "placeholders as --output. May be given "
+                             "multiple times.")
+    parser.add_argument("--render-threads", type=int, default=1,
+                        help="The number of threads to use for rendering "
+                             "the templates of a workflow. [1]")
+    parser.add_argument("--shard-by", choices=SHARD_MODES,
+                        help="Split the documentation into multiple pages, "
+                             "by input category, by (outermost) call or "
+                             "both. The output then becomes an index page "
+                             "linking to the pages, which are written to a "
+                             "directory named after the output.")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                        help="The maximum number of inputs and outputs on "
+                             "a page of sharded documentation. Larger pages "
+                             f"are split up. [{DEFAULT_SHARD_SIZE}]")
+    parser.add_argument("--index-template", type=Path,
+                        help="A jinja2 template to use for rendering the "
+                             "index page of sharded documentation.")
     parser.add_argument("-c", "--category-key", type=str, default="category",
                         help="The key used in the parameter_meta sections "
                              "for the input/output category. [category]")
@@ -432,33 +1575,177 @@ def parse_args():
     parser.add_argument("--strict-outputs", action="store_true",
                         help="Error if the parameter_meta entry is missing "
                              "for any outputs.")
-    return parser.parse_args()
+    parser.add_argument("--fast", action="store_true",
+                        help="Only typecheck the declarations of tasks, "
+                             "not their commands, runtime sections and "
+                             "expressions. This is considerably faster for "
+                             "tasks with large commands, but errors in those "
+                             "parts of tasks are not reported.")
+    parser.add_argument("--check", action="store_true",
+                        help="Do not generate documentation, only check "
+                             "that parameter_meta is available for all "
+                             "inputs and outputs (or only those selected "
+                             "using the strict options). Exits with status "
+                             "1 if any is missing.")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="With --check, stop at the first workflow for "
+                             "which parameter_meta is missing.")
+    parser.add_argument("--check-report", type=Path, metavar="FILE",
+                        help="With --check, write a summary of the check, "
+                             "including the missing parameter_meta for each "
+                             "workflow, as JSON to FILE.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="The number of processes to use when "
+                             "documenting multiple workflows. 0 means one "
+                             "per CPU. [1]")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="Keep running and regenerate the "
+                             "documentation whenever the WDL files, the "
+                             "files they import, the template or the extra "
+                             "data change.")
+    parser.add_argument("--cache-dir", type=Path,
+                        help="A directory in which to cache the values "
+                             "collected from the workflows. If a workflow, "
+                             "the files it imports and the relevant options "
+                             "did not change since a previous run, the "
+                             "cached values are used instead of parsing the "
+                             "workflow. Compiled templates are stored here "
+                             "as well. May be shared between runs.")
+    parser.add_argument("--cache-size", type=int, default=100,
+                        help="The maximum size of the cache in MiB. The "
+                             "least recently used entries are removed when "
+                             "the cache grows larger. [100]")
+    parser.add_argument("-p", "--import-path", type=str, action="append",
+                        dest="import_paths", metavar="DIR",
+                        help="A directory to search for (relative) imports "
+                             "which are not found relative to the importing "
+                             "file. May be given multiple times, later "
+                             "directories take precedence.")
+    parser.add_argument("--import-index", type=Path, metavar="FILE",
+                        help="A JSON file in which to keep the index of "
+                             "the WDL files in the --import-path "
+                             "directories, so only directories modified "
+                             "since a previous run are scanned again.")
+    parser.add_argument("--mirror-dir", type=Path,
+                        help="A directory in which to keep a copy of the "
+                             "WDL files and the files they import, "
+                             "including remote (http and https) imports. "
+                             "Remote files are only fetched once and local "
+                             "files are only read again when they changed. "
+                             "May be shared between runs.")
+    parser.add_argument("--offline", action="store_true",
+                        help="With --mirror-dir, never fetch remote files: "
+                             "remote imports must already be mirrored.")
+    parser.add_argument("--serve", type=str, metavar="ADDRESS",
+                        help="Instead of writing documentation, serve it "
+                             "over HTTP on ADDRESS, which is either a port, "
+                             "HOST:PORT or unix:PATH for a unix socket. "
+                             "GET /docs/<path> returns the rendered "
+                             "documentation and GET /values/<path> the "
+                             "collected values (as JSON) for the WDL file "
+                             "at <path>. Options may be overridden using "
+                             "query parameters.")
+    parser.add_argument("--serve-root", type=Path, default=Path.cwd(),
+                        help="The directory containing the WDL files to "
+                             "be served. [current directory]")
+    parser.add_argument("-b", "--build-manifest", type=Path,
+                        help="A JSON file recording, for each output, the "
+                             "files (and their contents) and options it was "
+                             "generated from. Only the outputs for which any "
+                             "of these changed since the previous run with "
+                             "the same build manifest are regenerated.")
+    parser.add_argument("--timings", action="store_true",
+                        help="Print the wall time and peak memory usage of "
+                             "each phase (loading, walking the workflow, "
+                             "gathering entries, rendering), summed over "
+                             "all workflows, to stderr. Workflows are "
+                             "documented one at a time.")
+    parser.add_argument("--profile", type=Path, metavar="FILE",
+                        help="Profile the run using cProfile and write the "
+                             "statistics to FILE, for use with pstats. "
+                             "Workflows are documented in a single "
+                             "process.")
+    args = parser.parse_args()
+    if args.build_manifest is not None and args.format == "ndjson":
+        parser.error("--build-manifest can not be used with --format ndjson")
+    if args.watch and args.format == "ndjson":
+        parser.error("--watch can not be used with --format ndjson")
+    if args.shard_by is not None and args.format in ("json", "ndjson"):
+        parser.error(f"--shard-by can not be used with --format "
+                     f"{args.format}")
+    if args.shard_size < 1:
+        parser.error("--shard-size must be at least 1")
+    if args.import_index is not None and args.import_paths is None:
+        parser.error("--import-index requires --import-path")
+    if args.offline and args.mirror_dir is None:
+        parser.error("--offline requires --mirror-dir")
+    if ((args.fail_fast or args.check_report is not None) and
+            not args.check):
+        parser.error("--fail-fast and --check-report require --check")
+    if (len(args.wdlfiles) == 0 and args.manifest is None and
+            args.serve is None):
+        parser.error("at least one WDL file or a manifest is required")
+    return args
 
 
 def main():
     args = parse_args()
-    values = collect_values(args.wdlfile, args.separate_required,
-                            args.category_key, args.fallback_category,
-                            args.description_key, args.fallback_description,
-                            args.fallback_description_to_object,
-                            args.strict or args.strict_inputs,
-                            args.strict or args.strict_outputs)
-    template = Template(args.template.read_text()
-                        if args.template is not None
-                        else DEFAULT_TEMPLATE)
-
-    if args.extra is not None:
-        with args.extra.open("r") as extra_values_file:
-            extra_values = json.load(extra_values_file)
-    else:
-        extra_values = None
-
-    file_content = template.render(drop_nones(values), extra=extra_values)
-    if args.output is not None:
-        with args.output.open("w") as output:
-            output.write(file_content)
-    else:
-        print(file_content, end="")
+    if args.serve is not None:
+        from wdl_aid.server import serve
+        serve(args.serve, args.serve_root, job_defaults(args))
+        return
+    jobs = create_jobs(args)
+    if args.check:
+        from wdl_aid.check import run_check
+        if not run_check(jobs, args.jobs, args.fail_fast, args.check_report):
+            sys.exit(1)
+        return
+    if args.format != "ndjson":
+        check_outputs(jobs)
+    if args.watch:
+        for job in jobs:
+            error = try_document_workflow(job)
+            if error is not None:
+                print(f"Failed to document {job['wdlfile']}:\n{error}\n",
+                      file=sys.stderr)
+        try:
+            Watcher(jobs, try_document_workflow).run()
+        except KeyboardInterrupt:
+            pass
+        return
+    # The phases and calls in other processes would not be recorded.
+    processes = (1 if args.profile is not None or args.timings
+                 else args.jobs)
+    with contextlib.ExitStack() as stack:
+        if args.profile is not None:
+            stack.enter_context(profile(args.profile))
+        timings = (stack.enter_context(record_timings()) if args.timings
+                   else None)
+        if args.build_manifest is not None:
+            from wdl_aid.build import BuildManifest, incremental_build
+            errors = incremental_build(
+                jobs, BuildManifest(args.build_manifest), processes)
+        elif args.format == "ndjson":
+            errors = write_ndjson(
+                jobs, Path(args.output) if args.output is not None else None,
+                processes)
+        elif len(jobs) == 1:
+            # Errors are only raised when documenting a single workflow.
+            document_workflow(jobs[0])
+            errors = [None]
+        else:
+            errors = run_jobs(jobs, processes)
+    if timings is not None:
+        subject = (jobs[0]["wdlfile"] if len(jobs) == 1
+                   else f"{len(jobs)} workflows")
+        print(f"Timings for {subject}:\n{timings.format()}\n",
+              file=sys.stderr)
+    for job, error in zip(jobs, errors):
+        if error is not None:
+            print(f"Failed to document {job['wdlfile']}:\n{error}\n",
+                  file=sys.stderr)
+    if any(error is not None for error in errors):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import pytest
+
+import wdl_aid.wdl_aid as wa
+
+
+@pytest.fixture
+def job_options():
+    """
+    A factory for jobs, with every option in JOB_OPTIONS set the way the
+    command line would set it when no flags are given.
+    """
+    def make(**options):
+        job = dict({option: None for option in wa.JOB_OPTIONS},
+                   separate_required=True, category_key="category",
+                   description_key="description", fallback_description="???",
+                   fallback_description_to_object=False,
+                   fallback_category="other", strict=False,
+                   strict_inputs=False, strict_outputs=False)
+        job.update(options)
+        return job
+    return make
@@ -0,0 +1,142 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+import wdl_aid.wdl_aid as wa
+from wdl_aid.build import BuildManifest, incremental_build, job_state
+
+filesdir = Path(__file__).parent / Path("files")
+
+
+@pytest.fixture
+def make_jobs(tmpdir, job_options):
+    def make(**options):
+        jobs = []
+        for wdlfile in ["workflow.wdl", "imported.wdl"]:
+            shutil.copy(filesdir / Path(wdlfile), tmpdir.strpath)
+            jobs.append(job_options(
+                wdlfile=tmpdir.join(wdlfile).strpath,
+                output=tmpdir.strpath + "/docs/{stem}.md", **options))
+        return jobs
+    return make
+
+
+def age(path):
+    """Make a file look old, so it can be seen whether it is rewritten."""
+    os.utime(path, ns=(0, 0))
+    return os.stat(path).st_mtime_ns
+
+
+def test_job_state(tmpdir, make_jobs):
+    job = make_jobs(template=filesdir / Path("test.template"))[0]
+    state = job_state(job)
+    assert set(state["dependencies"]) == {
+        tmpdir.join("workflow.wdl").strpath,
+        tmpdir.join("imported.wdl").strpath,
+        os.path.abspath(filesdir / Path("test.template"))}
+    assert state["options"]["template"] == str(
+        filesdir / Path("test.template"))
+    assert json.loads(json.dumps(state)) == state
+
+
+def test_incremental_build(tmpdir, make_jobs):
+    jobs = make_jobs()
+    manifest_path = Path(tmpdir.join("build.json").strpath)
+    assert incremental_build(jobs, BuildManifest(manifest_path)) == [
+        None, None]
+    workflow_md = tmpdir.join("docs", "workflow.md").strpath
+    imported_md = tmpdir.join("docs", "imported.md").strpath
+    mtimes = [age(workflow_md), age(imported_md)]
+
+    # Nothing changed.
+    incremental_build(jobs, BuildManifest(manifest_path))
+    assert [age(workflow_md), age(imported_md)] == mtimes
+
+    # Only the workflow changed.
+    with tmpdir.join("workflow.wdl").open("a") as wdl:
+        wdl.write("\n")
+    incremental_build(jobs, BuildManifest(manifest_path))
+    # The documentation is the same, so it is not rewritten either.
+    assert [age(workflow_md), age(imported_md)] == mtimes
+
+    # The imported file changed, which affects both workflows.
+    tmpdir.join("imported.wdl").write(tmpdir.join("imported.wdl").read(
+        ).replace("workflow sw", "workflow renamed"))
+    incremental_build(jobs, BuildManifest(manifest_path))
+    assert "# renamed" in tmpdir.join("docs", "imported.md").read()
+    assert os.stat(workflow_md).st_mtime_ns == mtimes[0]
+
+
+def test_incremental_build_rebuilds(tmpdir, monkeypatch, make_jobs):
+    jobs = make_jobs()
+    manifest_path = Path(tmpdir.join("build.json").strpath)
+    incremental_build(jobs, BuildManifest(manifest_path))
+    built = []
+    document_workflow = wa.document_workflow
+
+    def counting_document_workflow(job):
+        built.append(os.path.basename(job["wdlfile"]))
+        return document_workflow(job)
+
+    monkeypatch.setattr("wdl_aid.build.document_workflow",
+                        counting_document_workflow)
+    incremental_build(jobs, BuildManifest(manifest_path))
+    assert built == []
+    # Removed outputs are regenerated.
+    tmpdir.join("docs", "imported.md").remove()
+    incremental_build(jobs, BuildManifest(manifest_path))
+    assert built == ["imported.wdl"]
+    # As are those for which the options changed.
+    jobs[0]["fallback_category"] = "advanced"
+    incremental_build(jobs, BuildManifest(manifest_path))
+    assert built == ["imported.wdl", "workflow.wdl"]
+
+
+def test_main_build_manifest(tmpdir, make_jobs):
+    make_jobs()
+    sys.argv = ["script", tmpdir.join("workflow.wdl").strpath,
+                "-o", tmpdir.strpath + "/{stem}.md",
+                "--build-manifest", tmpdir.join("build.json").strpath]
+    wa.main()
+    manifest = BuildManifest(Path(tmpdir.join("build.json").strpath))
+    assert [list(entry["outputs"]) for entry in manifest.entries.values()
+            ] == [[tmpdir.join("workflow.md").strpath]]
+
+
+def test_incremental_build_renders(tmpdir, make_jobs):
+    jobs = make_jobs(renders=[
+        (filesdir / Path("test.template"), tmpdir.strpath + "/{stem}.txt")])
+    manifest_path = Path(tmpdir.join("build.json").strpath)
+    incremental_build(jobs, BuildManifest(manifest_path))
+    assert tmpdir.join("workflow.txt").check()
+    mtime = age(tmpdir.join("docs", "workflow.md").strpath)
+    tmpdir.join("workflow.txt").remove()
+    incremental_build(jobs, BuildManifest(manifest_path))
+    assert tmpdir.join("workflow.txt").check()
+    assert os.stat(tmpdir.join("docs", "workflow.md").strpath
+                   ).st_mtime_ns == mtime
@@ -0,0 +1,139 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+import wdl_aid.cache as cache
+import wdl_aid.wdl_aid as wa
+
+filesdir = Path(__file__).parent / Path("files")
+
+
+def test_import_closure():
+    closure = cache.import_closure(str(filesdir / Path("workflow.wdl")))
+    assert set(closure.keys()) == {
+        os.path.abspath(filesdir / Path("workflow.wdl")),
+        os.path.abspath(filesdir / Path("imported.wdl"))}
+    assert closure[os.path.abspath(filesdir / Path("imported.wdl"))] == \
+        cache.file_digest(str(filesdir / Path("imported.wdl")))
+
+
+def test_values_cache_key(tmpdir):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    wdlfile = tmpdir.join("workflow.wdl").strpath
+    values_cache = cache.ValuesCache(Path(tmpdir.join("cache").strpath))
+    key = values_cache.key(wdlfile, ["category"])
+    assert values_cache.key(wdlfile, ["category"]) == key
+    assert values_cache.key(wdlfile, ["cat"]) != key
+    with tmpdir.join("imported.wdl").open("a") as imported:
+        imported.write("\n")
+    assert values_cache.key(wdlfile, ["category"]) != key
+
+
+def test_values_cache_get_put(tmpdir):
+    values_cache = cache.ValuesCache(Path(tmpdir.strpath))
+    assert values_cache.get("a") is None
+    values_cache.put("a", {"x": [1, 2]})
+    assert values_cache.get("a") == {"x": [1, 2]}
+    assert [p.name for p in Path(tmpdir.strpath).iterdir()] == ["a.json"]
+
+
+def test_values_cache_evict(tmpdir):
+    values_cache = cache.ValuesCache(Path(tmpdir.strpath), max_size=25)
+    values_cache.put("a", "0123456789")
+    values_cache.put("b", "0123456789")
+    os.utime(values_cache.path("a"), (0, 0))
+    os.utime(values_cache.path("b"), (1, 1))
+    values_cache.get("a")  # Makes "a" the most recently used entry.
+    values_cache.put("c", "0123456789")
+    assert values_cache.get("a") is not None
+    assert values_cache.get("b") is None
+    assert values_cache.get("c") is not None
+
+
+def test_values_cache_evict_compiled_templates(tmpdir):
+    values_cache = cache.ValuesCache(Path(tmpdir.strpath), max_size=25)
+    values_cache.bytecode_directory.mkdir()
+    compiled = values_cache.bytecode_directory / "__jinja2_x.cache"
+    compiled.write_text("0123456789")
+    os.utime(compiled, (0, 0))
+    values_cache.put("a", "0123456789")
+    values_cache.put("b", "0123456789")
+    # The compiled template was the least recently used.
+    assert not compiled.exists()
+    assert values_cache.get("a") is not None
+    assert values_cache.get("b") is not None
+
+
+def test_values_cache_evict_stale_temporary_files(tmpdir):
+    values_cache = cache.ValuesCache(Path(tmpdir.strpath))
+    values_cache.bytecode_directory.mkdir()
+    stale = [Path(tmpdir.join("crashed.tmp").strpath),
+             values_cache.bytecode_directory / "crashed.tmp"]
+    for path in stale:
+        path.write_text("partial")
+        os.utime(path, (0, 0))
+    recent = Path(tmpdir.join("writing.tmp").strpath)
+    recent.write_text("partial")
+    values_cache.put("a", "0123456789")
+    assert not any(path.exists() for path in stale)
+    assert recent.exists()
+
+
+def test_job_template_uses_bytecode_directory(tmpdir):
+    values_cache = cache.ValuesCache(Path(tmpdir.strpath))
+    template_file = tmpdir.join("template.j2")
+    template_file.write("{{ workflow_name }}")
+    wa.job_template({"cache": values_cache}, Path(template_file.strpath))
+    assert list(values_cache.bytecode_directory.glob("*.cache"))
+
+
+def test_collect_values_cache(tmpdir, monkeypatch):
+    values_cache = cache.ValuesCache(Path(tmpdir.strpath))
+    arguments = [str(filesdir / Path("workflow.wdl")), True, "category",
+                 "other", "description", "...", False, False, False]
+    values = wa.collect_values(*arguments, cache=values_cache)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The WDL file should not be parsed.")
+    monkeypatch.setattr(wa.WDL, "load", fail)
+    assert wa.collect_values(*arguments, cache=values_cache) == values
+    arguments[-1] = True
+    with pytest.raises(ValueError):
+        wa.collect_values(*arguments, cache=values_cache)
+
+
+def test_collect_values_cache_extract(tmpdir, monkeypatch):
+    values_cache = cache.ValuesCache(Path(tmpdir.strpath))
+    arguments = [str(filesdir / Path("workflow.wdl")), True, "category",
+                 "other", "description", "...", False, False, False]
+    wa.collect_values(*arguments, cache=values_cache)
+    arguments[2:4] = ["cat", "advanced"]
+    expected = wa.collect_values(*arguments)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The WDL file should not be parsed.")
+    monkeypatch.setattr(wa.WDL, "load", fail)
+    assert wa.collect_values(*arguments, cache=values_cache) == expected
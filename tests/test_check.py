@@ -0,0 +1,121 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+import wdl_aid.wdl_aid as wa
+from wdl_aid.check import check_workflow, check_workflows, report, run_check
+
+filesdir = Path(__file__).parent / Path("files")
+
+
+def job(wdlfile, **options):
+    defaults = {"wdlfile": str(filesdir / Path(wdlfile)), "strict": False,
+                "strict_inputs": False, "strict_outputs": False}
+    defaults.update(options)
+    return defaults
+
+
+@pytest.mark.parametrize("wdlfile", ["workflow.wdl",
+                                     "no_output_parameter_meta.wdl"])
+def test_check_workflow_matches_collect_values(wdlfile):
+    extract = wa.extract_workflow(
+        wa.load_workflow(str(filesdir / Path(wdlfile))))
+    _, inputs_missing, outputs_missing = wa.gather_values(
+        wdlfile, extract, True, "category", "other", "description", "???",
+        False)
+    result = check_workflow(job(wdlfile))
+    assert result["missing_inputs"] == inputs_missing
+    assert result["missing_outputs"] == outputs_missing
+    assert result["error"] is None
+
+
+def test_check_workflow():
+    result = check_workflow(job("workflow.wdl"))
+    assert result["workflow_name"] == "test"
+    assert result["missing_inputs"] == ["test.echo.missingDescription",
+                                        "test.sw.workflowOptional"]
+    assert result["missing_outputs"] == ["test.output2"]
+
+
+def test_check_workflow_strict_outputs():
+    result = check_workflow(job("workflow.wdl", strict_outputs=True))
+    assert (result["inputs"], result["missing_inputs"]) == (0, [])
+    assert result["missing_outputs"] == ["test.output2"]
+
+
+def test_check_workflow_error():
+    result = check_workflow(job("no_workflow.wdl"))
+    assert result["error"] == \
+        "ValueError: No workflow is available in the WDL file."
+
+
+def test_check_workflows_fail_fast():
+    jobs = [job("no_output_parameter_meta.wdl", strict_inputs=True),
+            job("workflow.wdl"), job("imported.wdl")]
+    assert len(check_workflows(jobs)) == 3
+    results = check_workflows(jobs, fail_fast=True)
+    assert [result["wdlfile"] for result in results] == \
+        [jobs[0]["wdlfile"], jobs[1]["wdlfile"]]
+    summary = report(results, len(jobs))
+    assert summary["passed"] is False
+    assert (summary["workflows"], summary["checked"], summary["failed"]) == \
+        (3, 2, 1)
+
+
+def test_report_passed():
+    jobs = [job("no_output_parameter_meta.wdl", strict_inputs=True)]
+    summary = report(check_workflows(jobs), len(jobs))
+    assert summary["passed"] is True
+    assert summary["coverage"] == 1.0
+
+
+def test_run_check_report(tmpdir, capsys):
+    report_file = Path(tmpdir.strpath) / "report.json"
+    assert not run_check([job("workflow.wdl")], report_file=report_file)
+    summary = json.loads(report_file.read_text())
+    assert summary["missing_outputs"] == 1
+    assert summary["results"][0]["missing_outputs"] == ["test.output2"]
+    assert "Missing parameter_meta for outputs:\ntest.output2" in \
+        capsys.readouterr().err
+
+
+def test_main_check(capsys):
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                str(filesdir / Path("imported.wdl")), "--check"]
+    with pytest.raises(SystemExit) as e:
+        wa.main()
+    assert e.value.code == 1
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "test.echo.missingDescription" in captured.err
+
+
+def test_main_check_passed(capsys):
+    sys.argv = ["script", str(filesdir / Path("no_output_parameter_meta.wdl")),
+                "--check", "--strict-inputs"]
+    wa.main()
+    assert capsys.readouterr().err == ""
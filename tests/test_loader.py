@@ -0,0 +1,126 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import shutil
+
+import pytest
+import WDL
+from pathlib import Path
+
+import wdl_aid.wdl_aid as wa
+from wdl_aid.loader import DocumentCache
+
+filesdir = Path(__file__).parent / Path("files")
+
+
+def test_document_cache_shares_imports(tmpdir):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    tmpdir.join("other.wdl").write(
+        'version 1.0\n\nimport "imported.wdl"\n\n'
+        'workflow other {\n    call imported.echo\n}\n')
+    document_cache = DocumentCache()
+    document = document_cache.load(tmpdir.join("workflow.wdl").strpath)
+    other = document_cache.load(tmpdir.join("other.wdl").strpath)
+    assert other.imports[0].doc is document.imports[0].doc
+    assert (document_cache.hits, document_cache.misses) == (1, 3)
+    assert document_cache.load(
+        tmpdir.join("workflow.wdl").strpath) is document
+
+
+def test_document_cache_reloads_changed_imports(tmpdir):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    document_cache = DocumentCache()
+    document = document_cache.load(tmpdir.join("workflow.wdl").strpath)
+    with tmpdir.join("imported.wdl").open("a") as imported:
+        imported.write("\n")
+    reloaded = document_cache.load(tmpdir.join("workflow.wdl").strpath)
+    assert reloaded is not document
+    assert reloaded.imports[0].doc is not document.imports[0].doc
+
+
+def test_collect_values_document_cache():
+    arguments = [str(filesdir / Path("workflow.wdl")), True, "category",
+                 "other", "description", "...", False, False, False]
+    document_cache = DocumentCache()
+    assert wa.collect_values(*arguments, document_cache=document_cache) == \
+        wa.collect_values(*arguments)
+    assert wa.collect_values(*arguments, document_cache=document_cache) == \
+        wa.collect_values(*arguments)
+    assert (document_cache.hits, document_cache.misses) == (2, 2)
+
+
+BROKEN_TASK = """version 1.0
+
+workflow broken {
+    call task_with_errors
+}
+
+task task_with_errors {
+    input {
+        String name
+        Int count = "not an integer"
+    }
+    command <<<
+        echo ~{undefined}
+    >>>
+    output {
+        String out = read_string(stdout()) + 1
+    }
+    runtime {
+        memory: undefined_memory
+    }
+}
+"""
+
+
+def test_document_cache_without_typechecking_tasks(tmpdir):
+    tmpdir.join("broken.wdl").write(BROKEN_TASK)
+    document_cache = DocumentCache()
+    with pytest.raises(WDL.Error.MultipleValidationErrors):
+        document_cache.load(tmpdir.join("broken.wdl").strpath)
+    document = document_cache.load(tmpdir.join("broken.wdl").strpath,
+                                   typecheck_tasks=False)
+    assert [binding.name for binding in
+            document.workflow.required_inputs] == ["task_with_errors.name"]
+    # Documents loaded without typechecking the tasks are not reused when
+    # typechecking them is requested.
+    with pytest.raises(WDL.Error.MultipleValidationErrors):
+        document_cache.load(tmpdir.join("broken.wdl").strpath)
+
+
+def test_document_cache_without_typechecking_tasks_checks_types(tmpdir):
+    tmpdir.join("wrong.wdl").write(BROKEN_TASK.replace(
+        "call task_with_errors",
+        "call task_with_errors {input: count = [1]}"))
+    with pytest.raises(WDL.Error.ValidationError):
+        DocumentCache().load(tmpdir.join("wrong.wdl").strpath,
+                             typecheck_tasks=False)
+
+
+@pytest.mark.parametrize("wdlfile", ["workflow.wdl",
+                                     "no_output_parameter_meta.wdl"])
+def test_collect_values_fast(wdlfile):
+    arguments = [str(filesdir / Path(wdlfile)), True, "category", "other",
+                 "description", "...", False, False, False]
+    assert wa.collect_values(*arguments, fast=True) == \
+        wa.collect_values(*arguments)
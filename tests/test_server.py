@@ -0,0 +1,231 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import os
+import shutil
+import socket
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+import wdl_aid.server as server_module
+import wdl_aid.wdl_aid as wa
+from wdl_aid.sources import ImportIndex
+from wdl_aid.server import (BOOLEAN_OPTIONS, STRING_OPTIONS,
+                            DocumentationServer, DocumentationService,
+                            UnixDocumentationServer, parse_address)
+
+filesdir = Path(__file__).parent / Path("files")
+
+
+@pytest.fixture
+def server(tmpdir, job_options):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    service = DocumentationService(Path(tmpdir.strpath), job_options())
+    server = DocumentationServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path):
+    host, port = server.server_address
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}{path}") as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def test_parse_address():
+    assert parse_address("8080") == ("127.0.0.1", 8080)
+    assert parse_address("0.0.0.0:8080") == ("0.0.0.0", 8080)
+    assert parse_address("unix:/tmp/wdl-aid.sock") == "/tmp/wdl-aid.sock"
+
+
+def test_parse_address_invalid():
+    with pytest.raises(ValueError):
+        parse_address("localhost")
+
+
+def test_server_docs(server):
+    status, body = get(server, "/docs/workflow.wdl")
+    with (filesdir / Path("expected.md")).open("r") as expected_output:
+        expected = expected_output.readlines()[:-1]
+    assert status == 200
+    assert body.splitlines(True) == expected + [
+        "> Generated using WDL AID ({})\n".format(wa.__version__)]
+
+
+def test_server_values(server):
+    status, body = get(server, "/values/workflow.wdl")
+    assert status == 200
+    values = json.loads(body)
+    assert values["schema_version"] == wa.JSON_SCHEMA_VERSION
+    assert values["workflow_name"] == "test"
+    assert "required" in values["inputs"]
+
+
+def test_server_query(server):
+    status, body = get(server,
+                       "/values/workflow.wdl?separate_required=false")
+    assert status == 200
+    assert "required" not in json.loads(body)["inputs"]
+    status, body = get(server, "/values/workflow.wdl?separate_required=maybe")
+    assert status == 400
+    status, body = get(server, "/values/workflow.wdl?output=x")
+    assert status == 400
+
+
+def test_server_errors(server, tmpdir):
+    assert get(server, "/docs/missing.wdl")[0] == 404
+    assert get(server, "/docs/%2E%2E/workflow.wdl")[0] == 404
+    assert get(server, "/something")[0] == 404
+    assert get(server, "/values/workflow.wdl?strict=true")[0] == 422
+
+
+def test_server_invalidation(server, tmpdir):
+    status, body = get(server, "/values/workflow.wdl")
+    assert "newInput" not in body
+    values_cache = server.service.values_cache
+    assert len(values_cache) == 1
+    cached = next(iter(values_cache.values()))
+    assert get(server, "/values/workflow.wdl")[1] == body
+    assert next(iter(values_cache.values())) is cached
+    wdl = tmpdir.join("imported.wdl").read()
+    tmpdir.join("imported.wdl").write(wdl.replace(
+        "input {", "input {\n        String newInput = \"a\"", 1))
+    stat = os.stat(tmpdir.join("imported.wdl").strpath)
+    os.utime(tmpdir.join("imported.wdl").strpath,
+             ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    status, body = get(server, "/values/workflow.wdl")
+    assert status == 200
+    assert "newInput" in body
+
+
+def test_unix_server(tmpdir, job_options):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    service = DocumentationService(Path(tmpdir.strpath),
+                                   job_options())
+    socket_path = tmpdir.join("wdl-aid.sock").strpath
+    server = UnixDocumentationServer(socket_path, service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(socket_path)
+            client.sendall(b"GET /values/workflow.wdl HTTP/1.0\r\n\r\n")
+            response = b""
+            while True:
+                data = client.recv(4096)
+                if not data:
+                    break
+                response += data
+    finally:
+        server.shutdown()
+        server.server_close()
+    head, _, body = response.decode().partition("\r\n\r\n")
+    assert head.startswith("HTTP/1.0 200")
+    assert json.loads(body)["workflow_name"] == "test"
+    assert not tmpdir.join("wdl-aid.sock").exists()
+
+
+def test_service_refreshes_import_index(tmpdir, job_options):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    tmpdir.mkdir("first")
+    tmpdir.mkdir("second")
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.join("second"))
+    import_index = ImportIndex([tmpdir.join("first").strpath,
+                                tmpdir.join("second").strpath])
+    service = DocumentationService(Path(tmpdir.strpath),
+                                   job_options(import_index=import_index))
+    job = service.job("workflow.wdl", {})
+    service.values(job)
+    tmpdir.join("second", "imported.wdl").move(
+        tmpdir.join("first", "imported.wdl"))
+    for directory in ("first", "second"):
+        stat = os.stat(tmpdir.join(directory).strpath)
+        os.utime(tmpdir.join(directory).strpath,
+                 ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    service.values(job)
+    assert import_index.lookup("imported.wdl") == \
+        tmpdir.join("first", "imported.wdl").strpath
+    states, _ = next(iter(service.values_cache.values()))
+    assert tmpdir.join("first", "imported.wdl").strpath in states
+
+
+def test_service_warm_values_do_not_wait_for_collecting(tmpdir, job_options,
+                                                        monkeypatch):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    service = DocumentationService(Path(tmpdir.strpath), job_options())
+    warm_job = service.job("imported.wdl", {})
+    warm_values = service.values(warm_job)
+    collecting = threading.Event()
+    release = threading.Event()
+    job_values = server_module.job_values
+
+    def slow_job_values(job):
+        collecting.set()
+        release.wait(10)
+        return job_values(job)
+
+    monkeypatch.setattr(server_module, "job_values", slow_job_values)
+    cold = threading.Thread(
+        target=service.values, args=(service.job("workflow.wdl", {}),))
+    cold.start()
+    try:
+        assert collecting.wait(10)
+        warm = []
+        warm_request = threading.Thread(
+            target=lambda: warm.append(service.values(warm_job)))
+        warm_request.start()
+        warm_request.join(5)
+        # Answered while the other workflow is still being collected.
+        assert len(warm) == 1 and warm[0] is warm_values
+    finally:
+        release.set()
+        cold.join()
+    assert len(service.values_cache) == 2
+
+
+def test_service_values_cache_is_bounded(tmpdir, job_options):
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    service = DocumentationService(Path(tmpdir.strpath), job_options(),
+                                   max_cached_values=2)
+    jobs = [service.job("imported.wdl", {"fallback_description": [text]})
+            for text in ("a", "b", "c")]
+    first = service.values(jobs[0])
+    service.values(jobs[1])
+    # Using the first values makes the second the least recently used.
+    assert service.values(jobs[0]) is first
+    service.values(jobs[2])
+    position = (1 + len(BOOLEAN_OPTIONS) +
+                STRING_OPTIONS.index("fallback_description"))
+    assert [key[position] for key in service.values_cache] == ["a", "c"]
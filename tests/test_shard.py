@@ -0,0 +1,175 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+import wdl_aid.wdl_aid as wa
+from wdl_aid.shard import entry_call, shard_values
+
+filesdir = Path(__file__).parent / Path("files")
+
+
+def collect(wdlfile):
+    return wa.collect_values(str(wdlfile), True, "category", "other",
+                             "description", "???", False, False, False)
+
+
+def names(shard):
+    return {kind: {category: [entry.name for entry in entries]
+                   for category, entries in shard[kind].items()}
+            for kind in ("inputs", "outputs")}
+
+
+def test_entry_call():
+    assert entry_call("test.input1") == "test"
+    assert entry_call("test.echo.taskOptional") == "echo"
+    assert entry_call("test.sw.echo.taskOptional") == "sw"
+
+
+def test_shard_values_category():
+    values = collect(filesdir / Path("workflow.wdl"))
+    shards = shard_values(values, "category", 200)
+    assert [name for name, _ in shards] == [
+        "required", "other", "advanced", "outputs"]
+    assert names(shards[1][1]) == {
+        "inputs": {"other": ["test.echo.missingDescription", "test.input2",
+                             "test.sw.workflowOptional"]},
+        "outputs": {}}
+    assert names(shards[3][1])["outputs"] == {
+        "other": ["test.output1", "test.output2", "test.output3"],
+        "category": ["test.output4"]}
+    assert shards[0][1]["workflow_name"] == "test"
+
+
+def test_shard_values_call():
+    values = collect(filesdir / Path("workflow.wdl"))
+    shards = shard_values(values, "call", 200)
+    assert [name for name, _ in shards] == ["test", "echo", "sw"]
+    assert names(shards[1][1]) == {
+        "inputs": {"other": ["test.echo.missingDescription"],
+                   "advanced": ["test.echo.taskOptional"]},
+        "outputs": {}}
+
+
+def test_shard_values_both_and_pages():
+    values = collect(filesdir / Path("workflow.wdl"))
+    shards = shard_values(values, "both", 2)
+    assert [name for name, _ in shards] == [
+        "test-required", "test-other", "test-outputs-1", "test-outputs-2",
+        "echo-other", "echo-advanced", "sw-other"]
+    assert names(shards[3][1])["outputs"] == {
+        "other": ["test.output3"], "category": ["test.output4"]}
+
+
+def test_shard_values_unknown_mode():
+    with pytest.raises(ValueError):
+        shard_values(collect(filesdir / Path("workflow.wdl")), "size", 10)
+
+
+@pytest.mark.parametrize("size", [0, -1])
+def test_shard_values_invalid_size(size):
+    with pytest.raises(ValueError):
+        shard_values(collect(filesdir / Path("workflow.wdl")), "category",
+                     size)
+
+
+def test_main_invalid_shard_size(tmpdir):
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                "--shard-by", "call", "--shard-size", "0",
+                "-o", tmpdir.join("docs.md").strpath]
+    with pytest.raises(SystemExit) as e:
+        wa.main()
+    assert e.value.code == 2
+
+
+@pytest.mark.parametrize(["categories", "size"], [
+    (["a b", "a_b"], 10),
+    (["Common", "common"], 10),
+    (["other", "other-1"], 1)])
+def test_shard_values_name_collision(categories, size):
+    values = {"inputs": {}, "outputs": {}}
+    for number, category in enumerate(categories):
+        # Only the first category is split into pages.
+        values["inputs"][category] = [
+            wa.InputEntry(f"wf.input{number}.{page}", "Int", "", None)
+            for page in range(2 if number == 0 else 1)]
+    with pytest.raises(ValueError, match="would both be written"):
+        shard_values(values, "category", size)
+
+
+@pytest.fixture
+def make_job(tmpdir, job_options):
+    def make(**options):
+        job = job_options(wdlfile=tmpdir.join("workflow.wdl").strpath,
+                          output=tmpdir.strpath + "/docs/{stem}.md",
+                          shard_by="call")
+        job.update(options)
+        return job
+    return make
+
+
+def test_document_workflow_shards(tmpdir, make_job):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    job = make_job(render_threads=2)
+    written = wa.document_workflow(job)
+    docs = Path(tmpdir.join("docs").strpath)
+    assert written == [docs / "workflow.md", docs / "workflow" / "test.md",
+                       docs / "workflow" / "echo.md",
+                       docs / "workflow" / "sw.md"]
+    index = (docs / "workflow.md").read_text()
+    assert "- [echo](workflow/echo.md) (2 inputs, 0 outputs)" in index
+    echo = (docs / "workflow" / "echo.md").read_text()
+    assert echo.startswith("# test: echo\n[Index](../workflow.md)\n")
+    assert "test.echo.taskOptional" in echo
+    assert "test.input1" not in echo
+
+    mtimes = {}
+    for shard_file in written[1:]:
+        os.utime(shard_file, ns=(0, 0))
+        mtimes[shard_file.name] = 0
+    # Only the shard for the echo call changes.
+    wdl = tmpdir.join("imported.wdl").read()
+    tmpdir.join("imported.wdl").write(wdl.replace(
+        "String? taskOptional", "String? taskOptional\n        Int? new"))
+    wa.document_workflow(job)
+    assert os.stat(docs / "workflow" / "test.md").st_mtime_ns == 0
+    assert os.stat(docs / "workflow" / "sw.md").st_mtime_ns == 0
+    assert "test.echo.new" in (docs / "workflow" / "echo.md").read_text()
+
+    # Shards which no longer exist are removed.
+    job["shard_by"] = "category"
+    wa.document_workflow(job)
+    assert sorted(os.listdir(docs / "workflow")) == [
+        ".shards.json", "advanced.md", "other.md", "outputs.md",
+        "required.md"]
+
+
+def test_document_workflow_shards_requires_output(tmpdir, make_job):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    with pytest.raises(ValueError):
+        wa.document_workflow(make_job(output=None))
@@ -0,0 +1,277 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import asyncio
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+import wdl_aid.cache as cache
+import wdl_aid.sources as sources
+import wdl_aid.wdl_aid as wa
+from wdl_aid.sources import (ImportIndex, ImportPrefetcher, SourceMirror,
+                             resolve_import)
+
+filesdir = Path(__file__).parent / Path("files")
+REMOTE_IMPORTED = "https://example.com/wdl/imported.wdl"
+
+
+def test_resolve_import(tmpdir):
+    tmpdir.mkdir("search").join("lib.wdl").write("version 1.0\n")
+    tmpdir.join("lib.wdl").write("version 1.0\n")
+    tmpdir.join("main.wdl").write("version 1.0\n")
+    importer = tmpdir.join("main.wdl").strpath
+    search_path = [tmpdir.join("search").strpath]
+    # The directory of the importing document takes precedence.
+    assert resolve_import("lib.wdl", search_path, importer) == \
+        tmpdir.join("lib.wdl").strpath
+    assert resolve_import("lib.wdl", search_path, "/elsewhere/main.wdl") == \
+        tmpdir.join("search", "lib.wdl").strpath
+    assert resolve_import(f"file://{importer}", [], None) == importer
+    with pytest.raises(FileNotFoundError):
+        resolve_import("missing.wdl", search_path, importer)
+
+
+def test_resolve_import_remote():
+    assert resolve_import(REMOTE_IMPORTED, [], "/local/main.wdl") == \
+        REMOTE_IMPORTED
+    assert resolve_import("../tasks/lib.wdl", [], REMOTE_IMPORTED) == \
+        "https://example.com/tasks/lib.wdl"
+
+
+def test_source_mirror_local(tmpdir):
+    wdlfile = tmpdir.join("workflow.wdl")
+    wdlfile.write("version 1.0\n")
+    mirror = SourceMirror(Path(tmpdir.strpath) / "mirror")
+    state = mirror.file_state(wdlfile.strpath)
+    assert mirror.lookup(wdlfile.strpath, state) is None
+    assert mirror.read(wdlfile.strpath) == "version 1.0\n"
+    assert mirror.lookup(wdlfile.strpath, state) == "version 1.0\n"
+    wdlfile.write("version 1.1\n")
+    os.utime(wdlfile.strpath, ns=(0, state[1] + 10 ** 9))
+    assert mirror.read(wdlfile.strpath) == "version 1.1\n"
+
+
+def test_source_mirror_remote(tmpdir, monkeypatch):
+    fetched = []
+
+    def fake_fetch(uri):
+        fetched.append(uri)
+        return "version 1.0\n"
+
+    monkeypatch.setattr(sources, "fetch", fake_fetch)
+    mirror_dir = Path(tmpdir.strpath) / "mirror"
+    with pytest.raises(ValueError):
+        SourceMirror(mirror_dir, offline=True).read(REMOTE_IMPORTED)
+    assert SourceMirror(mirror_dir).read(REMOTE_IMPORTED) == "version 1.0\n"
+    assert SourceMirror(mirror_dir).read(REMOTE_IMPORTED) == "version 1.0\n"
+    assert SourceMirror(mirror_dir, offline=True).read(
+        REMOTE_IMPORTED) == "version 1.0\n"
+    assert fetched == [REMOTE_IMPORTED]
+
+
+def test_import_prefetcher_prefetches_imports():
+    prefetcher = ImportPrefetcher()
+    wdlfile = str(filesdir / Path("workflow.wdl"))
+
+    async def read_workflow():
+        result = await prefetcher(wdlfile, [], None)
+        # The import is being read before the workflow is parsed.
+        assert ("imported.wdl", wdlfile) in prefetcher.reads
+        return result, await prefetcher.reads[("imported.wdl", wdlfile)]
+
+    result, imported = asyncio.run(read_workflow())
+    assert result.abspath == wdlfile
+    assert imported.abspath == str(filesdir / Path("imported.wdl"))
+
+
+def test_import_prefetcher_ignores_unused_errors():
+    async def read_source():
+        prefetcher = ImportPrefetcher()
+        prefetcher.read("missing.wdl", [], None)
+        return await prefetcher(str(filesdir / Path("imported.wdl")), [],
+                                None)
+
+    assert asyncio.run(read_source()).abspath == \
+        str(filesdir / Path("imported.wdl"))
+
+
+def test_collect_values_remote_import(tmpdir, monkeypatch):
+    source_text = (filesdir / Path("imported.wdl")).read_text()
+    monkeypatch.setattr(sources, "fetch", lambda uri: source_text)
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    wdlfile = tmpdir.join("workflow.wdl")
+    wdlfile.write(wdlfile.read().replace('"imported.wdl"',
+                                         f'"{REMOTE_IMPORTED}"'))
+    arguments = [wdlfile.strpath, True, "category", "other", "description",
+                 "...", False, False, False]
+    mirror_dir = Path(tmpdir.strpath) / "mirror"
+    values = wa.collect_values(*arguments,
+                               mirror=SourceMirror(mirror_dir))
+
+    def unavailable(uri):
+        raise OSError("network unavailable")
+
+    monkeypatch.setattr(sources, "fetch", unavailable)
+    assert wa.collect_values(
+        *arguments, mirror=SourceMirror(mirror_dir, offline=True)) == values
+    local_values = wa.collect_values(str(filesdir / Path("workflow.wdl")),
+                                     *arguments[1:])
+    local_values["workflow_file"] = wdlfile.strpath
+    assert values == local_values
+
+
+def import_tree(tmpdir):
+    tmpdir.mkdir("first").mkdir("tasks").join("lib.wdl").write(
+        "version 1.0\n")
+    tmpdir.mkdir("second").mkdir("tasks").join("lib.wdl").write(
+        "version 1.0\n")
+    tmpdir.join("second", "tasks", "notes.txt").write("")
+    return [tmpdir.join("first").strpath, tmpdir.join("second").strpath]
+
+
+def test_import_index(tmpdir):
+    directories = import_tree(tmpdir)
+    import_index = ImportIndex(directories)
+    # Later directories take precedence, as with miniwdl.
+    assert import_index.lookup("tasks/lib.wdl") == \
+        tmpdir.join("second", "tasks", "lib.wdl").strpath
+    assert import_index.lookup("./tasks/../tasks/lib.wdl") == \
+        tmpdir.join("second", "tasks", "lib.wdl").strpath
+    assert import_index.lookup("tasks/notes.txt") is None
+    assert resolve_import("tasks/lib.wdl", directories, None,
+                          import_index) == \
+        resolve_import("tasks/lib.wdl", directories, None)
+    assert resolve_import("tasks/notes.txt", directories, None,
+                          import_index) == \
+        tmpdir.join("second", "tasks", "notes.txt").strpath
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_import_index_moved_file(tmpdir):
+    directories = import_tree(tmpdir)
+    import_index = ImportIndex(directories)
+    tmpdir.join("second", "tasks", "lib.wdl").remove()
+    # The index is stale, but the file is found by searching.
+    assert resolve_import("tasks/lib.wdl", directories, None,
+                          import_index) == \
+        tmpdir.join("first", "tasks", "lib.wdl").strpath
+    bump_mtime(tmpdir.join("second", "tasks").strpath)
+    assert import_index.refresh()
+    assert not import_index.refresh()
+    assert import_index.lookup("tasks/lib.wdl") == \
+        tmpdir.join("first", "tasks", "lib.wdl").strpath
+
+
+def test_import_index_persisted(tmpdir, monkeypatch):
+    directories = import_tree(tmpdir)
+    index_file = Path(tmpdir.strpath) / "index.json"
+    ImportIndex(directories, index_file)
+    scanned = []
+    scan = ImportIndex.scan
+
+    def counting_scan(directory):
+        scanned.append(directory)
+        return scan(directory)
+
+    monkeypatch.setattr(ImportIndex, "scan", staticmethod(counting_scan))
+    assert ImportIndex(directories, index_file).lookup("tasks/lib.wdl") == \
+        tmpdir.join("second", "tasks", "lib.wdl").strpath
+    assert scanned == []
+    tmpdir.join("first", "tasks", "new.wdl").write("version 1.0\n")
+    tasks = tmpdir.join("first", "tasks").strpath
+    os.utime(tasks, ns=(0, os.stat(tasks).st_mtime_ns + 10 ** 9))
+    import_index = ImportIndex(directories, index_file)
+    assert scanned == [directories[0]]
+    assert import_index.lookup("tasks/new.wdl") == \
+        tmpdir.join("first", "tasks", "new.wdl").strpath
+
+
+def test_collect_values_import_index(tmpdir):
+    tmpdir.mkdir("workflows")
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.join("workflows"))
+    tmpdir.mkdir("library")
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.join("library"))
+    import_index = ImportIndex([tmpdir.join("library").strpath])
+    wdlfile = tmpdir.join("workflows", "workflow.wdl").strpath
+    values = wa.collect_values(wdlfile, True, "category", "other",
+                               "description", "...", False, False, False,
+                               import_index=import_index)
+    assert "test.sw.workflowOptional" in [
+        entry.name for entry in values["inputs"]["other"]]
+    assert set(cache.import_closure(wdlfile, import_index)) == {
+        wdlfile, tmpdir.join("library", "imported.wdl").strpath}
+
+
+def test_main_import_path(tmpdir, capsys):
+    tmpdir.mkdir("workflows")
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.join("workflows"))
+    tmpdir.mkdir("library")
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.join("library"))
+    sys.argv = ["script", tmpdir.join("workflows", "workflow.wdl").strpath,
+                "--import-path", tmpdir.join("library").strpath,
+                "--import-index", tmpdir.join("index.json").strpath]
+    wa.main()
+    assert "test.sw.workflowOptional" in capsys.readouterr().out
+    assert tmpdir.join("index.json").check(file=1)
+
+
+def test_collect_values_remote_import_cache(tmpdir, monkeypatch):
+    source_text = (filesdir / Path("imported.wdl")).read_text()
+    monkeypatch.setattr(sources, "fetch", lambda uri: source_text)
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    wdlfile = tmpdir.join("workflow.wdl")
+    wdlfile.write(wdlfile.read().replace('"imported.wdl"',
+                                         f'"{REMOTE_IMPORTED}"'))
+    arguments = [wdlfile.strpath, True, "category", "other", "description",
+                 "...", False, False, False]
+    values_cache = cache.ValuesCache(Path(tmpdir.strpath) / "cache")
+    # Without a mirror, the contents of the remote file are unknown.
+    wa.collect_values(*arguments, cache=values_cache)
+    assert not values_cache.directory.exists()
+    mirror = SourceMirror(Path(tmpdir.strpath) / "mirror")
+    closure = cache.import_closure(wdlfile.strpath, mirror=mirror)
+    assert closure[REMOTE_IMPORTED] is not None
+    wa.collect_values(*arguments, cache=values_cache, mirror=mirror)
+    assert len(list(values_cache.directory.glob("*.json"))) == 2
+
+
+def test_import_closure_follows_remote_imports(tmpdir, monkeypatch):
+    remote_sources = {
+        REMOTE_IMPORTED: 'version 1.0\nimport "../tasks/lib.wdl"\n',
+        "https://example.com/tasks/lib.wdl": "version 1.0\n"}
+    monkeypatch.setattr(sources, "fetch", remote_sources.get)
+    tmpdir.join("workflow.wdl").write(
+        f'version 1.0\nimport "{REMOTE_IMPORTED}"\n')
+    closure = cache.import_closure(
+        tmpdir.join("workflow.wdl").strpath,
+        mirror=SourceMirror(Path(tmpdir.strpath) / "mirror"))
+    assert set(closure) == {tmpdir.join("workflow.wdl").strpath,
+                            *remote_sources}
+    assert None not in closure.values()
@@ -0,0 +1,64 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+from pathlib import Path
+
+import jinja2
+import pytest
+
+import wdl_aid.templates as templates
+import wdl_aid.wdl_aid as wa
+
+filesdir = Path(__file__).parent / Path("files")
+
+
+def test_precompiled_default_template_up_to_date():
+    module = Path(templates.__file__).parent / "default_md_j2.py"
+    shipped_version = module.read_text().splitlines()[2]
+    if shipped_version != f"JINJA2_VERSION = {templates.jinja2_version()!r}":
+        pytest.skip("The precompiled default template was generated with a "
+                    "different version of jinja2.")
+    assert module.read_text() == templates.compile_default_template(), (
+        "Run 'python -m wdl_aid.templates' to update the precompiled "
+        "default template.")
+
+
+def test_load_precompiled_default_template():
+    environment = jinja2.Environment()
+    template = templates.load_precompiled_default_template(environment)
+    assert template is not None
+    assert template.filename.endswith("default_md_j2.py")
+    values = wa.collect_values(str(filesdir / Path("workflow.wdl")), True,
+                               "category", "other", "???", "???", False,
+                               False, False)
+    values = wa.with_sorted_views(values)
+    assert template.render(values) == jinja2.Template(
+        templates.DEFAULT_TEMPLATE).render(values)
+
+
+def test_load_precompiled_default_template_incompatible(monkeypatch):
+    monkeypatch.setattr(templates, "jinja2_version", lambda: "0.1")
+    assert templates.load_precompiled_default_template(
+        jinja2.Environment()) is None
+    monkeypatch.undo()
+    monkeypatch.setattr(templates, "DEFAULT_TEMPLATE", "{{ changed }}")
+    assert templates.load_precompiled_default_template(
+        jinja2.Environment()) is None
@@ -0,0 +1,124 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import json
+import pstats
+import sys
+from pathlib import Path
+
+import wdl_aid.wdl_aid as wa
+from wdl_aid.timing import phase, profile, record_timings
+
+filesdir = Path(__file__).parent / Path("files")
+
+
+def test_phase_without_recording():
+    with phase("nothing"):
+        pass
+
+
+def test_record_timings():
+    with record_timings() as outer:
+        with phase("one"):
+            data = [0] * 100000
+        with record_timings() as inner:
+            with phase("one"):
+                pass
+            with phase("two"):
+                pass
+    del data
+    assert list(outer.phases) == ["one", "two"]
+    assert outer.phases["one"]["count"] == 2
+    assert outer.phases["one"]["peak_memory"] >= 800000
+    assert inner.phases["one"]["count"] == 1
+    assert inner.phases["one"]["peak_memory"] < 800000
+    assert outer.to_dict()["two"]["wall_time"] >= 0
+
+
+def test_record_timings_without_memory():
+    with record_timings(trace_memory=False) as timings:
+        with phase("one"):
+            pass
+    assert timings.to_dict() == {
+        "one": {"count": 1, "wall_time": timings.phases["one"]["wall_time"]}}
+    assert "peak memory" not in timings.format()
+
+
+def test_collect_values_phases():
+    with record_timings() as timings:
+        wa.collect_values(str(filesdir / Path("workflow.wdl")), True,
+                          "category", "other", "description", "???", False,
+                          False, False)
+    assert list(timings.phases) == ["load", "walk", "gather_entries"]
+
+
+def test_profile(tmpdir):
+    output = tmpdir.join("run.prof").strpath
+    with profile(output):
+        sorted(range(1000))
+    assert pstats.Stats(output).total_calls > 0
+
+
+def test_main_timings(capsys, tmpdir):
+    profile_file = tmpdir.join("run.prof").strpath
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")), "--timings",
+                "--profile", profile_file]
+    wa.main()
+    captured = capsys.readouterr()
+    assert captured.out.startswith("# test")
+    lines = captured.err.splitlines()
+    assert lines[0] == f"Timings for {filesdir / Path('workflow.wdl')}:"
+    assert [line.split()[0] for line in lines[2:6]] == [
+        "load", "walk", "gather_entries", "render"]
+    assert "document_workflow" in " ".join(
+        func[2] for func in pstats.Stats(profile_file).stats)
+
+
+def test_main_timings_build_manifest(capsys, tmpdir):
+    build_manifest = tmpdir.join("build.json")
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                str(filesdir / Path("imported.wdl")),
+                "-o", tmpdir.strpath + "/{stem}.md",
+                "--build-manifest", build_manifest.strpath, "--timings"]
+    wa.main()
+    assert build_manifest.check()
+    assert capsys.readouterr().err.startswith("Timings for 2 workflows:")
+    # Nothing changed, so nothing is loaded or rendered again.
+    wa.main()
+    lines = capsys.readouterr().err.splitlines()
+    assert lines[0] == "Timings for 2 workflows:"
+    assert lines[1].split() == ["phase", "count", "wall", "time", "peak",
+                                "memory"]
+    assert lines[2:] == [""]
+
+
+def test_main_timings_ndjson(capsys, tmpdir):
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                str(filesdir / Path("imported.wdl")), "--format", "ndjson",
+                "--timings"]
+    wa.main()
+    captured = capsys.readouterr()
+    assert [json.loads(line)["workflow_name"]
+            for line in captured.out.splitlines()] == ["test", "sw"]
+    lines = captured.err.splitlines()
+    assert lines[0] == "Timings for 2 workflows:"
+    assert [line.split()[:2] for line in lines[2:4]] == [
+        ["load", "2"], ["walk", "2"]]
@@ -0,0 +1,129 @@
+# Copyright (c) 2019 Leiden University Medical Center
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+import wdl_aid.wdl_aid as wa
+from wdl_aid.sources import ImportIndex
+from wdl_aid.watch import Watcher, job_dependencies
+
+filesdir = Path(__file__).parent / Path("files")
+
+
+@pytest.fixture
+def make_job(tmpdir, job_options):
+    def make(wdlfile, **options):
+        return job_options(wdlfile=tmpdir.join(wdlfile).strpath,
+                           output=tmpdir.strpath + "/{stem}.md", **options)
+    return make
+
+
+def touch(path, content):
+    with open(path, "a") as handle:
+        handle.write(content)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_job_dependencies(tmpdir, make_job):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    job = make_job("workflow.wdl",
+                   template=filesdir / Path("test.template"))
+    assert job_dependencies(job) == {
+        tmpdir.join("workflow.wdl").strpath,
+        tmpdir.join("imported.wdl").strpath,
+        os.path.abspath(filesdir / Path("test.template"))}
+
+
+def test_watcher_check(tmpdir, make_job):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    tmpdir.join("extra.json").write('{"a": 1}')
+    template = tmpdir.join("template.j2")
+    template.write("{{ workflow_name }} {{ extra.a }}")
+    jobs = [make_job("workflow.wdl", template=Path(template.strpath),
+                     extra=Path(tmpdir.join("extra.json").strpath)),
+            make_job("imported.wdl", template=Path(template.strpath))]
+    for job in jobs:
+        wa.document_workflow(job)
+    documented = []
+
+    def document(job):
+        documented.append(job["wdlfile"])
+        return wa.try_document_workflow(job)
+    watcher = Watcher(jobs, document, debounce=0)
+    assert watcher.check() == []
+
+    touch(tmpdir.join("imported.wdl").strpath, "\n")
+    assert watcher.check() == [0, 1]
+    assert watcher.check() == []
+
+    tmpdir.join("extra.json").write('{"a": 2}')
+    touch(tmpdir.join("extra.json").strpath, "")
+    assert watcher.check() == [0]
+    assert tmpdir.join("workflow.md").read() == "test 2"
+    assert documented == [jobs[0]["wdlfile"], jobs[1]["wdlfile"],
+                          jobs[0]["wdlfile"]]
+
+
+def test_watcher_new_import(tmpdir, make_job):
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    tmpdir.join("main.wdl").write("version 1.0\n\nworkflow main {}\n")
+    jobs = [make_job("main.wdl")]
+    wa.document_workflow(jobs[0])
+    watcher = Watcher(jobs, wa.try_document_workflow, debounce=0)
+    tmpdir.join("main.wdl").write(
+        'version 1.0\n\nimport "imported.wdl"\n\n'
+        'workflow main {\n    call imported.echo\n}\n')
+    touch(tmpdir.join("main.wdl").strpath, "")
+    assert watcher.check() == [0]
+    assert "main.echo.taskOptional" in tmpdir.join("main.md").read()
+    touch(tmpdir.join("imported.wdl").strpath, "\n")
+    assert watcher.check() == [0]
+
+
+def test_watcher_refreshes_import_index(tmpdir, make_job):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    tmpdir.mkdir("first")
+    tmpdir.mkdir("second")
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.join("first"))
+    import_index = ImportIndex([tmpdir.join("first").strpath,
+                                tmpdir.join("second").strpath])
+    job = make_job("workflow.wdl", import_index=import_index)
+    wa.document_workflow(job)
+    watcher = Watcher([job], wa.try_document_workflow, debounce=0)
+    assert tmpdir.join("first", "imported.wdl").strpath in \
+        watcher.dependencies[0]
+    # The second directory takes precedence.
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.join("second"))
+    stat = os.stat(tmpdir.join("second").strpath)
+    os.utime(tmpdir.join("second").strpath,
+             ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert watcher.check() == [0]
+    assert tmpdir.join("second", "imported.wdl").strpath in \
+        watcher.dependencies[0]
+    assert tmpdir.join("first", "imported.wdl").strpath not in \
+        watcher.dependencies[0]
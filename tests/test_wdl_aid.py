@@ -18,13 +18,22 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import gc
+import json
+import os
+import shutil
+import stat
+import subprocess
 import sys
+import threading
+import weakref
 from pathlib import Path
 
 import pytest
 import WDL
 
 import wdl_aid.wdl_aid as wa
+from wdl_aid.loader import DocumentCache
 
 filesdir = Path(__file__).parent / Path("files")
 
@@ -422,4 +431,598 @@ def test_main_strict_outputs():
     with pytest.raises(ValueError) as e:
         wa.main()
     assert e.value.args[0] == ("Missing parameter_meta for outputs:\n"
-                               "test.output2")
\ No newline at end of file
+                               "test.output2")
+
+def test_expand_wdlfiles():
+    wdlfiles = wa.expand_wdlfiles([str(filesdir / Path("workflow.wdl")),
+                                   str(filesdir / Path("*.wdl"))])
+    assert wdlfiles == [str(filesdir / Path(x)) for x in
+                        ["workflow.wdl", "imported.wdl",
+                         "no_output_parameter_meta.wdl", "no_workflow.wdl"]]
+    with pytest.raises(ValueError):
+        wa.expand_wdlfiles([str(filesdir / Path("*.wdl2"))])
+
+
+def test_output_path():
+    assert wa.output_path("docs/{parent}/{stem}-{workflow_name}.md",
+                          "some/dir/file.wdl", "wf") == Path(
+        "docs/some/dir/file-wf.md")
+    # Other braces are not placeholders.
+    assert wa.output_path("odd{1}/{nope}-{stem}{{}}.md", "file.wdl",
+                          "wf") == Path("odd{1}/{nope}-file{{}}.md")
+
+
+def test_main_output_with_braces(tmpdir):
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                "-o", tmpdir.join("odd{1}.md").strpath]
+    wa.main()
+    assert tmpdir.join("odd{1}.md").read().startswith("# test")
+
+
+def test_read_manifest(tmpdir):
+    manifest = Path(tmpdir.join("manifest.json").strpath)
+    manifest.write_text(
+        '["workflow.wdl", {"wdlfile": "imported.wdl", "output": "sw.md", '
+        '"category_key": "cat"}]')
+    defaults = {option: None for option in wa.JOB_OPTIONS}
+    jobs = wa.read_manifest(manifest, defaults)
+    assert jobs[0]["wdlfile"] == str(manifest.parent / "workflow.wdl")
+    assert jobs[0]["output"] is None
+    assert jobs[1]["wdlfile"] == str(manifest.parent / "imported.wdl")
+    assert jobs[1]["output"] == manifest.parent / "sw.md"
+    assert jobs[1]["category_key"] == "cat"
+    manifest.write_text('[{"wdlfile": "workflow.wdl", "colour": "red"}]')
+    with pytest.raises(ValueError):
+        wa.read_manifest(manifest, defaults)
+
+
+def test_main_batch(tmpdir):
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                str(filesdir / Path("imported.wdl")),
+                "-o", tmpdir.strpath + "/{workflow_name}.md"]
+    wa.main()
+    with open(tmpdir.join("test.md").strpath) as out_file:
+        result = out_file.readlines()
+    with (filesdir / Path("expected.md")).open("r") as expected_output:
+        expected = expected_output.readlines()[:-1]
+    assert result == expected + ["> Generated using WDL AID ({})\n".format(wa.__version__)]
+    assert tmpdir.join("sw.md").check()
+
+
+def test_main_batch_manifest(tmpdir):
+    manifest = tmpdir.join("manifest.json")
+    manifest.write(
+        '[{"wdlfile": "%s", "output": "test.md", '
+        '"template": "%s"}]' % (filesdir / Path("workflow.wdl"),
+                                filesdir / Path("test.template")))
+    sys.argv = ["script", "--manifest", manifest.strpath]
+    wa.main()
+    with (filesdir / Path("test.template")).open("r") as expected_output:
+        assert tmpdir.join("test.md").read() == expected_output.read()
+
+
+def test_main_renders(tmpdir, monkeypatch):
+    collected = []
+    collect_values = wa.collect_values
+
+    def counting_collect_values(*args, **kwargs):
+        collected.append(args[0])
+        return collect_values(*args, **kwargs)
+
+    monkeypatch.setattr(wa, "collect_values", counting_collect_values)
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                "-o", tmpdir.strpath + "/{workflow_name}.md",
+                "--render", str(filesdir / Path("test.template")),
+                tmpdir.strpath + "/{workflow_name}.txt",
+                "--render", str(filesdir / Path("extra.template")),
+                tmpdir.strpath + "/{stem}_extra.txt",
+                "--extra", str(filesdir / Path("extra.json")),
+                "--render-threads", "2"]
+    wa.main()
+    assert collected == [str(filesdir / Path("workflow.wdl"))]
+    with (filesdir / Path("expected.md")).open("r") as expected_output:
+        assert tmpdir.join("test.md").read().startswith(
+            expected_output.read()[:100])
+    with (filesdir / Path("test.template")).open("r") as expected_output:
+        assert tmpdir.join("test.txt").read() == expected_output.read()
+    assert tmpdir.join("workflow_extra.txt").check()
+
+
+def test_main_batch_requires_output():
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                str(filesdir / Path("imported.wdl"))]
+    with pytest.raises(ValueError):
+        wa.main()
+
+
+def test_main_batch_rejects_shared_output(tmpdir):
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                str(filesdir / Path("imported.wdl")),
+                "-o", tmpdir.join("docs.md").strpath]
+    with pytest.raises(ValueError, match="placeholder"):
+        wa.main()
+    assert not tmpdir.join("docs.md").check()
+
+
+def test_check_outputs_renders():
+    job = {"wdlfile": "workflow.wdl", "output": "{stem}.md",
+           "renders": [("other.j2", "{stem}.md")]}
+    with pytest.raises(ValueError):
+        wa.check_outputs([job, dict(job, wdlfile="imported.wdl",
+                                    renders=None)])
+    wa.check_outputs([dict(job, renders=[("other.j2", "{stem}.html")]),
+                      dict(job, wdlfile="imported.wdl", renders=None)])
+
+
+def test_run_jobs(tmpdir, job_options):
+    jobs = [job_options(wdlfile=str(filesdir / Path(wdlfile)),
+                        output=tmpdir.strpath + "/{stem}.md", strict=True)
+            for wdlfile in ["workflow.wdl", "no_workflow.wdl",
+                            "imported.wdl"]]
+    jobs[2]["strict"] = False
+    errors = wa.run_jobs(jobs, 2)
+    assert errors[0].startswith("ValueError: Missing parameter_meta")
+    assert errors[1] == ("ValueError: No workflow is available in the WDL "
+                         "file.")
+    assert errors[2] is None
+    assert not tmpdir.join("workflow.md").check()
+    assert tmpdir.join("imported.md").check()
+    assert wa.run_jobs(jobs, 1) == errors
+
+
+def test_main_batch_errors(tmpdir, capsys):
+    sys.argv = ["script", str(filesdir / Path("no_workflow.wdl")),
+                str(filesdir / Path("imported.wdl")), "-j", "2",
+                "-o", tmpdir.strpath + "/{workflow_name}.md"]
+    with pytest.raises(SystemExit) as e:
+        wa.main()
+    assert e.value.code == 1
+    assert "Failed to document {}".format(
+        filesdir / Path("no_workflow.wdl")) in capsys.readouterr().err
+    assert tmpdir.join("sw.md").check()
+
+
+def test_sorted_views():
+    values = {
+        "inputs": {"common": [wa.InputEntry("b", "Int", "", None),
+                              wa.InputEntry("C", "Int", "", None),
+                              wa.InputEntry("a", "Int", "", None)]},
+        "outputs": {"other": [wa.OutputEntry("z", "Int", ""),
+                              wa.OutputEntry("x", "Int", "")],
+                    "category": [wa.OutputEntry("Y", "Int", "")]},
+        "workflow_authors": [{"name": "bob"}, {"name": "Alice"}, "carol"]}
+    views = wa.sorted_views(values)
+    assert [entry.name for entry in views["sorted_inputs"]["common"]] == [
+        "a", "b", "C"]
+    assert [entry.name for entry in views["sorted_outputs"]] == [
+        "x", "Y", "z"]
+    assert views["sorted_workflow_authors"] == [
+        {"name": "Alice"}, {"name": "bob"}, "carol"]
+    # The original values are left as they are.
+    assert [entry.name for entry in values["inputs"]["common"]] == [
+        "b", "C", "a"]
+
+
+def test_with_sorted_views():
+    values = wa.collect_values(str(filesdir / Path("workflow.wdl")), True,
+                               "category", "other", "description", "???",
+                               False, False, False)
+    assert "sorted_inputs" not in values
+    with_views = wa.with_sorted_views(values)
+    assert with_views["sorted_inputs"]["other"] == sorted(
+        values["inputs"]["other"], key=lambda entry: entry.name.lower())
+    assert wa.with_sorted_views(with_views) is with_views
+    assert "sorted_inputs" not in wa.values_to_json(with_views)
+
+
+def test_render_json_values(tmpdir):
+    values = wa.collect_values(str(filesdir / Path("workflow.wdl")), True,
+                               "category", "other", "description", "???",
+                               False, False, False)
+    json_values = json.loads(json.dumps(wa.values_to_json(values)))
+    wa.render(wa.default_template(), values, None,
+              Path(tmpdir.join("collected.md").strpath))
+    wa.render(wa.default_template(), json_values, None,
+              Path(tmpdir.join("json.md").strpath))
+    assert tmpdir.join("json.md").read() == \
+        tmpdir.join("collected.md").read()
+
+
+def test_values_to_json():
+    values = wa.collect_values(str(filesdir / Path("workflow.wdl")), True,
+                               "category", "other", "description", "???",
+                               False, False, False)
+    json_values = wa.values_to_json(values)
+    assert json_values["schema_version"] == wa.JSON_SCHEMA_VERSION
+    assert json_values["inputs"]["required"] == [
+        entry.to_dict() for entry in values["inputs"]["required"]]
+    assert json.loads(json.dumps(json_values)) == json_values
+
+
+def test_main_json(capsys):
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                "--format", "json"]
+    wa.main()
+    result = json.loads(capsys.readouterr().out)
+    assert result == wa.values_to_json(wa.collect_values(
+        str(filesdir / Path("workflow.wdl")), True, "category", "other",
+        "description", "???", False, False, False))
+
+
+def test_main_ndjson(tmpdir, capsys):
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                str(filesdir / Path("no_workflow.wdl")),
+                str(filesdir / Path("imported.wdl")), "-j", "2",
+                "--format", "ndjson", "-o", tmpdir.join("all.ndjson").strpath]
+    with pytest.raises(SystemExit) as e:
+        wa.main()
+    assert e.value.code == 1
+    assert "Failed to document {}".format(
+        filesdir / Path("no_workflow.wdl")) in capsys.readouterr().err
+    lines = tmpdir.join("all.ndjson").read().splitlines()
+    assert [json.loads(line)["workflow_name"] for line in lines] == [
+        "test", "sw"]
+
+
+@pytest.mark.parametrize(["options", "message"], [
+    (["--format", "ndjson", "--watch"], "--watch can not be used"),
+    (["--format", "ndjson", "--shard-by", "call"],
+     "--shard-by can not be used with --format ndjson"),
+    (["--format", "json", "--shard-by", "category"],
+     "--shard-by can not be used with --format json")])
+def test_main_json_incompatible_options(tmpdir, capsys, options, message):
+    sys.argv = ["script", str(filesdir / Path("workflow.wdl")),
+                "-o", tmpdir.join("all.ndjson").strpath] + options
+    with pytest.raises(SystemExit) as e:
+        wa.main()
+    assert e.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+def test_describe_binding():
+    doc = WDL.load(str(filesdir / Path("workflow.wdl")))
+    inputs, _ = wa.gather_inputs(doc.workflow)
+    assert wa.describe_binding(*[inp for inp in inputs
+                                 if inp[0] == "test.input2"][0]) == (
+        "test.input2", "String", '":p"')
+    output = [outp for outp in doc.workflow.effective_outputs
+              if outp.name == "output3"][0]
+    assert wa.describe_binding("test.output3", output) == (
+        "test.output3", "Array[File]")
+
+
+def test_extract_workflow():
+    workflow = wa.load_workflow(str(filesdir / Path("workflow.wdl")))
+    extract = wa.extract_workflow(workflow)
+    options = [True, "category", "other", "description", "...", False]
+    assert wa.gather_values("wf.wdl", json.loads(json.dumps(extract)),
+                            *options) == wa.gather_values("wf.wdl", extract,
+                                                          *options)
+    assert extract["workflow_name"] == "test"
+    assert extract["required_inputs"] == ["test.input1"]
+    assert extract["exclude"] == ["test.echo.shouldBeExcluded",
+                                  "test.output5"]
+    assert len(extract["inputs"]) == 6
+    assert len(extract["outputs"]) == 5
+
+
+def test_workflow_calls():
+    doc = WDL.load(str(filesdir / Path("workflow.wdl")))
+    assert [call.name for call in wa.workflow_calls(doc.workflow)] == [
+        "echo", "sw"]
+
+
+def test_walk_workflow_reused_callee(tmpdir, monkeypatch):
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    tmpdir.join("sub.wdl").write(
+        'version 1.0\n\nimport "imported.wdl"\n\n'
+        'workflow sub {\n    call imported.echo\n'
+        '    meta {WDL_AID: {exclude: ["echo.shouldBeExcluded"]}}\n}\n')
+    tmpdir.join("main.wdl").write(
+        'version 1.0\n\nimport "sub.wdl"\n\nworkflow main {\n'
+        '    call sub.sub as a\n    if (true) {\n        call sub.sub as b\n'
+        '    }\n    scatter (x in [1]) {\n        call sub.sub as c\n    }\n}\n')
+    doc = WDL.load(tmpdir.join("main.wdl").strpath)
+    visited = []
+    workflow_calls = wa.workflow_calls
+
+    def counting_workflow_calls(node):
+        visited.append(node.name)
+        return workflow_calls(node)
+    monkeypatch.setattr(wa, "workflow_calls", counting_workflow_calls)
+    walked = wa.walk_workflow(doc.workflow, "main")
+    assert sorted(visited) == ["main", "sub"]
+    assert walked["parameter_meta"] == {
+        f"main.{alias}.echo.taskOptional": {
+            "description": "an optional input", "category": "advanced",
+            "desc": "alternative description", "cat": "common"}
+        for alias in "abc"}
+    assert walked["exclude"] == [f"main.{alias}.echo.shouldBeExcluded"
+                                 for alias in "abc"]
+    assert len(walked["authors"]) == 2
+
+
+def test_hashable():
+    assert wa.hashable({"a": [1, {"b": 2}]}) == wa.hashable({"a": [1, {"b": 2}]})
+    assert wa.hashable({"a": 1, "b": 2}) == wa.hashable({"b": 2, "a": 1})
+    assert wa.hashable({"a": 1}) != wa.hashable({"a": 2})
+    assert wa.hashable("a") == "a"
+
+
+def test_merge_dict_of_lists_unhashable():
+    authors = {"authors": [{"name": "Vax"}]}
+    index = {}
+    wa.merge_dict_of_lists(authors, {"authors": [{"name": "Vex"},
+                                                 {"name": "Vax"}]}, index)
+    wa.merge_dict_of_lists(authors, {"authors": [{"name": "Vex"},
+                                                 {"name": "Pike"}]}, index)
+    assert authors == {"authors": [{"name": "Vax"}, {"name": "Vex"},
+                                   {"name": "Pike"}]}
+
+
+class CountingList(list):
+    """A list which counts how often it is searched."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.searches = 0
+
+    def __contains__(self, item):
+        self.searches += 1
+        return super().__contains__(item)
+
+
+class Author(dict):
+    """A dictionary which counts how often it is compared."""
+    comparisons = 0
+
+    def __eq__(self, other):
+        Author.comparisons += 1
+        return super().__eq__(other)
+
+    __hash__ = None
+
+
+def test_gather_entries_scaling():
+    n = 10000
+    declarations = [(f"wf.input{i}", "String", None) for i in range(n)]
+    excluded = CountingList(f"wf.input{i}" for i in range(0, n, 2))
+    required = CountingList(f"wf.input{i}" for i in range(1, n, 4))
+    parameter_meta = {f"wf.input{i}": {"description": "An input."}
+                      for i in range(n)}
+    entries, _ = wa.gather_entries(
+        declarations, parameter_meta, "category", "other", "description",
+        "???", False, excluded, required)
+    assert len(entries["required"]) + len(entries["other"]) == n / 2
+    # Searching the lists for every declaration would make this quadratic.
+    assert excluded.searches == required.searches == 0
+
+
+def test_merge_dict_of_lists_scaling(monkeypatch):
+    calls = []
+    hashable = wa.hashable
+
+    def counting_hashable(value):
+        calls.append(value)
+        return hashable(value)
+
+    monkeypatch.setattr(wa, "hashable", counting_hashable)
+
+    def merge(n):
+        calls.clear()
+        Author.comparisons = 0
+        authors = [Author(name=f"author{i}", email=f"{i}@example.com")
+                   for i in range(n)]
+        # Equal, but not the same, authors.
+        duplicates = [Author(author) for author in reversed(authors)]
+        merged = wa.merge_dict_of_lists({"authors": authors[:]},
+                                        {"authors": duplicates})
+        assert merged == {"authors": authors}
+        return len(calls)
+
+    calls_per_author = merge(1000) / 1000
+    assert merge(10000) == 10000 * calls_per_author
+    # Searching the list of authors for every author to add would make this
+    # quadratic.
+    assert Author.comparisons == 0
+
+
+def test_entries():
+    entry = wa.InputEntry("wf.input", "String", "An input.", None)
+    assert entry == {"name": "wf.input", "type": "String",
+                     "description": "An input.", "default": None}
+    assert {"name": "wf.input", "type": "String",
+            "description": "An input.", "default": None} == entry
+    assert entry["name"] == entry.name == "wf.input"
+    assert dict(entry) == entry.to_dict()
+    assert wa.InputEntry.from_dict(entry.to_dict()) == entry
+    output_entry = wa.OutputEntry("wf.output", "File", "An output.")
+    assert output_entry.to_dict() == {"name": "wf.output", "type": "File",
+                                      "description": "An output."}
+    assert not hasattr(output_entry, "__dict__")
+    with pytest.raises(KeyError):
+        output_entry["default"]
+
+
+def test_entries_are_mappings():
+    entry = wa.InputEntry("wf.input", "String", "An input.", None)
+    assert list(entry) == ["name", "type", "description", "default"]
+    assert len(entry) == 4
+    assert "default" in entry and "category" not in entry
+    assert entry.get("default", "missing") is None
+    assert entry.get("category", "missing") == "missing"
+    assert dict(entry.items()) == entry.to_dict()
+    assert "default" not in wa.OutputEntry("wf.output", "File", "")
+
+
+def test_entries_in_templates():
+    template = wa.template_environment().from_string(
+        "{{ entry|tojson }}|{{ 'default' in entry }}|"
+        "{% for key in entry %}{{ key }},{% endfor %}|"
+        "{{ entry.get('category', 'none') }}|"
+        "{% for key, value in entry|dictsort %}{{ key }},{% endfor %}")
+    entry = wa.InputEntry("wf.input", "String", "An input.", None)
+    assert template.render(entry=entry) == (
+        '{"default": null, "description": "An input.", "name": "wf.input", '
+        '"type": "String"}|True|name,type,description,default,|none|'
+        'default,description,name,type,')
+
+
+def test_gather_entries_accepts_bindings():
+    workflow = wa.load_workflow(str(filesdir / Path("workflow.wdl")))
+    inputs, required = wa.gather_inputs(workflow)
+    outputs = [(f"{workflow.name}.{output.name}", output)
+               for output in workflow.effective_outputs]
+    for bindings, required_names in [(inputs, required), (outputs, [])]:
+        described = [wa.describe_binding(name, binding)
+                     for name, binding in bindings]
+        assert wa.gather_entries(
+            bindings, {}, "category", "other", "description", "???", False,
+            [], required_names) == wa.gather_entries(
+            described, {}, "category", "other", "description", "???", False,
+            [], required_names)
+
+
+def test_startup_does_not_import_dependencies():
+    code = ("import sys\n"
+            "sys.argv = ['wdl-aid', '--version']\n"
+            "import wdl_aid.wdl_aid as wa\n"
+            "try:\n"
+            "    wa.parse_args()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print([m for m in ('WDL.Tree', 'jinja2.environment')\n"
+            "       if m in sys.modules])\n")
+    result = subprocess.run([sys.executable, "-c", code], check=True,
+                            capture_output=True, text=True)
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_main_stdin(tmpdir):
+    for options in [[], ["--cache-dir", tmpdir.strpath]]:
+        with (filesdir / Path("imported.wdl")).open() as stdin:
+            result = subprocess.run(
+                [sys.executable, "-m", "wdl_aid.wdl_aid", "-"] + options,
+                stdin=stdin, check=True, capture_output=True, text=True)
+        assert result.stdout.startswith("# sw\n")
+    # Nothing is cached for standard input.
+    assert not list(Path(tmpdir.strpath).glob("*.json"))
+
+
+def test_load_template(tmpdir):
+    template_file = tmpdir.join("template.j2")
+    template_file.write("{{ workflow_name }}")
+    template = wa.load_template(Path(template_file.strpath))
+    assert template.render(workflow_name="test") == "test"
+    assert wa.load_template(Path(template_file.strpath)) is template
+    template_file.write("Workflow: {{ workflow_name }}")
+    os.utime(template_file.strpath, (0, 0))
+    assert wa.load_template(Path(template_file.strpath)).render(
+        workflow_name="test") == "Workflow: test"
+    assert wa.load_template(None) is wa.load_template(None)
+
+
+def test_load_template_bytecode_cache(tmpdir):
+    bytecode_cache_dir = Path(tmpdir.join("templates").strpath)
+    wa.load_template(filesdir / Path("test.template"), bytecode_cache_dir)
+    assert len(list(bytecode_cache_dir.iterdir())) == 1
+
+
+def test_write_atomically(tmpdir):
+    output_file = Path(tmpdir.join("output.md").strpath)
+    wa.write_atomically(output_file, ["a", "b", "c"])
+    assert output_file.read_text() == "abc"
+    os.chmod(output_file, 0o640)
+
+    def failing_chunks():
+        yield "d"
+        raise RuntimeError("Rendering failed.")
+    with pytest.raises(RuntimeError):
+        wa.write_atomically(output_file, failing_chunks())
+    assert output_file.read_text() == "abc"
+    assert os.listdir(tmpdir.strpath) == ["output.md"]
+    wa.write_atomically(output_file, ["e"])
+    assert output_file.read_text() == "e"
+    assert output_file.stat().st_mode & 0o777 == 0o640
+
+
+def test_write_atomically_unchanged(tmpdir):
+    output_file = Path(tmpdir.join("output.md").strpath)
+    assert wa.write_atomically(output_file, ["abc"])
+    os.utime(output_file, ns=(0, 0))
+    assert not wa.write_atomically(output_file, ["a", "bc"])
+    assert output_file.stat().st_mtime_ns == 0
+    assert os.listdir(tmpdir.strpath) == ["output.md"]
+    assert wa.write_atomically(output_file, ["abcd"])
+    assert output_file.read_text() == "abcd"
+
+
+def test_write_atomically_symlink(tmpdir):
+    target = tmpdir.mkdir("docs").join("output.md")
+    target.write("old")
+    link = Path(tmpdir.join("link.md").strpath)
+    link.symlink_to(target.strpath)
+    assert wa.write_atomically(link, ["new"])
+    assert link.is_symlink()
+    assert target.read() == "new"
+    assert sorted(os.listdir(tmpdir.join("docs").strpath)) == ["output.md"]
+    # A link to a file which does not exist yet.
+    dangling = Path(tmpdir.join("dangling.md").strpath)
+    dangling.symlink_to(tmpdir.join("docs", "new.md").strpath)
+    assert wa.write_atomically(dangling, ["created"])
+    assert dangling.is_symlink()
+    assert tmpdir.join("docs", "new.md").read() == "created"
+
+
+def test_write_atomically_fifo(tmpdir):
+    fifo = Path(tmpdir.join("fifo").strpath)
+    os.mkfifo(fifo)
+    received = []
+    reader = threading.Thread(target=lambda: received.append(fifo.read_text()))
+    reader.start()
+    assert wa.write_atomically(fifo, ["a", "b"])
+    reader.join()
+    assert received == ["ab"]
+    assert stat.S_ISFIFO(os.stat(fifo).st_mode)
+    assert os.listdir(tmpdir.strpath) == ["fifo"]
+
+
+def test_render(tmpdir, capsys):
+    template = wa.jinja2.Template("{% for x in xs %}{{ x }}{% endfor %}")
+    output_file = Path(tmpdir.join("sub", "output.txt").strpath)
+    wa.render(template, {"xs": range(1000), "y": None}, None, output_file)
+    assert output_file.read_text() == "".join(map(str, range(1000)))
+    wa.render(template, {"xs": range(3)}, None)
+    assert capsys.readouterr().out == "012"
+
+
+def test_callee_memo(tmpdir):
+    shutil.copy(filesdir / Path("workflow.wdl"), tmpdir.strpath)
+    shutil.copy(filesdir / Path("imported.wdl"), tmpdir.strpath)
+    document_cache = DocumentCache()
+    memo = wa.CalleeMemo()
+    document = document_cache.load(tmpdir.join("workflow.wdl").strpath)
+    walked = wa.walk_workflow(document.workflow, "test", memo)
+    assert len(memo) == 3  # test, sw and echo
+    assert wa.walk_workflow(document.workflow, "test") == walked
+    echo = document.imports[0].doc.tasks[0]
+    assert echo in memo
+    with tmpdir.join("workflow.wdl").open("a") as wdlfile:
+        wdlfile.write("\n")
+    document = document_cache.load(tmpdir.join("workflow.wdl").strpath)
+    assert document.imports[0].doc.tasks[0] is echo
+    assert wa.walk_workflow(document.workflow, "test", memo) == walked
+    gc.collect()
+    assert len(memo) == 3  # The outdated workflow was garbage collected.
+
+
+def test_walk_workflow_without_memo_registers_no_finalizers():
+    workflow = wa.load_workflow(str(filesdir / Path("workflow.wdl")))
+    live_finalizers = weakref.finalize._registry.copy()
+    for _ in range(10):
+        wa.gather_parameter_meta(workflow, "test")
+    assert weakref.finalize._registry.keys() == live_finalizers.keys()
+    memo = wa.CalleeMemo()
+    for _ in range(10):
+        wa.walk_workflow(workflow, "test", memo)
+    # One per task and workflow, regardless of the number of walks.
+    assert len(weakref.finalize._registry) == len(live_finalizers) + 3